@@ -0,0 +1,218 @@
+import hashlib
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from .normalize import normalize_sheet
+
+# Per-ad-group totals shared by the checks that summarise a sheet by ad
+# group.  They are built once per parsed sheet, with one groupby
+# aggregation over precomputed boolean and numeric columns (no Python
+# function per group), and handed to every check registered with
+# ``aggregates=True``.  Checks on the same sheet running at the same time
+# share one build.
+#
+# The totals are sums (and first values) per group, so they can also be
+# built chunk by chunk and merged: reduce_chunks keeps only the rows and
+# totals the checks on a sheet declare with a Partial, which lets sheets
+# bigger than memory be audited from a CSV export.
+
+ADGROUP_KEYS = ("Campaign Name", "Adgroup Name")
+
+RSA_TYPE = "RESPONSIVE_SEARCH_AD"
+
+_sheets = {}        # id(sheet) -> SheetAggregates, dropped when the sheet is freed
+_sheets_lock = threading.Lock()
+
+
+class SheetAggregates:
+    """Aggregate tables of one parsed sheet, built on first use."""
+
+    def __init__(self, df):
+        self._sheet = weakref.ref(df)
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def adgroups(self, keys=ADGROUP_KEYS):
+        """One row per ad group (``keys``), in sheet order, with every total the sheet's columns allow.
+
+        Rows      rows of the sheet
+        Keywords  non-empty 'Keyword Name' cells
+        RSAs, Excellent RSAs
+                  'Ad Type' RESPONSIVE_SEARCH_AD, and of those 'Ad Strength' EXCELLENT
+        Responsive Ads, Full Responsive Ads
+                  'Ad Type' containing "responsive", and of those with at least
+                  15 'RSA Headlines Count' and 4 'RSA Descriptions Count'
+        Conversions, View Through Conversions
+                  sums, blanks counting as 0
+        Adgroup Type, Adgroup Status
+                  first value in the group
+
+        Rows with blank keys are kept, grouped together; see ``complete``.
+        """
+        keys = tuple(keys)
+        with self._lock:
+            if keys not in self._tables:
+                self._tables[keys] = build_adgroups(self._sheet(), keys)
+            return self._tables[keys]
+
+    def preset(self, keys, table):
+        # Totals merged from the chunks of a reduced sheet, which has too few rows to build them
+        with self._lock:
+            self._tables[tuple(keys)] = table
+
+    def keyword_terms(self, column):
+        """Every keyword text term (see keyword_scan.py) found in ``column``, as TermMatches."""
+        from .keyword_scan import keyword_scanner
+
+        key = ("terms", column)
+        with self._lock:
+            if key not in self._tables:
+                self._tables[key] = keyword_scanner().scan(self._sheet()[column])
+            return self._tables[key]
+
+
+def build_adgroups(df, keys):
+    columns = {key: df[key] for key in keys}
+    sums = []
+    if "Keyword Name" in df.columns:
+        columns["Keywords"] = df["Keyword Name"].notna()
+        sums.append("Keywords")
+    if "Ad Type" in df.columns:
+        ad_type = df["Ad Type"]
+        columns["RSAs"] = (ad_type == RSA_TYPE).fillna(False)
+        sums.append("RSAs")
+        if "Ad Strength" in df.columns:
+            columns["Excellent RSAs"] = columns["RSAs"] & (df["Ad Strength"] == "EXCELLENT").fillna(False)
+            sums.append("Excellent RSAs")
+        columns["Responsive Ads"] = contains(ad_type, "responsive")
+        sums.append("Responsive Ads")
+        if {"RSA Headlines Count", "RSA Descriptions Count"}.issubset(df.columns):
+            headlines = pd.to_numeric(df["RSA Headlines Count"], errors="coerce").fillna(0)
+            descriptions = pd.to_numeric(df["RSA Descriptions Count"], errors="coerce").fillna(0)
+            columns["Full Responsive Ads"] = columns["Responsive Ads"] & (headlines >= 15) & (descriptions >= 4)
+            sums.append("Full Responsive Ads")
+    for name in ("Conversions", "View Through Conversions"):
+        if name in df.columns:
+            columns[name] = df[name]
+            sums.append(name)
+    firsts = [name for name in ("Adgroup Type", "Adgroup Status") if name in df.columns and name not in keys]
+    for name in firsts:
+        columns[name] = df[name]
+
+    frame = pd.DataFrame(columns, copy=False)
+    grouped = frame.groupby(list(keys), sort=False, dropna=False, observed=True)
+    parts = [grouped.size().rename("Rows")]
+    if sums:
+        parts.append(grouped[sums].sum())
+    if firsts:
+        parts.append(grouped[firsts].first())
+    return pd.concat(parts, axis=1).reset_index()
+
+
+def merge_adgroups(tables, keys):
+    # Ad-group totals of consecutive chunks of a sheet -> the totals of the whole, in sheet order
+    keys = list(keys)
+    frame = pd.concat(tables, ignore_index=True)
+    firsts = [name for name in ("Adgroup Type", "Adgroup Status") if name in frame.columns and name not in keys]
+    sums = [name for name in frame.columns if name not in keys and name not in firsts]
+    grouped = frame.groupby(keys, sort=False, dropna=False, observed=True)
+    parts = [grouped[sums].sum()]
+    if firsts:
+        parts.append(grouped[firsts].first())
+    return pd.concat(parts, axis=1).reset_index()
+
+
+class Partial:
+    """What a check needs of a sheet read in chunks.
+
+    ``rows(chunk)`` marks the rows of a normalized chunk the check's result
+    can depend on (None: it needs none), and ``adgroups`` lists the key
+    tuples of the ad-group totals it reads.  On the reduced sheet built
+    from those (see reduce_chunks) the check must return what it returns
+    on the whole sheet.
+    """
+
+    def __init__(self, rows=None, adgroups=()):
+        self.rows = rows
+        self.adgroups = [tuple(keys) for keys in adgroups]
+
+    def marker(self):
+        # The row filter for one pass over a sheet; filters that carry state from chunk to chunk override this
+        return self.rows
+
+
+# Per-chunk ad-group totals are merged once this many have piled up
+MERGE_EVERY = 8
+
+
+def reduce_chunks(chunks, partials):
+    """A sheet cut down to what ``partials`` need, from its normalized ``chunks``.
+
+    Only one chunk is in memory at a time: its rows some Partial keeps are
+    set aside, and its ad-group totals merged into running totals.  The
+    returned frame holds the kept rows, and its shared SheetAggregates hold
+    the totals of every row.
+    """
+    key_sets = list(dict.fromkeys(keys for partial in partials for keys in partial.adgroups))
+    markers = [marker for marker in (partial.marker() for partial in partials) if marker is not None]
+    kept = []
+    totals = {keys: [] for keys in key_sets}
+    rows = 0
+    for chunk in chunks:
+        keep = np.zeros(len(chunk), dtype=bool)
+        for marker in markers:
+            marked = marker(chunk)
+            if marked is not None:
+                keep |= np.asarray(marked, dtype=bool)
+        kept.append(chunk[keep])
+        for keys in key_sets:
+            if set(keys).issubset(chunk.columns):
+                totals[keys].append(build_adgroups(chunk, keys))
+                if len(totals[keys]) >= MERGE_EVERY:
+                    totals[keys] = [merge_adgroups(totals[keys], keys)]
+        rows += len(chunk)
+
+    df = normalize_sheet(pd.concat(kept, ignore_index=True))
+    aggregates = sheet_aggregates(df)
+    digest = hashlib.sha256()
+    for keys, tables in totals.items():
+        if tables:
+            table = merge_adgroups(tables, keys)
+            aggregates.preset(keys, table)
+            digest.update(repr(keys).encode("utf-8"))
+            digest.update(pd.util.hash_pandas_object(table, index=False).to_numpy().tobytes())
+    # Rows the sheet had, and a digest of its totals for sheet_fingerprint
+    df.attrs["reduced_from"] = rows
+    df.attrs["totals_digest"] = digest.hexdigest()
+    return df
+
+
+def is_reduced(df):
+    # Built by reduce_chunks: its totals live with this frame, so it can't be shipped elsewhere
+    return "reduced_from" in df.attrs
+
+
+def contains(values, text):
+    # Case-insensitive substring test; enum columns are categoricals, so only their categories are searched
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        hits = values.cat.categories.astype(str).str.contains(text, case=False, regex=False)
+        return pd.Series(np.append(hits, False)[values.cat.codes.to_numpy()], index=values.index)
+    return values.astype(str).str.contains(text, case=False, regex=False, na=False)
+
+
+def complete(table, keys=ADGROUP_KEYS):
+    # Ad groups with every key filled in, sorted by key (what a plain groupby gives)
+    return table.dropna(subset=list(keys)).sort_values(list(keys), kind="stable").reset_index(drop=True)
+
+
+def sheet_aggregates(df):
+    # The shared SheetAggregates of a parsed sheet (not of a view or copy of it)
+    with _sheets_lock:
+        aggregates = _sheets.get(id(df))
+        if aggregates is None:
+            aggregates = _sheets[id(df)] = SheetAggregates(df)
+            weakref.finalize(df, _sheets.pop, id(df), None)
+        return aggregates
@@ -1,6 +1,25 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class MyappConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'myapp'
+
+    def ready(self):
+        from django.conf import settings
+
+        # Deploy-only: matching the questions needs the check registry, whose pandas
+        # import would slow every runserver start and reload (see views.py)
+        checks.register(check_question_catalog, deploy=True)
+
+        # Pre-fork servers: import the audit path once, before the workers fork
+        if getattr(settings, "QA_WARMUP", False):
+            from .warmup import warm_up
+            warm_up()
+
+
+def check_question_catalog(app_configs=None, **kwargs):
+    # Imported here: the catalog pulls in the check registry (and pandas)
+    from .catalog import check_catalog
+    return check_catalog(app_configs, **kwargs)
@@ -0,0 +1,304 @@
+import logging
+import os
+import time
+import uuid
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from . import metrics
+from .catalog import get_catalog
+from .checks import CHECKS, columns_by_sheet, partials_by_sheet, resolve_question, run_check
+from .diff import DIFF_QUESTION, account_key, audit_changes, default_history
+from .executor import execute_checks
+from .question_index import match_question
+from .readers import record_timings
+from .report import write_report
+from .result_cache import check_key, default_cache, hash_file, sheet_fingerprint
+from .results import ERROR, MISSING, Result
+from .snapshots import default_snapshots
+from .workbook import LazyWorkbook
+
+# The audit path: everything here pulls in pandas and friends, so views.py
+# only imports this module once an upload actually needs auditing.
+
+logger = logging.getLogger(__name__)
+
+
+def run_audit(source, upload_name, on_result=None, upload_hash=None, account=None):
+    # source: path or open binary handle of the workbook
+    # account: whose audit history to compare with; defaults to one named after the upload
+    started = time.perf_counter()
+    outcome = "failed"
+    try:
+        cache = default_cache()
+        snapshots = default_snapshots()
+        if upload_hash is None and (cache is not None or snapshots is not None):
+            upload_hash = hash_file(source)
+        if cache is not None:
+            questions = load_predefined_questions()
+            cached = cached_audit(cache, source, upload_name, upload_hash, account=account, snapshots=snapshots)
+            if cached is not None:
+                results, download_url = cached
+                if on_result is not None:
+                    for i, row in enumerate(results):
+                        on_result(i, row, len(results))
+                outcome = "cached"
+                return results, download_url
+
+        results, fingerprints = audit_workbook(source, upload_name, on_result=on_result, cache=cache,
+                                               snapshots=snapshots, upload_hash=upload_hash,
+                                               account=account or account_key(upload_name))
+
+        download_url = save_report(results)
+
+        # Reports with timed-out or crashed checks are not worth serving again.
+        # The row of what changed since the account's last audit is left out:
+        # it depends on who uploads the workbook, and when.
+        if cache is not None and not any(row["Result"].failed for row in results):
+            cache.store_report(upload_hash, questions, fingerprints, checklist_rows(results), download_url)
+        outcome = "audited"
+        return results, download_url
+    finally:
+        metrics.AUDIT_SECONDS.observe(time.perf_counter() - started, outcome=outcome)
+        metrics.flush()
+
+
+def cached_audit(cache, source, upload_name, upload_hash, account=None, snapshots=None):
+    # (results, download url) of the stored report for this upload, or None.
+    # Stored reports hold the checklist rows only: the row of what changed
+    # since the account's last audit is worked out again for every request,
+    # from the upload's snapshot when there is one, and the report rewritten.
+    cached = cache.lookup_report(upload_hash, load_predefined_questions())
+    if cached is None:
+        return None
+    history = default_history()
+    if history is None:
+        return cached.results, cached.report_url
+
+    entries = get_catalog().enabled
+    with open_workbook(source, get_catalog().checks(), snapshots, upload_hash) as sheet_dict:
+        changes = audit_changes(history, account or account_key(upload_name), upload_name, sheet_dict, entries,
+                                cached.results)
+    results = cached.results + [changes]
+    return results, save_report(results)
+
+
+def checklist_rows(results):
+    return [row for row in results if row["Question"] != DIFF_QUESTION]
+
+
+def save_report(results):
+    # Write the Excel report to MEDIA_ROOT and return its URL
+    output_filename = f"QA_Report_{uuid.uuid4().hex}.xlsx"
+    save_results_to_excel(results, os.path.join(settings.MEDIA_ROOT, output_filename))
+    return os.path.join(settings.MEDIA_URL, output_filename)
+
+
+@contextmanager
+def open_workbook(source, checks, snapshots=None, upload_hash=None):
+    # LazyWorkbook for ``checks``: sheets are parsed on first use, and only
+    # the columns the checks read.  With a snapshot store, sheets parsed for this
+    # upload_hash before are read from there.
+    snapshot = snapshots.open(upload_hash) if snapshots is not None and upload_hash else None
+    with LazyWorkbook(source, columns_by_sheet(checks),
+                      backend=settings.EXCEL_READER_BACKEND,
+                      stream_threshold=settings.EXCEL_STREAM_THRESHOLD,
+                      snapshot=snapshot,
+                      partials=partials_by_sheet(checks),
+                      reduce_threshold=settings.QA_CSV_REDUCE_MIN_BYTES) as sheet_dict:
+        yield sheet_dict
+    if snapshot is not None and snapshot.written:
+        snapshots.evict(keep={upload_hash})
+
+
+def audit_workbook(source, upload_name, on_result=None, cache=None, snapshots=None, upload_hash=None,
+                   account=None):
+    # Run the checklist on one workbook: (results, {sheet name: fingerprint})
+    # Sheets are read through open_workbook (see above).
+    # With an account, a last row says what changed since its previous audit (see diff.py).
+    checks = get_catalog().checks()
+    with open_workbook(source, checks, snapshots, upload_hash) as sheet_dict:
+        fingerprints = {}
+        if cache is not None:
+            # Checks on a sheet whose fingerprint was seen before reuse that result
+            for sheet_name in {c.sheet for c in checks}:
+                df = sheet_dict.get(sheet_name)
+                if df is not None:
+                    fingerprints[sheet_name] = sheet_fingerprint(df)
+
+        entries = get_catalog().enabled
+        results = run_all_checks(sheet_dict, on_result=on_result, cache=cache, fingerprints=fingerprints,
+                                 entries=entries)
+
+        history = default_history() if account else None
+        if history is not None:
+            results.append(audit_changes(history, account, upload_name, sheet_dict, entries, results))
+
+        if settings.EXCEL_READER_TIMINGS_LOG:
+            record_timings(settings.EXCEL_READER_TIMINGS_LOG, upload_name, source,
+                           sheet_dict, compare=settings.EXCEL_READER_COMPARE)
+
+    return results, fingerprints
+
+
+def run_analysis(matched_question, df):
+    if df is None:
+        return Result(MISSING, "No data to analyze.")
+
+    check_id = resolve_question(matched_question)
+    if check_id is None:
+        return unmatched_result(matched_question)
+
+    with metrics.CHECK_SECONDS.time(check=check_id, sheet=CHECKS[check_id].sheet):
+        return run_check(check_id, df)
+
+
+def analyze_snapshot(upload_hash, question):
+    # An ad-hoc question about an upload audited before, answered from its
+    # snapshot without opening the workbook again
+    check_id = resolve_question(question)
+    if check_id is None:
+        return unmatched_result(question)
+
+    check = CHECKS[check_id]
+    snapshots = default_snapshots()
+    df = None
+    if snapshots is not None:
+        df = snapshots.open(upload_hash).load(check.sheet, {c.strip() for c in check.columns})
+    if df is None:
+        return Result(MISSING, f"Sheet '{check.sheet}' of this upload has no snapshot; upload the workbook again.")
+    return run_analysis(question, df)
+
+
+def unmatched_result(question):
+    # No check is a confident match: name the closest ones instead
+    match = match_question(question)
+    candidates = [(match.check_id, match.score)] + match.alternatives if match.check_id else []
+    if not candidates:
+        return Result(MISSING, "Matched your question but logic for it isn't implemented yet.")
+    closest = "; ".join(f'"{CHECKS[c].question}" ({score:.0%})' for c, score in candidates)
+    return Result(MISSING, f"No check clearly matches your question. Closest: {closest}")
+
+
+def load_predefined_questions():
+    # The enabled checklist questions, from QA_QUESTIONS_FILE (see catalog.py)
+    return get_catalog().questions
+
+
+# Kept for callers that look up a question's sheet directly
+QUESTION_TO_SHEET_MAP = {c.question: c.sheet for c in CHECKS.values()}
+
+
+def run_all_checks(sheet_dict, on_result=None, cache=None, fingerprints=None, entries=None):
+    # on_result(index, row, total) is called as each question's row is ready.
+    # With a result cache, checks whose sheet fingerprint is known are not re-run.
+    if entries is None:
+        entries = get_catalog().enabled
+    total = len(entries)
+    results = [None] * total
+    tasks = []
+    task_rows = []
+
+    def finish(i, row):
+        results[i] = row
+        if on_result is not None:
+            on_result(i, row, total)
+
+    for i, entry in enumerate(entries):
+        question = entry.question
+        check_id = entry.check_id
+
+        if not check_id:
+            finish(i, {
+                "Question": question,
+                "Result": Result(MISSING, "No check matches this question; see the question catalog."),
+                "Time": 0.0
+            })
+            continue
+
+        sheet_name = CHECKS[check_id].sheet
+
+        df = sheet_dict.get(sheet_name)
+        if df is None:
+            finish(i, {
+                "Question": question,
+                "Result": Result(MISSING, f"Sheet '{sheet_name}' not found in uploaded Excel file."),
+                "Time": 0.0
+            })
+            continue
+
+        tasks.append((check_id, df))
+        task_rows.append((i, question, sheet_name))
+
+    keys = [(check_id, check_key(CHECKS[check_id], (fingerprints or {}).get(CHECKS[check_id].sheet)))
+            for check_id, _ in tasks]
+    cached = {}
+    if cache is not None:
+        cached = cache.lookup_checks([key for key in keys if key[1] is not None])
+
+    pending_tasks = []
+    pending_rows = []
+    pending_keys = []
+    for task, (i, question, sheet_name), key in zip(tasks, task_rows, keys):
+        if key in cached:
+            metrics.CHECK_RESULTS.inc(check=task[0], status=cached[key][0].status, cached="true")
+            finish(i, {
+                "Question": question,
+                "Result": with_sheet(cached[key][0], sheet_name),
+                "Time": 0.0,
+                "Cached": True
+            })
+        else:
+            pending_tasks.append(task)
+            pending_rows.append((i, question, sheet_name))
+            pending_keys.append(key)
+
+    fresh = {}
+
+    def on_complete(task_index, outcome):
+        i, question, sheet_name = pending_rows[task_index]
+        check_id, df = pending_tasks[task_index]
+        metrics.CHECK_SECONDS.observe(outcome.seconds, check=check_id, sheet=sheet_name)
+        slow = settings.QA_SLOW_CHECK_SECONDS
+        if slow is not None and outcome.seconds >= slow:
+            logger.warning("Slow check %s on '%s' (%d rows): %.2fs", check_id, sheet_name, len(df), outcome.seconds)
+        if outcome.timed_out:
+            result = Result(ERROR, f"Timed out analyzing '{sheet_name}' after {settings.QA_CHECK_TIMEOUT}s.")
+        elif outcome.error is not None:
+            result = Result(ERROR, f"Error analyzing '{sheet_name}': {str(outcome.error)}")
+        else:
+            if pending_keys[task_index][1] is not None and not outcome.result.failed:
+                fresh[pending_keys[task_index]] = (outcome.result, outcome.seconds)
+            result = with_sheet(outcome.result, sheet_name)
+        metrics.CHECK_RESULTS.inc(check=check_id, status=result.status, cached="false")
+        finish(i, {
+            "Question": question,
+            "Result": result,
+            "Time": round(outcome.seconds, 3)
+        })
+
+    # Checks run concurrently; results keep the checklist order
+    execute_checks(
+        pending_tasks,
+        timeout=settings.QA_CHECK_TIMEOUT,
+        thread_workers=settings.QA_CHECK_THREADS,
+        process_workers=settings.QA_CHECK_PROCESSES,
+        process_min_rows=settings.QA_PROCESS_MIN_ROWS,
+        on_complete=on_complete,
+    )
+
+    if cache is not None and fresh:
+        cache.store_checks(fresh)
+
+    return results
+
+
+def with_sheet(result, sheet_name):
+    # Copy of a check's result with the sheet it ran on in front of the message
+    return Result(result.status, f"{sheet_name}: {result.message}", result.tables, result.chart)
+
+
+def save_results_to_excel(results, output_path):
+    # Every table of every check, streamed in constant memory (see report.py)
+    write_report(results, output_path)
@@ -0,0 +1,200 @@
+import glob
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+
+from . import metrics
+
+# Audit many workbooks at once (python manage.py audit_batch).  Each worker
+# process audits whole workbooks; a workbook's checks run on that worker's
+# threads.  Finished workbooks are appended to a state file in the output
+# directory, which is how a later run skips them.
+#
+# Models are imported inside the functions so worker processes can unpickle
+# this module before Django is set up.
+
+WORKBOOK_EXTENSIONS = (".xlsx", ".xls", ".zip", ".csv", ".tsv")
+STATE_FILE = "batch_state.jsonl"
+SUMMARY_FILE = "batch_summary.xlsx"
+
+
+def find_workbooks(patterns):
+    # Directories are searched recursively; anything else is a glob or a file
+    found = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob.glob(os.path.join(pattern, "**", "*"), recursive=True)
+        else:
+            matches = glob.glob(pattern, recursive=True)
+        for path in sorted(matches):
+            name = os.path.basename(path)
+            # "~$name.xlsx" is the lock file Excel leaves next to an open workbook
+            if os.path.isfile(path) and name.lower().endswith(WORKBOOK_EXTENSIONS) and not name.startswith("~$"):
+                found.append(os.path.abspath(path))
+    return list(dict.fromkeys(found))
+
+
+def read_state(output_dir):
+    # {content hash: latest entry}; a later line for the same hash wins
+    state = {}
+    path = os.path.join(output_dir, STATE_FILE)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    state[entry["hash"]] = entry
+    return state
+
+
+def append_state(output_dir, entry):
+    with open(os.path.join(output_dir, STATE_FILE), "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def is_done(entry, output_dir):
+    return entry["status"] == "done" and os.path.exists(os.path.join(output_dir, entry["report"]))
+
+
+def report_name(path, upload_hash):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return f"QA_Report_{stem}_{upload_hash[:8]}.xlsx"
+
+
+def _init_worker():
+    import django
+    django.setup()
+    # Workbooks are already spread over processes; a process pool per
+    # worker for single checks would only oversubscribe the CPUs
+    settings.QA_CHECK_PROCESSES = 0
+    from .warmup import warm_up
+    warm_up()
+
+
+def audit_one(path, upload_hash, report_path):
+    """Audit one workbook in a worker process and write its report.
+
+    Returns the state entry for it; a workbook that can't be audited is
+    reported as failed rather than stopping the batch.
+    """
+    from .audit import audit_workbook, save_results_to_excel
+    from .diff import account_key
+    from .result_cache import default_cache
+    from .snapshots import default_snapshots
+
+    started = time.perf_counter()
+    entry = {"hash": upload_hash, "path": path, "report": os.path.basename(report_path)}
+    try:
+        results, _ = audit_workbook(path, os.path.basename(path), cache=default_cache(),
+                                    snapshots=default_snapshots(), upload_hash=upload_hash,
+                                    account=account_key(path))
+        save_results_to_excel(results, report_path)
+    except Exception as e:
+        entry.update(status="failed", error=f"{type(e).__name__}: {e}")
+    else:
+        entry.update(
+            status="done",
+            questions=[row["Question"] for row in results],
+            statuses=[row["Result"].status for row in results],
+        )
+    entry["seconds"] = round(time.perf_counter() - started, 3)
+    metrics.flush()
+    return entry
+
+
+class BatchRun:
+    """Outcome of one ``run_batch`` call."""
+
+    def __init__(self):
+        self.audited = []       # state entries written by this run
+        self.skipped = []       # (path, reason)
+        self.seconds = 0.0
+
+    @property
+    def failed(self):
+        return [entry for entry in self.audited if entry["status"] != "done"]
+
+    @property
+    def per_minute(self):
+        return len(self.audited) * 60 / self.seconds if self.seconds else 0.0
+
+
+def run_batch(paths, output_dir, processes=None, force=False, on_entry=None):
+    # on_entry(entry, done, total) is called in the parent as each workbook finishes
+    from .result_cache import hash_file
+
+    os.makedirs(output_dir, exist_ok=True)
+    state = {} if force else read_state(output_dir)
+    run = BatchRun()
+    started = time.perf_counter()
+
+    todo = {}
+    for path in paths:
+        upload_hash = hash_file(path)
+        if upload_hash in todo:
+            run.skipped.append((path, f"same contents as {os.path.basename(todo[upload_hash])}"))
+        elif upload_hash in state and is_done(state[upload_hash], output_dir):
+            run.skipped.append((path, "already audited"))
+        else:
+            todo[upload_hash] = path
+
+    if todo:
+        workers = max(1, min(processes or os.cpu_count() or 1, len(todo)))
+        # spawn, as for the other pools: workers set Django up themselves
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker) as pool:
+            futures = {
+                pool.submit(audit_one, path, upload_hash, os.path.join(output_dir, report_name(path, upload_hash))):
+                    (path, upload_hash)
+                for upload_hash, path in todo.items()
+            }
+            for future in as_completed(futures):
+                path, upload_hash = futures[future]
+                try:
+                    entry = future.result()
+                except Exception as e:
+                    # The worker itself died (e.g. out of memory)
+                    entry = {"hash": upload_hash, "path": path, "report": report_name(path, upload_hash),
+                             "status": "failed", "error": f"{type(e).__name__}: {e}", "seconds": None}
+                append_state(output_dir, entry)
+                run.audited.append(entry)
+                if on_entry is not None:
+                    on_entry(entry, len(run.audited), len(todo))
+
+    run.seconds = time.perf_counter() - started
+    write_summary(read_state(output_dir), os.path.join(output_dir, SUMMARY_FILE))
+    return run
+
+
+def write_summary(state, output_path):
+    """Roll-up of every audited workbook in the state file.
+
+    "Accounts" has one row per workbook with its status counts; "Questions"
+    counts, per checklist question, how many accounts got each status.
+    """
+    import pandas as pd
+
+    from .results import ERROR, FAIL, INFO, MISSING, PASS
+
+    statuses = [PASS, FAIL, INFO, MISSING, ERROR]
+    accounts = []
+    questions = {}
+    for entry in sorted(state.values(), key=lambda e: e["path"]):
+        row = {"Workbook": os.path.basename(entry["path"]), "Path": entry["path"], "Status": entry["status"]}
+        counts = dict.fromkeys(statuses, 0)
+        for question, status in zip(entry.get("questions", []), entry.get("statuses", [])):
+            counts[status] = counts.get(status, 0) + 1
+            questions.setdefault(question, dict.fromkeys(statuses, 0))[status] += 1
+        row.update(counts)
+        row.update({"Seconds": entry.get("seconds"), "Report": entry["report"] if entry["status"] == "done" else "",
+                    "Error": entry.get("error", "")})
+        accounts.append(row)
+
+    by_question = [{"Question": question, **counts} for question, counts in questions.items()]
+    with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
+        pd.DataFrame(accounts).to_excel(writer, sheet_name="Accounts", index=False)
+        pd.DataFrame(by_question).to_excel(writer, sheet_name="Questions", index=False)
@@ -0,0 +1,163 @@
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+# Per-stage benchmark of the audit path on synthetic workbooks (see
+# synthetic.py and python manage.py bench_audit).  Results are saved as JSON
+# so runs from different versions can be compared stage by stage.
+
+FORMAT_VERSION = 1
+
+
+def audit_stages(path):
+    """Run the audit on the workbook at ``path`` one stage at a time.
+
+    Yields ``(stage, callable)`` pairs in order; each callable runs its stage
+    when called.  Checks run one after another so each is timed on its own.
+    """
+    from django.template.loader import render_to_string
+
+    from .audit import save_results_to_excel, with_sheet
+    from .checks import CHECKS, columns_by_sheet, run_check
+    from .workbook import LazyWorkbook
+
+    workbook = LazyWorkbook(path, columns_by_sheet(), backend=settings.EXCEL_READER_BACKEND,
+                            stream_threshold=settings.EXCEL_STREAM_THRESHOLD)
+    sheets = {}
+    rows = []
+    try:
+        for sheet_name in dict.fromkeys(c.sheet for c in CHECKS.values()):
+            yield f"parse:{sheet_name}", lambda name=sheet_name: sheets.__setitem__(name, workbook.get(name))
+        for c in CHECKS.values():
+            def run(c=c):
+                result = run_check(c.id, sheets[c.sheet]) if sheets.get(c.sheet) is not None else None
+                if result is not None:
+                    rows.append({"Question": c.question, "Result": with_sheet(result, c.sheet), "Time": 0.0})
+            yield f"check:{c.id}", run
+    finally:
+        workbook.close()
+
+    yield "render_html", lambda: render_to_string("home.html", {"results": rows, "download_url": "#"})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        yield "save_excel", lambda: save_results_to_excel(rows, os.path.join(tmp, "report.xlsx"))
+
+
+def time_stages(path):
+    times = {}
+    for stage, run in audit_stages(path):
+        started = time.perf_counter()
+        run()
+        times[stage] = time.perf_counter() - started
+    return times
+
+
+def trace_stages(path):
+    # Peak memory allocated during each stage, over what was live before it.
+    # tracemalloc slows everything down, so this is a separate pass from timing.
+    peaks = {}
+    tracemalloc.start()
+    try:
+        for stage, run in audit_stages(path):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            run()
+            _, peak = tracemalloc.get_traced_memory()
+            peaks[stage] = peak - before
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def benchmark_workbook(path, repeat=3, memory=True):
+    """Stage timings (min and median of ``repeat`` runs) and peak memory for one workbook."""
+    runs = [time_stages(path) for _ in range(repeat)]
+    peaks = trace_stages(path) if memory else {}
+
+    stages = {}
+    for stage in runs[0]:
+        seconds = [run[stage] for run in runs]
+        stages[stage] = {
+            "seconds": round(statistics.median(seconds), 4),
+            "min": round(min(seconds), 4),
+            "peak_mb": round(peaks[stage] / 1024 ** 2, 2) if stage in peaks else None,
+        }
+    # Stage totals: parsing every sheet and running every check
+    for prefix in ("parse", "check"):
+        parts = [v for k, v in stages.items() if k.startswith(prefix + ":")]
+        stages[prefix] = {
+            "seconds": round(sum(v["seconds"] for v in parts), 4),
+            "min": round(sum(v["min"] for v in parts), 4),
+            "peak_mb": max((v["peak_mb"] for v in parts if v["peak_mb"] is not None), default=None),
+        }
+    return stages
+
+
+def environment():
+    import numpy as np
+    import pandas as pd
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+                                capture_output=True, text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "reader_backend": settings.EXCEL_READER_BACKEND,
+    }
+
+
+def new_report():
+    return {
+        "format": FORMAT_VERSION,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "workbooks": [],
+    }
+
+
+def max_rss_mb():
+    # Peak resident memory of this process so far; None where it can't be read (Windows)
+    from .metrics import max_resident_bytes
+
+    rss = max_resident_bytes()
+    return None if rss is None else round(rss / 1024 ** 2, 1)
+
+
+def compare(old, new, threshold=0.10, floor=0.01):
+    """Stage-by-stage changes between two saved reports.
+
+    Returns ``[(keywords, stage, old seconds, new seconds, change), ...]`` for
+    stages present in both, and the subset that got slower by more than
+    ``threshold`` (and by at least ``floor`` seconds, to ignore noise).
+    """
+    old_runs = {w["keywords"]: w["stages"] for w in old["workbooks"]}
+    rows = []
+    regressions = []
+    for workbook in new["workbooks"]:
+        before = old_runs.get(workbook["keywords"])
+        if before is None:
+            continue
+        for stage, timing in workbook["stages"].items():
+            if stage not in before:
+                continue
+            was, now = before[stage]["seconds"], timing["seconds"]
+            change = (now - was) / was if was else 0.0
+            row = (workbook["keywords"], stage, was, now, change)
+            rows.append(row)
+            if change > threshold and now - was >= floor:
+                regressions.append(row)
+    return rows, regressions
@@ -0,0 +1,127 @@
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .checks import CHECKS, NORMALIZED_QUESTION_TO_CHECK, match_keywords, normalize_question
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogEntry:
+    def __init__(self, line, question, check_id, enabled=True):
+        self.line = line            # line number in the questions file
+        self.question = question
+        self.check_id = check_id    # None when no check matches
+        self.enabled = enabled
+
+    def __repr__(self):
+        return f"<CatalogEntry {self.line}: {self.check_id}>"
+
+    @property
+    def check(self):
+        return CHECKS.get(self.check_id)
+
+
+class QuestionCatalog:
+    """The checklist: questions from QA_QUESTIONS_FILE, each resolved to a check.
+
+    One question per line; blank lines and lines starting with ``#`` are
+    skipped.  Questions are matched to the check registry ignoring case,
+    spacing and quote style, then by the keyword rules.  ``errors`` lists
+    questions no check matches and unknown IDs in QA_DISABLED_CHECKS;
+    ``warnings`` lists keyword matches and repeated checks.  Checks named
+    in QA_DISABLED_CHECKS stay in ``entries`` but are left out of audits.
+    """
+
+    def __init__(self, path, entries, errors=(), warnings=(), version=None):
+        self.path = path
+        self.entries = entries
+        self.errors = list(errors)
+        self.warnings = list(warnings)
+        self.version = version
+
+    @property
+    def enabled(self):
+        return [e for e in self.entries if e.enabled]
+
+    @property
+    def questions(self):
+        return [e.question for e in self.enabled]
+
+    def checks(self):
+        # Checks the audit runs, in checklist order
+        return [e.check for e in self.enabled if e.check_id is not None]
+
+
+def compile_catalog(path, disabled=(), version=None):
+    with open(path, encoding="utf-8-sig") as f:
+        lines = f.read().splitlines()
+
+    disabled = set(disabled)
+    entries = []
+    errors = []
+    warnings = []
+    seen = {}
+    for number, line in enumerate(lines, start=1):
+        question = line.strip()
+        if not question or question.startswith("#"):
+            continue
+        check_id = NORMALIZED_QUESTION_TO_CHECK.get(normalize_question(question))
+        if check_id is None:
+            check_id = match_keywords(question)
+            if check_id is None:
+                errors.append(f"line {number}: no check matches '{question}'.")
+            else:
+                warnings.append(f"line {number}: matched to check '{check_id}' by keywords only.")
+        if check_id is not None:
+            if check_id in seen:
+                warnings.append(f"line {number}: check '{check_id}' is already on line {seen[check_id]}.")
+            seen.setdefault(check_id, number)
+        entries.append(CatalogEntry(number, question, check_id, enabled=check_id not in disabled))
+
+    for check_id in sorted(disabled - set(CHECKS)):
+        errors.append(f"QA_DISABLED_CHECKS: unknown check '{check_id}'.")
+    return QuestionCatalog(path, entries, errors, warnings, version)
+
+
+_catalog = None
+_lock = threading.Lock()
+
+
+def get_catalog():
+    """The compiled catalog, rebuilt only when the file or the disabled checks change."""
+    global _catalog
+    path = str(settings.QA_QUESTIONS_FILE)
+    try:
+        stat = os.stat(path)
+    except OSError as e:
+        raise ImproperlyConfigured(f"QA_QUESTIONS_FILE '{path}' can't be read: {e}") from e
+    disabled = tuple(sorted(settings.QA_DISABLED_CHECKS))
+    version = (path, stat.st_mtime_ns, stat.st_size, disabled)
+
+    with _lock:
+        if _catalog is None or _catalog.version != version:
+            reloading = _catalog is not None
+            _catalog = compile_catalog(path, disabled, version)
+            logger.info("%s question catalog %s: %d question(s), %d enabled.",
+                        "Reloaded" if reloading else "Loaded", path, len(_catalog.entries), len(_catalog.enabled))
+            for message in _catalog.errors:
+                logger.error("Question catalog %s", message)
+            for message in _catalog.warnings:
+                logger.warning("Question catalog %s", message)
+        return _catalog
+
+
+def check_catalog(app_configs=None, **kwargs):
+    # System check (python manage.py check): the questions file against the check registry
+    from django.core.checks import Error, Warning
+
+    try:
+        catalog = get_catalog()
+    except ImproperlyConfigured as e:
+        return [Error(str(e), id="myapp.E001")]
+    return ([Error(f"{catalog.path}: {message}", id="myapp.E002") for message in catalog.errors]
+            + [Warning(f"{catalog.path}: {message}", id="myapp.W001") for message in catalog.warnings])
@@ -0,0 +1,84 @@
+import base64
+import hashlib
+import io
+import json
+from functools import lru_cache
+
+from . import metrics
+
+# Renders kept in memory, keyed by (chart data, format)
+CACHE_SIZE = 256
+
+CONTENT_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+
+
+def chart_spec(chart):
+    # Canonical JSON of the chart data: equal charts give equal strings
+    return json.dumps(chart, sort_keys=True, default=str)
+
+
+def pie_chart(labels, values, colors=None):
+    # A pie needs something to divide: no chart when every slice is zero
+    if not sum(values):
+        return None
+    chart = {"kind": "pie", "labels": labels, "values": values}
+    if colors:
+        chart["colors"] = colors
+    return chart
+
+
+def chart_key(chart):
+    return hashlib.sha1(chart_spec(chart).encode("utf-8")).hexdigest()
+
+
+def render_chart(chart, fmt="png"):
+    """PNG or SVG bytes for a chart dict (see results.Result).
+
+    Uses a fresh Agg Figure per render rather than pyplot, so concurrent
+    checks and requests never share figure state.  Identical chart data is
+    rendered once and then served from memory.
+    """
+    if fmt not in CONTENT_TYPES:
+        raise ValueError(f"Unknown chart format '{fmt}'.")
+    return _render(chart_spec(chart), fmt)
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _render(spec, fmt):
+    chart = json.loads(spec)
+    with metrics.CHART_SECONDS.time(kind=chart["kind"], format=fmt):
+        return _draw(chart, fmt)
+
+
+def _draw(chart, fmt):
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=chart.get("size", (6.4, 4.8)))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    if chart["kind"] == "pie":
+        ax.pie(chart["values"], labels=chart["labels"], autopct='%1.1f%%', colors=chart.get("colors"))
+        ax.axis('equal')
+    elif chart["kind"] == "bar":
+        ax.bar(chart["labels"], chart["values"], color=chart.get("colors"))
+        if chart.get("ylabel"):
+            ax.set_ylabel(chart["ylabel"])
+        ax.tick_params(axis="x", labelrotation=chart.get("rotate", 0))
+    else:
+        raise ValueError(f"Unknown chart kind '{chart['kind']}'.")
+    if chart.get("title"):
+        ax.set_title(chart["title"])
+
+    buffer = io.BytesIO()
+    # metadata=None keeps the output byte-identical across renders
+    fig.savefig(buffer, format=fmt, bbox_inches='tight',
+                metadata={"Date": None} if fmt == "svg" else {"Software": None})
+    return buffer.getvalue()
+
+
+def chart_data_uri(chart, fmt="svg"):
+    # Inline <img> source: nothing is written to static/
+    encoded = base64.b64encode(render_chart(chart, fmt)).decode("ascii")
+    return f"data:{CONTENT_TYPES[fmt]};base64,{encoded}"
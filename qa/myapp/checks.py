@@ -0,0 +1,776 @@
+import re
+import time
+import unicodedata
+from functools import lru_cache
+
+import pandas as pd
+from django.conf import settings
+
+from .aggregates import ADGROUP_KEYS, Partial, complete, sheet_aggregates
+from .charts import pie_chart
+from .keyword_scan import BMM_MARKER, keyword_scanner, season_calendar, season_date, season_key
+from .linkcheck import check_urls
+from .normalize import is_normalized, normalize_sheet, readonly_view
+from .results import ERROR, FAIL, INFO, MISSING, PASS, Result, Table, as_result
+from .url_cache import default_cache
+
+
+class Check:
+    # ``func`` receives a read-only view of a normalized sheet (see normalize.py)
+    # and returns a Result (see results.py).  With ``aggregates`` it also gets
+    # the sheet's shared per-ad-group totals (see aggregates.py).  ``partial``
+    # (an aggregates.Partial) lets it run on a sheet read in chunks.  ``inputs``
+    # returns a string of whatever else the result depends on (today's date,
+    # a setting), which the result cache keys on too.
+    def __init__(self, id, question, sheet, columns, func, kind="cpu", aggregates=False, partial=None,
+                 inputs=None):
+        self.id = id
+        self.question = question
+        self.sheet = sheet
+        self.columns = list(columns)
+        self.func = func
+        # "io" checks wait on the network, "cpu" checks only crunch the sheet
+        self.kind = kind
+        self.aggregates = aggregates
+        self.partial = partial
+        self.inputs = inputs
+
+    def __call__(self, df, aggregates=None):
+        if self.aggregates:
+            return self.func(df, aggregates or sheet_aggregates(df))
+        return self.func(df)
+
+    def __repr__(self):
+        return f"<Check {self.id} ({self.sheet})>"
+
+
+# Check ID -> Check, in checklist order
+CHECKS = {}
+
+
+def check(id, question, sheet, columns, kind="cpu", aggregates=False, partial=None, inputs=None):
+    def register(func):
+        if id in CHECKS:
+            raise ValueError(f"Duplicate check id '{id}'.")
+        CHECKS[id] = Check(id, question, sheet, columns, func, kind, aggregates, partial, inputs)
+        return func
+    return register
+
+
+# Row filters of the checks' Partials; a chunk may lack any of the columns
+
+def keyword_term_rows(chunk):
+    # Keywords with any term of the keyword scan (the BMM marker, seasonal terms)
+    column = 'Keyword Name' if 'Keyword Name' in chunk.columns else 'Keyword'
+    if column not in chunk.columns:
+        return None
+    return keyword_scanner().scan(chunk[column]).rows()
+
+
+def rarely_served_rows(chunk):
+    if 'Status Reason' not in chunk.columns:
+        return None
+    return chunk['Status Reason'] == "RARELY_SERVED"
+
+
+def final_url_rows(present):
+    # Non-display keywords with (present=True) or without a Final URL
+    def rows(chunk):
+        if not {'Keyword Final URLs', 'Adgroup Type'}.issubset(chunk.columns):
+            return None
+        urls = chunk['Keyword Final URLs'].notna() if present else chunk['Keyword Final URLs'].isnull()
+        return urls & (chunk['Adgroup Type'] != 'DISPLAY_STANDARD')
+    return rows
+
+
+class BrokenUrlPartial(Partial):
+    # Most keywords have a Final URL, so rather than keeping them all, each
+    # chunk's URLs not seen before are link-checked as the chunk is read, and
+    # only rows whose URL is broken (or went unchecked) are kept.  The check
+    # then finds those URLs in the URL cache.  All chunks share one
+    # LINK_CHECK_DEADLINE: past it, new URLs are kept unchecked without a request.
+    def marker(self):
+        candidates = final_url_rows(present=True)
+        seen = set()
+        kept = set()
+        stop_at = time.monotonic() + settings.LINK_CHECK_DEADLINE
+
+        def rows(chunk):
+            marked = candidates(chunk)
+            if marked is None:
+                return None
+            urls = chunk['Keyword Final URLs']
+            new = [url for url in urls[marked].unique() if url not in seen]
+            remaining = stop_at - time.monotonic()
+            if new and remaining <= 0:
+                seen.update(new)
+                kept.update(new)
+            elif new:
+                link_check = check_urls(
+                    new,
+                    max_workers=settings.LINK_CHECK_WORKERS,
+                    per_host=settings.LINK_CHECK_PER_HOST,
+                    timeout=settings.LINK_CHECK_TIMEOUT,
+                    deadline=remaining,
+                    cache=default_cache(),
+                )
+                seen.update(new)
+                kept.update(link_check.broken)
+                kept.update(link_check.unchecked)
+            return marked & urls.isin(kept)
+        return rows
+
+
+def zero_conversion_rows(adgroup_type, columns):
+    # Rows of ``adgroup_type`` with 0 (or blank) in any of ``columns``; row by row,
+    # so a segmented export's row without conversions counts even if another row has some
+    def rows(chunk):
+        if not {'Adgroup Type', *columns}.issubset(chunk.columns):
+            return None
+        zero = pd.concat([chunk[c].fillna(0) == 0 for c in columns], axis=1).any(axis=1)
+        return (chunk['Adgroup Type'] == adgroup_type) & zero
+    return rows
+
+
+search_zero_conversion_rows = zero_conversion_rows("SEARCH_STANDARD", ['Conversions'])
+display_zero_conversion_rows = zero_conversion_rows("DISPLAY_STANDARD", ['Conversions', 'View Through Conversions'])
+
+
+def eta_rows(chunk):
+    if 'Ad Type' not in chunk.columns:
+        return None
+    return chunk['Ad Type'] == 'EXPANDED_DYNAMIC_SEARCH_AD'
+
+
+# 1. Primary Conversion Action
+@check(
+    "primary_conversion_single",
+    "Is there only one primary conversion action?",
+    sheet="Conversions Tracking Data",
+    columns=['Conversion Action Category', 'Conversion Action Primary for Goal'],
+)
+def primary_conversion_single(df):
+    if {'Conversion Action Category', 'Conversion Action Primary for Goal'}.issubset(df.columns):
+        # Filter for rows where conversion action includes "purchase"
+        purchase_rows = df[df['Conversion Action Category'].astype(str).str.contains("purchase", case=False, na=False)]
+
+        # Count how many are marked as TRUE for primary conversion goal
+        primary_true_count = purchase_rows['Conversion Action Primary for Goal'].astype(str).str.upper().eq("TRUE").sum()
+
+        if primary_true_count == 1:
+            return Result(PASS, "Yes – Only one primary conversion action is marked under 'Purchase'.")
+        elif primary_true_count > 1:
+            return Result(FAIL, f"No – {primary_true_count} primary conversion actions are marked under 'Purchase'.")
+        else:
+            return Result(FAIL, "No – No primary conversion action is marked under 'Purchase'.")
+
+    return Result(MISSING, "Required columns 'Conversion Action' and 'Conversion Action Primary for Goal' are missing.")
+
+
+# 2. Primary Conversion "Purchase" capturing conversions
+@check(
+    "purchase_conversions_tracked",
+    'If the primary conversion action is "Purchase," is it capturing conversions and revenue properly?',
+    sheet="Conversions Tracking Data",
+    columns=['All Conversions', 'All Conversions Value', 'Conversions'],
+)
+def purchase_conversions_tracked(df):
+    if {'All Conversions', 'All Conversions Value'}.issubset(df.columns):
+        # Filter rows where the conversion name includes "purchase"
+        filtered = df[df['All Conversions'].astype(str).str.contains("purchase", case=False, na=False)]
+
+        # Check for additional optional 'Conversions' column
+        total_conversions = filtered['Conversions'].sum() if 'Conversions' in filtered.columns else 0
+        total_value = filtered['All Conversions Value'].fillna(0).sum()
+
+        if not filtered.empty and (total_conversions > 0 or total_value > 0):
+            return Result(PASS, "Yes – 'Purchase' is capturing conversions and revenue.")
+        else:
+            return Result(FAIL, "No – 'Purchase' is not capturing any conversions or revenue.")
+
+    return Result(MISSING, "Required columns 'All Conversions' and 'All Conversions Value' are missing.")
+
+
+# 3. Campaign names consistent
+@check(
+    "campaign_naming",
+    "Are campaign names consistent across the account?",
+    sheet="Campaign Data",
+    columns=['Campaign Name'],
+)
+def campaign_naming(df):
+    if 'Campaign Name' in df.columns:
+        inconsistent = df[~df['Campaign Name'].fillna("").str.startswith("NX_")]
+
+        if inconsistent.empty:
+            return Result(PASS, "All campaign names are consistent and start with 'NX_'.")
+        else:
+            summary = inconsistent[['Campaign Name']].drop_duplicates()
+            return Result(FAIL, f"{len(summary)} campaign(s) do not start with 'NX_':", [summary])
+
+    return Result(MISSING, "'Campaign Name' column is missing.")
+
+
+# 4. % ad groups with >20 keywords
+@check(
+    "adgroup_keyword_count",
+    "What percentage of ad groups have more than 20 keywords?",
+    sheet="Keyword Data",
+    columns=['Adgroup Name', 'Keyword Name'],
+    aggregates=True,
+    partial=Partial(adgroups=[['Adgroup Name']]),
+)
+def adgroup_keyword_count(df, aggregates):
+    if {'Adgroup Name', 'Keyword Name'}.issubset(df.columns):
+        group_counts = complete(aggregates.adgroups(['Adgroup Name']), ['Adgroup Name'])['Keywords']
+        more_than_20 = (group_counts > 20).sum()
+        total = len(group_counts)
+        pct = (more_than_20 / total) * 100 if total else 0
+
+        # Pie chart, drawn by whatever renders the result (none without ad groups)
+        chart = pie_chart([">20 Keywords", "20 or Fewer"], [int(more_than_20), int(total - more_than_20)],
+                          ["#ff9999", "#66b3ff"])
+
+        return Result(INFO, f"{pct:.1f}% of ad groups have more than 20 keywords.", chart=chart)
+
+    return Result(MISSING, "Required columns 'Adgroup Name' or 'Keyword Name' are missing.")
+
+
+# 5. Impression Share lost due to budget
+@check(
+    "budget_lost_impression_share",
+    "Are Search Campaigns or Display Campaigns with conversions losing Impression Share due to budget limitations?",
+    sheet="Campaign Data",
+    columns=['Campaign', 'Campaign Name', 'Campaign Type', 'Campaign Status', 'Conversions', 'Search Budget Lost Impression Share'],
+)
+def budget_lost_impression_share(df):
+    required_cols = {'Campaign Name', 'Campaign Type', 'Campaign Status', 'Conversions', 'Search Budget Lost Impression Share'}
+    if required_cols.issubset(df.columns):
+        filtered = df[
+            (df['Campaign Type'].isin(['SEARCH', 'DISPLAY'])) &
+            (df['Conversions'] > 0) &
+            (df['Search Budget Lost Impression Share'] > 10)
+        ]
+        if filtered.empty:
+            return Result(PASS, "No Search or Display campaigns with conversions are losing more than 10% Impression Share due to budget.")
+        else:
+            summary = filtered[['Campaign', 'Campaign Type', 'Conversions', 'Search Budget Lost Impression Share']].drop_duplicates()
+            return Result(FAIL, f"{len(summary)} campaigns with conversions are losing over 10% Impression Share due to budget:", [summary])
+    return Result(MISSING, "Required columns 'Campaign', 'Campaign Type', 'Conversions', or 'Search Budget Lost Impression Share' are missing.")
+
+
+# 6. Legacy BMM keywords
+@check(
+    "legacy_bmm_keywords",
+    "Are there any legacy BMM keywords?",
+    sheet="Keyword Data",
+    columns=['Keyword Name', 'Campaign Name', 'Adgroup Name'],
+    aggregates=True,
+    partial=Partial(rows=keyword_term_rows),
+)
+def legacy_bmm_keywords(df, aggregates):
+    if {'Keyword Name', 'Campaign Name', 'Adgroup Name'}.issubset(df.columns):
+        bmm = df[aggregates.keyword_terms('Keyword Name').rows([BMM_MARKER])]
+        if bmm.empty:
+            return Result(PASS, "No legacy BMM keywords found.")
+        else:
+            summary = bmm[['Keyword Name', 'Campaign Name', 'Adgroup Name']].drop_duplicates()
+            return Result(FAIL, f"{len(summary)} legacy BMM keywords found:", [summary])
+    return Result(MISSING, "Required columns 'Keyword', 'Campaign', or 'Ad group' are missing.")
+
+
+# 7. Active search ad groups with no conversions (90 days)
+@check(
+    "search_adgroups_no_conversions",
+    "Are there active search ad groups that have not had any conversions in the last 90 days?",
+    sheet="AdGroup Data",
+    columns=['Adgroup Type', 'Conversions', 'Campaign Name', 'Adgroup Name', 'Adgroup Status'],
+    partial=Partial(rows=search_zero_conversion_rows),
+)
+def search_adgroups_no_conversions(df):
+    if {'Adgroup Type', 'Conversions', 'Campaign Name', 'Adgroup Status'}.issubset(df.columns):
+        filtered = df[search_zero_conversion_rows(df)]
+        if filtered.empty:
+            return Result(PASS, "All active search ad groups have had at least one conversion in the last 90 days.")
+        else:
+            summary = filtered[['Campaign Name', 'Adgroup Name', 'Adgroup Status', 'Conversions']].drop_duplicates()
+            return Result(FAIL, f"{len(summary)} active search ad groups had 0 conversions in the last 90 days:", [summary])
+    return Result(MISSING, "Required columns 'Adgroup Type', 'Conversions', 'Campaign', or 'Ad group' are missing.")
+
+
+# 8. Seasonal keywords
+@check(
+    "seasonal_keywords",
+    "Are there any seasonal keywords, like back-to-school or holiday keywords running that are not relevant to the current season?",
+    sheet="Keyword Data",
+    columns=['Keyword Name', 'Keyword', 'Campaign Name', 'Adgroup Name'],
+    aggregates=True,
+    partial=Partial(rows=keyword_term_rows),
+    inputs=season_key,
+)
+def seasonal_keywords(df, aggregates):
+    column = 'Keyword Name' if 'Keyword Name' in df.columns else 'Keyword'
+    if column in df.columns:
+        calendar = season_calendar()
+        today = season_date()
+        matches = aggregates.keyword_terms(column)
+        seasonal_count = int(matches.rows(calendar.terms).sum())
+
+        # Seasonal terms whose season (see keyword_scan.py) doesn't include today
+        terms = matches.first(calendar.out_of_season(today))
+        out = pd.notna(terms)
+        if not out.any():
+            return Result(PASS, f"No out-of-season keywords on {today:%Y-%m-%d}; "
+                                f"{seasonal_count} seasonal keyword(s) are in season.")
+
+        seasons = [calendar.season_of[term] for term in terms[out]]
+        summary = df.loc[out, [c for c in ['Campaign Name', 'Adgroup Name', column] if c in df.columns]].copy()
+        summary['Season'] = [s.name for s in seasons]
+        summary['In season'] = [s.window for s in seasons]
+        summary = summary.reset_index(drop=True)
+        return Result(FAIL, f"{len(summary)} keyword(s) are out of season on {today:%Y-%m-%d}:", [summary])
+    return Result(MISSING, "'Keyword' column missing.")
+
+
+# 9. Low search volume keywords
+@check(
+    "low_search_volume_keywords",
+    "Are there active keywords with low search volumes that are not receiving enough impressions?",
+    sheet="Keyword Data",
+    columns=['Status Reason', 'Campaign Name', 'Adgroup Name', 'Keyword Name', 'Keyword MatchType'],
+    partial=Partial(rows=rarely_served_rows),
+)
+def low_search_volume_keywords(df):
+    required_cols = {'Status Reason', 'Campaign Name', 'Adgroup Name', 'Keyword Name', 'Keyword MatchType'}
+    if required_cols.issubset(df.columns):
+        low_volume = df[df['Status Reason'] == "RARELY_SERVED"]
+
+        if low_volume.empty:
+            return Result(PASS, "No active keywords are marked as low search volume (RARELY_SERVED).")
+        else:
+            summary = low_volume[['Campaign Name', 'Adgroup Name', 'Keyword Name', 'Keyword MatchType']].drop_duplicates()
+            return Result(FAIL, f"{len(summary)} keyword(s) are low search volume and rarely served:", [summary])
+
+    return Result(MISSING, "Required columns are missing: 'Status Reason', 'Campaign', 'Adgroup Name', 'Keyword', or 'Match Type'.")
+
+
+# 10. Negative dynamic targeting in DSAs
+@check(
+    "dsa_negative_targeting",
+    "Are negative dynamic targeting options set for all Dynamic Search Ads campaigns?",
+    sheet="DSA",
+    columns=['Campaign type', 'Dynamic ad target'],
+)
+def dsa_negative_targeting(df):
+    if 'Campaign type' in df.columns and 'Dynamic ad target' in df.columns:
+        dsa = df[df['Campaign type'].str.contains("Dynamic", case=False, na=False)]
+        missing = dsa[dsa['Dynamic ad target'].isnull()]
+        if missing.empty:
+            return Result(PASS, "All DSAs have negative targeting set.")
+        return Result(FAIL, f"{len(missing)} DSAs missing targeting rules.")
+    return Result(MISSING, "Columns missing.")
+
+
+# 11. Final URL relevance
+@check(
+    "keyword_final_urls",
+    "Are there landing pages (Final URL) at the keyword level, and are they relevant for the ad message, keywords, and targeting?",
+    sheet="Keyword Data",
+    columns=['Keyword Final URLs', 'Adgroup Type', 'Campaign Name', 'Adgroup Name', 'Keyword Name', 'Status Reason'],
+    partial=Partial(rows=final_url_rows(present=False)),
+)
+def keyword_final_urls(df):
+    required_cols = {'Keyword Final URLs', 'Adgroup Type', 'Campaign Name', 'Keyword Name'}
+    if required_cols.issubset(df.columns):
+        # Filter: Final URL is missing AND Adgroup Type is NOT DISPLAY_STANDARD
+        broken = df[df['Keyword Final URLs'].isnull() & (df['Adgroup Type'] != 'DISPLAY_STANDARD')]
+
+        if broken.empty:
+            return Result(PASS, "All relevant keywords have Final URLs (landing pages).")
+        else:
+            summary = broken[['Campaign Name', 'Adgroup Name', 'Keyword Name', 'Keyword Final URLs', 'Status Reason']].drop_duplicates()
+            return Result(FAIL, f"{len(summary)} keyword(s) are missing Final URLs (landing pages):", [summary])
+
+    return Result(MISSING, "Required columns missing: 'Final URL', 'Adgroup Type', 'Campaign', or 'Keyword'.")
+
+
+# 12. Broken links / redirections
+@check(
+    "broken_final_urls",
+    "Are there any broken links or redirections in final URLs?",
+    sheet="Keyword Data",
+    columns=['Keyword Final URLs', 'Adgroup Type', 'Campaign Name', 'Adgroup Name', 'Keyword Name'], kind="io",
+    partial=BrokenUrlPartial(),
+)
+def broken_final_urls(df):
+    required_cols = {'Keyword Final URLs', 'Adgroup Type', 'Campaign Name', 'Keyword Name'}
+    if required_cols.issubset(df.columns):
+        filtered = df[(df['Keyword Final URLs'].notna()) & (df['Adgroup Type'] != 'DISPLAY_STANDARD')]
+
+        link_check = check_urls(
+            filtered['Keyword Final URLs'].unique(),
+            max_workers=settings.LINK_CHECK_WORKERS,
+            per_host=settings.LINK_CHECK_PER_HOST,
+            timeout=settings.LINK_CHECK_TIMEOUT,
+            deadline=settings.LINK_CHECK_DEADLINE,
+            cache=default_cache(),
+        )
+        broken_urls = link_check.broken
+
+        note = (f" (URL cache: {link_check.cache_hits} hit(s), {link_check.cache_misses} miss(es), "
+                f"{link_check.revalidated} revalidated.)")
+        # Partial result: some URLs were still pending when the deadline hit
+        if link_check.timed_out:
+            note += f" ({len(link_check.unchecked)} URL(s) not checked before the {settings.LINK_CHECK_DEADLINE}s deadline.)"
+
+        if not broken_urls:
+            return Result(PASS, f"All URLs are working (no 404 errors detected).{note}")
+        else:
+            # Get details for broken URLs
+            broken_df = filtered[filtered['Keyword Final URLs'].isin(broken_urls)][['Campaign Name', 'Adgroup Name', 'Keyword Name', 'Keyword Final URLs']].drop_duplicates()
+            return Result(FAIL, f"{len(broken_df)} keywords have final URLs returning 404 error:{note}", [broken_df])
+
+    return Result(MISSING, "Required columns missing: 'Final URL', 'Adgroup Type', 'Campaign', or 'Keyword'.")
+
+
+# 13. Legacy ETAs
+@check(
+    "legacy_etas",
+    "Are there still legacy Expanded Text Ads (ETAs) live in the account?",
+    sheet="Ad Data",
+    columns=['Ad Type', 'Campaign Name', 'Adgroup Name'],
+    partial=Partial(rows=eta_rows),
+)
+def legacy_etas(df):
+    required_cols = {'Ad Type', 'Campaign Name', 'Adgroup Name'}
+    if required_cols.issubset(df.columns):
+        # Filter for ETA or Text Ad (case-insensitive)
+        eta = df[(df['Ad Type'] == 'EXPANDED_DYNAMIC_SEARCH_AD')]
+
+        if eta.empty:
+            return Result(PASS, "No legacy ETAs found.")
+        else:
+            # Group by Campaign and Adgroup, count ETAs
+            grouped = eta.groupby(['Campaign Name', 'Adgroup Name']).size().reset_index(name='ETA Count')
+            total_count = len(eta)
+            return Result(FAIL, f"{total_count} legacy ETAs found.", [grouped])
+
+    return Result(MISSING, "Required columns missing: 'Ad type', 'Campaign', or 'Adgroup Name'.")
+
+
+# 14. At least one RSA per ad group with excellent ad strength
+@check(
+    "rsa_excellent_strength",
+    "Is there at least one RSA per ad group with an ad strength of excellent?",
+    sheet="Ad Data",
+    columns=['Adgroup Name', 'Ad Type', 'Ad Strength', 'Campaign Name'],
+    aggregates=True,
+    partial=Partial(adgroups=[ADGROUP_KEYS]),
+)
+def rsa_excellent_strength(df, aggregates):
+    required_cols = {'Adgroup Name', 'Ad Type', 'Ad Strength', 'Campaign Name'}
+    if required_cols.issubset(df.columns):
+        # Ad groups with RSAs, with how many there are and how many are 'Excellent'
+        adgroups = complete(aggregates.adgroups())
+        summary = adgroups[adgroups['RSAs'] > 0].reset_index(drop=True)
+        summary = summary[[*ADGROUP_KEYS, 'RSAs', 'Excellent RSAs']].rename(
+            columns={'RSAs': 'Total RSA', 'Excellent RSAs': 'Excellent RSA'})
+
+        # Count ad groups missing Excellent RSAs
+        missing_count = (summary['Excellent RSA'] == 0).sum()
+
+        chart = pie_chart(["Has Excellent RSA", "No Excellent RSA"],
+                          [int(len(summary) - missing_count), int(missing_count)], ["#66b3ff", "#ff9999"])
+
+        if missing_count == 0:
+            return Result(PASS, "All ad groups have at least one RSA with excellent ad strength.", [summary], chart)
+        else:
+            missing_summary = summary[summary['Excellent RSA'] == 0]
+            return Result(FAIL, f"{missing_count} ad group(s) missing RSAs with excellent ad strength.", [
+                Table(summary, "Summary"),
+                Table(missing_summary, "Ad groups missing excellent RSAs"),
+            ], chart)
+    return Result(MISSING, "Required columns missing: 'Ad group', 'Ad type', 'Ad Strength', or 'Campaign'.")
+
+
+# 15. RSAs use all headlines/descriptions
+@check(
+    "rsa_asset_usage",
+    "Are the RSAs leveraging all available headlines (15) and description lines (4)?",
+    sheet="RSA Ad Data",
+    columns=['Ad Type', 'RSA Headlines Count', 'RSA Descriptions Count', 'Campaign Name', 'Adgroup Name'],
+    aggregates=True,
+    partial=Partial(adgroups=[ADGROUP_KEYS]),
+)
+def rsa_asset_usage(df, aggregates):
+    required_cols = {'Ad Type', 'RSA Headlines Count', 'RSA Descriptions Count', 'Campaign Name', 'Adgroup Name'}
+    if required_cols.issubset(df.columns):
+        adgroups = aggregates.adgroups()
+        if adgroups['Responsive Ads'].sum() == 0:
+            return Result(INFO, "No RSAs found.")
+
+        # Per Campaign and Adgroup: RSAs, and how many use 15 headlines and 4 descriptions
+        adgroups = complete(adgroups)
+        summary = adgroups[adgroups['Responsive Ads'] > 0].reset_index(drop=True)
+        summary = summary[[*ADGROUP_KEYS, 'Responsive Ads', 'Full Responsive Ads']].rename(
+            columns={'Responsive Ads': 'Total_RSAs', 'Full Responsive Ads': 'Pass_Criteria'})
+
+        underused_count = summary[summary['Pass_Criteria'] < summary['Total_RSAs']].shape[0]
+
+        chart = pie_chart(["All slots used", "Underutilized"],
+                          [int(len(summary) - underused_count), int(underused_count)], ["#66b3ff", "#ff9999"])
+
+        if underused_count == 0:
+            return Result(PASS, "All RSAs are using all headline and description slots.", [summary], chart)
+        else:
+            underused = summary[summary['Pass_Criteria'] < summary['Total_RSAs']]
+            return Result(FAIL, f"{underused_count} campaign/adgroup(s) have RSAs underutilizing headlines/descriptions.", [
+                Table(summary, "Summary"),
+                Table(underused, "Ad groups underutilizing RSA slots"),
+            ], chart)
+    return Result(MISSING, "Required columns missing: 'Ad type', 'Headlines', 'Descriptions', 'Campaign', or 'Adgroup Name'.")
+
+
+# 16. Ad extensions (sitelinks, callouts, etc.)
+@check(
+    "ad_extensions",
+    "Does the account have ad extensions implemented, such as sitelinks, callouts, calls, structured snippets, and promos?",
+    sheet="Extensions Data",
+    columns=['Campaign Name', 'Campaign Type', 'Feed Item Status', 'Extension Type'],
+)
+def ad_extensions(df):
+    # List of expected ad extension columns
+    extension_cols = ['Campaign Name', 'Campaign Type', 'Feed Item Status', 'Extension Type']
+
+    # Check which of them are actually in the dataframe
+    available_cols = [col for col in extension_cols if col in df.columns]
+
+    if not available_cols:
+        return Result(MISSING, "None of the required ad extension columns (Sitelinks, Callouts, Calls, Structured Snippets, Promotions) are present in the data.")
+
+    # Count missing/non-empty for each extension
+    summary = {}
+    sitelinks_count=0
+    callouts_count=0
+    snippets_count=0
+    promos_count=0
+    for col in available_cols:
+        total = len(df)
+        present = df[col].notnull().sum()
+        if present == 'sitelinks':
+            sitelinks_count+=1
+        elif present=='callouts':
+            callouts_count+=1
+        elif present=='snippets':
+            snippets_count+=1
+        elif present=='promos':
+            promos_count+=1
+        summary[col] = {
+            'Total Rows': total,
+            'With Extension': present,
+            'Missing': total - present,
+            'Coverage %': round((present / total) * 100, 1) if total > 0 else 0.0
+        }
+
+    # Convert to DataFrame
+    result_df = pd.DataFrame(summary).T.reset_index().rename(columns={'index': 'Extension Type'})
+
+    chart = {
+        "kind": "bar",
+        "labels": list(summary),
+        "values": [float(v['Coverage %']) for v in summary.values()],
+        "ylabel": "Coverage %",
+        "rotate": 20,
+    }
+
+    return Result(INFO, "Ad Extension Implementation Summary:", [result_df], chart)
+
+
+# 17. Sitelinks have descriptions
+@check(
+    "sitelink_descriptions",
+    "Do all sitelinks have expanded sitelink text filled in (descriptions)?",
+    sheet="Extensions",
+    columns=['Sitelink description'],
+)
+def sitelink_descriptions(df):
+    if 'Sitelink description' in df.columns:
+        missing = df['Sitelink description'].isnull().sum()
+        if missing == 0:
+            return Result(PASS, "All sitelinks have descriptions.")
+        return Result(FAIL, f"{missing} sitelinks missing descriptions.")
+    return Result(MISSING, "Column missing.")
+
+
+# 18. Affinity/In-Market audience in Observation
+@check(
+    "audience_observation_mode",
+    'Are Affinity and In-Market audiences applied to the campaigns in "Observation" mode at Campaign Level?',
+    sheet="Audiences",
+    columns=['Audience setting'],
+)
+def audience_observation_mode(df):
+    if 'Audience setting' in df.columns:
+        missing = df[~df['Audience setting'].str.contains("Observation", na=False, case=False)]
+        if missing.empty:
+            return Result(PASS, "Observation mode set for all.")
+        return Result(FAIL, f"{len(missing)} entries missing Observation mode.")
+    return Result(MISSING, "'Audience setting' column missing.")
+
+
+# 19. Performance Max: audience signals
+@check(
+    "pmax_audience_signals",
+    "Have both customer data and interests been included in the audience signal for Performance Max?",
+    sheet="Campaigns",
+    columns=['Audience signal'],
+)
+def pmax_audience_signals(df):
+    if 'Audience signal' in df.columns:
+        empty = df['Audience signal'].isnull().sum()
+        if empty == 0:
+            return Result(PASS, "All Performance Max campaigns have audience signals.")
+        return Result(FAIL, f"{empty} missing audience signals.")
+    return Result(MISSING, "Column missing.")
+
+
+# 20. Performance Max video assets
+@check(
+    "pmax_video_assets",
+    "Do Performance Max campaign asset groups have at least one customized video?",
+    sheet="Campaigns",
+    columns=['Video Asset'],
+)
+def pmax_video_assets(df):
+    if 'Video Asset' in df.columns:
+        missing = df['Video Asset'].isnull().sum()
+        if missing == 0:
+            return Result(PASS, "All asset groups have videos.")
+        return Result(FAIL, f"{missing} asset groups missing videos.")
+    return Result(MISSING, "Column missing.")
+
+
+# 21. Active display ad groups with no conversions or view-through conversions
+@check(
+    "display_adgroups_no_conversions",
+    "Are there active display ad groups with no conversions or view-through conversions in the last 90 days?",
+    sheet="AdGroup Data",
+    columns=['Adgroup Type', 'Conversions', 'View Through Conversions', 'Campaign Name', 'Adgroup Name'],
+    partial=Partial(rows=display_zero_conversion_rows),
+)
+def display_adgroups_no_conversions(df):
+    required_cols = {'Adgroup Type', 'Conversions', 'View Through Conversions', 'Campaign Name', 'Adgroup Name'}
+    if required_cols.issubset(df.columns):
+        filtered = df[display_zero_conversion_rows(df)]
+
+        if filtered.empty:
+            return Result(PASS, "All active display ad groups had either conversions or view-through conversions in the last 90 days.")
+        else:
+            output = filtered[['Campaign Name', 'Adgroup Name', 'Conversions', 'View Through Conversions']].drop_duplicates()
+            return Result(FAIL, f"{len(output)} active display ad groups had 0 conversions or view-through conversions:", [output])
+    else:
+        return Result(MISSING, "Required columns missing: 'Adgroup Type', 'Conversions', 'View-through Conversions', 'Campaign Name', or 'Adgroup Name'.")
+
+
+def normalize_question(text):
+    # Comparable form of a question: Unicode-normalized, straight quotes and
+    # hyphens, single spaces, case-folded
+    text = unicodedata.normalize("NFKC", text)
+    text = text.translate(str.maketrans({"\u2018": "'", "\u2019": "'", "\u201c": '"', "\u201d": '"',
+                                         "\u2013": "-", "\u2014": "-"}))
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+# Checklist question text -> check ID, resolved once at import
+QUESTION_TO_CHECK = {c.question: c.id for c in CHECKS.values()}
+NORMALIZED_QUESTION_TO_CHECK = {normalize_question(c.question): c.id for c in CHECKS.values()}
+
+
+def match_keywords(q):
+    # Free-text fallback for questions outside the checklist: the original substring rules
+    q = q.lower()
+    if "only one primary conversion action" in q:
+        return "primary_conversion_single"
+    elif "purchase" in q and "conversions and revenue" in q:
+        return "purchase_conversions_tracked"
+    elif "campaign names consistent" in q:
+        return "campaign_naming"
+    elif "ad groups" in q and "20 keywords" in q:
+        return "adgroup_keyword_count"
+    elif "impression share" in q and "budget" in q:
+        return "budget_lost_impression_share"
+    elif "legacy bmm keywords" in q:
+        return "legacy_bmm_keywords"
+    elif "search ad groups" in q and ("no conversions" in q or "not had any conversions" in q):
+        return "search_adgroups_no_conversions"
+    elif "seasonal keywords" in q:
+        return "seasonal_keywords"
+    elif "low search volume" in q or "rarely_served" in q:
+        return "low_search_volume_keywords"
+    elif "negative dynamic targeting" in q:
+        return "dsa_negative_targeting"
+    elif "landing pages" in q and "final url" in q:
+        return "keyword_final_urls"
+    elif "broken links" in q or "redirects" in q:
+        return "broken_final_urls"
+    elif "legacy expanded text ads" in q or "legacy" in q and "account" in q:
+        return "legacy_etas"
+    elif "rsa per ad group" in q or "ad strength" in q and "excellent" in q:
+        return "rsa_excellent_strength"
+    elif "rsa" in q and ("headlines" in q or "descriptions" in q):
+        return "rsa_asset_usage"
+    elif "ad extensions" in q:
+        return "ad_extensions"
+    elif "sitelink descriptions" in q:
+        return "sitelink_descriptions"
+    elif "affinity" in q or "in-market" in q:
+        return "audience_observation_mode"
+    elif "performance max" in q and "audience signal" in q:
+        return "pmax_audience_signals"
+    elif "performance max" in q and "video" in q:
+        return "pmax_video_assets"
+    elif "display ad groups" in q and ("no conversions" in q or "view-through conversions" in q):
+        return "display_adgroups_no_conversions"
+    return None
+
+
+@lru_cache(maxsize=256)
+def resolve_question(question):
+    # Checklist text (exact, then ignoring case, spacing and quote style), then a
+    # confident match from the free-text index, then the keyword rules
+    found = QUESTION_TO_CHECK.get(question.strip()) or NORMALIZED_QUESTION_TO_CHECK.get(normalize_question(question))
+    if found:
+        return found
+    from .question_index import match_question
+    match = match_question(question)
+    return match.check_id if match.confident else match_keywords(question)
+
+
+def columns_by_sheet(checks=None):
+    # Union of the columns every check mapped to a sheet needs
+    columns = {}
+    for c in checks or CHECKS.values():
+        columns.setdefault(c.sheet, set()).update(c.columns)
+    return columns
+
+
+def partials_by_sheet(checks=None):
+    # Sheets every one of whose checks has a Partial: {sheet: [Partial, ...]}
+    partials = {}
+    for c in checks or CHECKS.values():
+        partials.setdefault(c.sheet, []).append(c.partial)
+    return {sheet: found for sheet, found in partials.items() if None not in found}
+
+
+def run_check(check_id, df):
+    # Sheets from LazyWorkbook arrive normalized; anything else is normalized here
+    try:
+        if not is_normalized(df):
+            df = normalize_sheet(df.copy())
+        c = CHECKS[check_id]
+        if c.aggregates:
+            # Totals are shared by every check on this sheet, so they hang off the sheet, not the view
+            return as_result(c(readonly_view(df), sheet_aggregates(df)))
+        return as_result(c(readonly_view(df)))
+    except Exception as e:
+        return Result(ERROR, f"Error: {e}")
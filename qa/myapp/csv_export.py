@@ -0,0 +1,254 @@
+import codecs
+import csv
+import os
+import re
+import zipfile
+
+import pandas as pd
+from django.conf import settings
+
+# Google Ads exports of large accounts come as CSV or TSV files, often
+# zipped, one file per report.  CsvExportReader reads them like a workbook:
+# each file is a sheet, named after the checklist sheet its file name (or
+# failing that, its header) matches.  Files are read in chunks of
+# QA_CSV_CHUNK_ROWS rows with every column as text, and the numeric columns
+# the checks compare are converted explicitly, so no chunk guesses its own
+# types.  LazyWorkbook can hand the chunks to reduce_chunks (see
+# aggregates.py) to audit sheets too big to load.
+
+CSV_EXTENSIONS = (".csv", ".tsv", ".txt")
+
+OLE2_SIGNATURE = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+ZIP_SIGNATURE = b"PK\x03\x04"
+
+SEPARATORS = [",", "\t", ";", "|"]
+
+# Read as numbers; thousands separators and "%" signs are dropped first
+NUMERIC_COLUMNS = [
+    'Conversions', 'View Through Conversions', 'All Conversions Value', 'Search Budget Lost Impression Share',
+    'RSA Headlines Count', 'RSA Descriptions Count', 'Impressions', 'Clicks', 'Cost',
+]
+
+# "--" is how Google Ads writes an empty cell
+NA_VALUES = ["--"]
+
+# Bytes looked at to find the encoding, separator and header line
+SNIFF_BYTES = 64 * 1024
+
+
+def read_head(source, size):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return f.read(size)
+    source.seek(0)
+    head = source.read(size)
+    source.seek(0)
+    return head
+
+
+def is_csv_export(source):
+    # Neither an .xlsx (a zip with [Content_Types].xml) nor an .xls (OLE2 file)
+    head = read_head(source, len(OLE2_SIGNATURE))
+    if head.startswith(ZIP_SIGNATURE):
+        try:
+            with zipfile.ZipFile(source) as archive:
+                return "[Content_Types].xml" not in archive.namelist()
+        except zipfile.BadZipFile:
+            return False
+        finally:
+            if hasattr(source, "seek"):
+                source.seek(0)
+    return bool(head) and not head.startswith(OLE2_SIGNATURE)
+
+
+def squash(name):
+    return re.sub(r"[^a-z0-9]", "", name.lower())
+
+
+def to_number(values):
+    # "1,234" -> 1234, "12.5%" -> 12.5; anything else that isn't a number -> NaN
+    return pd.to_numeric(values.str.replace(r"[,%\s]", "", regex=True), errors="coerce")
+
+
+class CsvFormat:
+    """Encoding, separator and number of title lines above the header of one file."""
+
+    def __init__(self, encoding, sep, skiprows, header):
+        self.encoding = encoding
+        self.sep = sep
+        self.skiprows = skiprows
+        self.header = header        # column names, stripped
+
+    @classmethod
+    def sniff(cls, head, extension=""):
+        if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            encoding = "utf-16"
+        elif head.startswith(codecs.BOM_UTF8):
+            encoding = "utf-8-sig"
+        else:
+            encoding = "utf-8"
+            try:
+                codecs.getincrementaldecoder("utf-8")().decode(head)
+            except UnicodeDecodeError:
+                encoding = "cp1252"
+        text = codecs.getincrementaldecoder(encoding)(errors="replace").decode(head)
+        lines = text.splitlines()
+        if len(head) == SNIFF_BYTES and len(lines) > 1:
+            lines = lines[:-1]      # cut off mid-line
+        lines = lines[:50]
+
+        # The separator splitting some line into the most fields; tabs first for .tsv
+        candidates = ["\t", *SEPARATORS] if extension == ".tsv" else SEPARATORS
+        best = None
+        for sep in candidates:
+            counts = [len(fields) for fields in csv.reader(lines, delimiter=sep)]
+            widest = max(counts, default=0)
+            if best is None or widest > best[1]:
+                best = (sep, widest, counts)
+        sep, widest, counts = best
+        # Report exports put a title and a date range above the header
+        skiprows = next((i for i, count in enumerate(counts) if count == widest), 0)
+        header = next(csv.reader(lines[skiprows:skiprows + 1], delimiter=sep), [])
+        return cls(encoding, sep, skiprows, [c.strip() for c in header])
+
+
+class CsvExportReader:
+    """A CSV/TSV file, or a zip of them, read like a workbook (see readers.py).
+
+    ``sheets`` maps each checklist sheet name to the file holding it.
+    ``chunks`` yields the raw rows of a sheet QA_CSV_CHUNK_ROWS at a time;
+    ``parse`` reads them all.
+    """
+
+    engine = "csv"
+
+    def __init__(self, source, chunk_rows=None, columns_by_sheet=None):
+        self.source = source
+        self.chunk_rows = chunk_rows or settings.QA_CSV_CHUNK_ROWS
+        self.archive = zipfile.ZipFile(source) if read_head(source, 4) == ZIP_SIGNATURE else None
+        if columns_by_sheet is None:
+            from .checks import columns_by_sheet as all_columns
+            columns_by_sheet = all_columns()
+
+        members = self._members()
+        formats = {m: CsvFormat.sniff(self._head(m), os.path.splitext(m)[1].lower()) for m in members}
+        self.formats = formats
+        self.sheets = match_sheets(members, formats, columns_by_sheet)
+
+    def _members(self):
+        if self.archive is None:
+            return [os.path.basename(getattr(self.source, "name", None) or str(self.source))]
+        return sorted(
+            info.filename for info in self.archive.infolist()
+            if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+            and not os.path.basename(info.filename).startswith(".")
+            and info.filename.lower().endswith(CSV_EXTENSIONS)
+        )
+
+    def _open(self, member):
+        if self.archive is not None:
+            return self.archive.open(member)
+        if isinstance(self.source, (str, os.PathLike)):
+            return open(self.source, "rb")
+        self.source.seek(0)
+        return _Unclosed(self.source)
+
+    def _head(self, member):
+        with self._open(member) as f:
+            return f.read(SNIFF_BYTES)
+
+    @property
+    def sheet_names(self):
+        return list(self.sheets)
+
+    def size(self, sheet_name):
+        # Uncompressed bytes of the sheet's file
+        member = self.sheets[sheet_name]
+        if self.archive is not None:
+            return self.archive.getinfo(member).file_size
+        return os.path.getsize(self.source) if isinstance(self.source, (str, os.PathLike)) else _handle_size(self.source)
+
+    def chunks(self, sheet_name, usecols=None):
+        member = self.sheets[sheet_name]
+        fmt = self.formats[member]
+        with self._open(member) as f:
+            reader = pd.read_csv(
+                f, sep=fmt.sep, encoding=fmt.encoding, skiprows=fmt.skiprows,
+                usecols=usecols, dtype=str, na_values=NA_VALUES, skipinitialspace=True,
+                chunksize=self.chunk_rows, on_bad_lines="warn",
+            )
+            empty = True
+            with reader:
+                for chunk in reader:
+                    empty = False
+                    yield convert_chunk(chunk)
+            if empty:
+                # Only a header: still one (empty) chunk with the columns
+                columns = [c for c in fmt.header if usecols is None or usecols(c)]
+                yield pd.DataFrame({c: pd.Series(dtype=str) for c in columns})
+
+    def parse(self, sheet_name, usecols=None):
+        return pd.concat(list(self.chunks(sheet_name, usecols)), ignore_index=True)
+
+    def close(self):
+        if self.archive is not None:
+            self.archive.close()
+
+
+class _Unclosed:
+    # An upload's file handle, left open when the CSV parser is done with it
+    def __init__(self, handle):
+        self.handle = handle
+
+    def __enter__(self):
+        return self.handle
+
+    def __exit__(self, *exc):
+        self.handle.seek(0)
+
+
+def _handle_size(handle):
+    position = handle.tell()
+    handle.seek(0, os.SEEK_END)
+    size = handle.tell()
+    handle.seek(position)
+    return size
+
+
+def convert_chunk(chunk):
+    chunk.columns = [c.strip() if isinstance(c, str) else c for c in chunk.columns]
+    for col in NUMERIC_COLUMNS:
+        if col in chunk.columns:
+            chunk[col] = to_number(chunk[col])
+    return chunk
+
+
+def match_sheets(members, formats, columns_by_sheet):
+    """{sheet name: file}: by file name first ("keyword_data.csv" is 'Keyword Data'), then by header.
+
+    A file whose name matches no sheet goes to the sheet whose columns its
+    header shares most (at least two, or all of a one-column sheet).  Files
+    matching nothing keep their file name as the sheet name.
+    """
+    by_name = {squash(sheet): sheet for sheet in columns_by_sheet}
+    sheets = {}
+    rest = []
+    for member in members:
+        sheet = by_name.get(squash(os.path.splitext(os.path.basename(member))[0]))
+        if sheet is not None and sheet not in sheets:
+            sheets[sheet] = member
+        else:
+            rest.append(member)
+
+    for member in rest:
+        header = set(formats[member].header)
+        best = None
+        for sheet, columns in columns_by_sheet.items():
+            if sheet in sheets:
+                continue
+            shared = len(header & {c.strip() for c in columns})
+            if shared >= min(2, len(columns)) and (best is None or shared > best[1]):
+                best = (sheet, shared)
+        name = best[0] if best else os.path.splitext(os.path.basename(member))[0]
+        sheets.setdefault(name, member)
+    return sheets
@@ -0,0 +1,310 @@
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.utils import timezone
+
+from .aggregates import is_reduced
+from .results import FAIL, INFO, PASS, Result, Table, split_json
+from .snapshots import write_atomic
+
+# Differential audits: what changed in an account since its last audit.
+# Each audit leaves one state file per account with a fingerprint of every
+# row of the sheets the checks read, and the issues each check found.  The
+# next audit of the account joins its own fingerprints against those to
+# count added, removed and changed entities (keywords, ad groups, ...), and
+# compares issues to list the new and the resolved ones.
+#
+# A failing check's issues are the rows of its last table; a failing check
+# without tables is one issue.  Checks that were missing or crashed in
+# either audit are not compared, and keep their earlier issues for the next.
+
+logger = logging.getLogger(__name__)
+
+HISTORY_VERSION = "1"
+
+DIFF_QUESTION = "What changed since this account's last audit?"
+
+# Sheet -> (what its rows are, the columns identifying one).  Key columns the
+# checks don't read are left out; a sheet without any is compared row by row.
+ENTITIES = {
+    "Keyword Data": ("keywords", ["Campaign Name", "Adgroup Name", "Keyword Name", "Keyword MatchType"]),
+    "AdGroup Data": ("ad groups", ["Campaign Name", "Adgroup Name"]),
+    "Campaign Data": ("campaigns", ["Campaign Name"]),
+    "Ad Data": ("ads", None),
+    "RSA Ad Data": ("ads", None),
+}
+
+# Copy and date suffixes of export file names, dropped to get the account
+_name_noise_re = re.compile(r"\(\d+\)|\d{4}-?\d{2}-?\d{2}(?:[t_ -]?\d{2}[:.-]?\d{2}(?:[:.-]?\d{2})?)?|\bcopy\b")
+
+
+def account_key(upload_name):
+    # "Acme Search - 2026-10-01 (1).xlsx" -> "acme search"
+    stem = os.path.splitext(os.path.basename(upload_name))[0].lower()
+    stem = _name_noise_re.sub(" ", stem)
+    return re.sub(r"[\s_.-]+", " ", stem).strip() or "unnamed"
+
+
+class SheetFingerprints:
+    """One uint64 hash per row of a sheet, for its entity and for its whole content."""
+
+    def __init__(self, entities, rows, columns):
+        self.entities = entities
+        self.rows = rows
+        self.columns = columns      # the columns ``rows`` covers
+
+    @classmethod
+    def of(cls, sheet_name, df):
+        columns = sorted(str(c) for c in df.columns)
+        # Each column is hashed once; rows and entities combine the column hashes
+        hashes = {c: column_hash(df[c]) for c in columns}
+        rows = combine_hashes([hashes[c] for c in columns], len(df))
+        keys = [k for k in ENTITIES.get(sheet_name, ("rows", None))[1] or [] if k in df.columns]
+        entities = combine_hashes([hashes[k] for k in keys], len(df)) if keys else rows
+        return cls(entities, rows, columns)
+
+
+def column_hash(values):
+    # Floats to 10 decimals (as in result tables), so re-exported rounding noise isn't a change
+    if pd.api.types.is_float_dtype(values):
+        values = values.round(10)
+    return pd.util.hash_pandas_object(values, index=False).to_numpy()
+
+
+def combine_hashes(hashes, length):
+    # Order-dependent mix of per-column uint64 hashes into one per row (wraps around)
+    combined = np.full(length, 0x345678, dtype=np.uint64)
+    for h in hashes:
+        combined = (combined ^ h) * np.uint64(1000003)
+    return combined
+
+
+class SheetChanges:
+    def __init__(self, sheet, entity, added, removed, changed, unchanged):
+        self.sheet = sheet
+        self.entity = entity
+        self.added = added
+        self.removed = removed
+        self.changed = changed      # None when the sheet was read for other columns last time
+        self.unchanged = unchanged  # None with ``changed``
+
+    @property
+    def any(self):
+        return bool(self.added or self.removed or self.changed)
+
+
+def compare_sheet(sheet_name, before, after):
+    """Added, removed and changed entities between two fingerprints of a sheet.
+
+    Entities are matched by hash (``isin`` builds a hash table of one side);
+    an entity in both is changed when any of its rows has no identical row
+    on the other side.
+    """
+    old = pd.Index(before.entities).unique()
+    new = pd.Index(after.entities).unique()
+    added = int((~new.isin(old)).sum())
+    removed = int((~old.isin(new)).sum())
+    kept = len(new) - added
+    changed = None
+    if before.columns == after.columns:
+        moved = np.concatenate([
+            after.entities[~pd.Index(after.rows).isin(before.rows)],
+            before.entities[~pd.Index(before.rows).isin(after.rows)],
+        ])
+        changed = int(pd.Index(moved).unique().isin(old.intersection(new)).sum())
+    entity = ENTITIES.get(sheet_name, ("rows", None))[0]
+    return SheetChanges(sheet_name, entity, added, removed, changed, None if changed is None else kept - changed)
+
+
+def issue_rows(result):
+    # {row key: row text} of the issues in a check's result (see the top of this module)
+    if result.status != FAIL:
+        return {}
+    if not result.tables:
+        return {"": result.message}
+    table = split_json(result.tables[-1].df)
+    issues = {}
+    for row in table["data"]:
+        cells = dict(zip(table["columns"], row))
+        key = json.dumps(cells, sort_keys=True, default=str)
+        issues[key] = " · ".join(f"{c}: {v}" for c, v in cells.items() if v is not None and v != "")
+    return issues
+
+
+def compared(status):
+    return status in (PASS, FAIL, INFO)
+
+
+class AccountState:
+    """What the last audit of an account left behind."""
+
+    def __init__(self, account, audited_at, upload_name, sheets, checks):
+        self.account = account
+        self.audited_at = audited_at      # ISO timestamp
+        self.upload_name = upload_name
+        self.sheets = sheets              # {sheet name: SheetFingerprints}
+        self.checks = checks              # {check id: {"question", "status", "issues": {key: text}}}
+
+    def to_bytes(self):
+        arrays = {}
+        sheets = {}
+        for i, (name, fingerprints) in enumerate(self.sheets.items()):
+            arrays[f"entities_{i}"] = fingerprints.entities
+            arrays[f"rows_{i}"] = fingerprints.rows
+            sheets[name] = {"index": i, "columns": fingerprints.columns}
+        meta = {"version": HISTORY_VERSION, "account": self.account, "audited_at": self.audited_at,
+                "upload_name": self.upload_name, "sheets": sheets, "checks": self.checks}
+        arrays["meta"] = np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8)
+        buffer = io.BytesIO()
+        np.savez(buffer, **arrays)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_file(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+            if meta.get("version") != HISTORY_VERSION:
+                return None
+            sheets = {name: SheetFingerprints(data[f"entities_{s['index']}"], data[f"rows_{s['index']}"], s["columns"])
+                      for name, s in meta["sheets"].items()}
+        return cls(meta["account"], meta["audited_at"], meta["upload_name"], sheets, meta["checks"])
+
+
+class AccountHistory:
+    """The latest audit state of each account under ``directory``.
+
+    One file per account, replaced whole by every audit of it.  Past
+    ``max_accounts`` the accounts audited least recently are forgotten.
+    """
+
+    def __init__(self, directory, max_accounts):
+        self.directory = str(directory)
+        self.max_accounts = max_accounts
+
+    def path(self, account):
+        return os.path.join(self.directory, hashlib.sha1(account.encode("utf-8")).hexdigest()[:16] + ".npz")
+
+    def load(self, account):
+        try:
+            return AccountState.from_file(self.path(account))
+        except FileNotFoundError:
+            return None
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning("Ignoring audit history of account '%s': %s", account, e)
+            return None
+
+    def save(self, state):
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            write_atomic(self.path(state.account), state.to_bytes())
+        except OSError as e:
+            logger.warning("Could not save audit history of account '%s': %s", state.account, e)
+            return
+        self.evict()
+
+    def evict(self):
+        try:
+            entries = sorted((entry.stat().st_mtime, entry.path) for entry in os.scandir(self.directory)
+                             if entry.name.endswith(".npz"))
+        except OSError:
+            return
+        for _, path in entries[:max(0, len(entries) - self.max_accounts)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def default_history():
+    if not settings.QA_DIFF:
+        return None
+    return AccountHistory(settings.QA_DIFF_DIR, settings.QA_DIFF_MAX_ACCOUNTS)
+
+
+def audit_changes(history, account, upload_name, sheet_dict, entries, results):
+    """Record this audit for ``account`` and return the results row describing what changed.
+
+    ``entries`` are the catalog entries ``results`` were run for, in the same order.
+    """
+    previous = history.load(account)
+
+    sheets = {}
+    for sheet_name in {e.check.sheet for e in entries if e.check is not None}:
+        df = sheet_dict.get(sheet_name)
+        # Reduced sheets (see aggregates.py) only hold some of their rows
+        if df is not None and not is_reduced(df):
+            sheets[sheet_name] = SheetFingerprints.of(sheet_name, df)
+
+    checks = {}
+    for entry, row in zip(entries, results):
+        result = row["Result"]
+        if entry.check_id is None:
+            continue
+        if compared(result.status):
+            checks[entry.check_id] = {"question": entry.question, "status": result.status,
+                                      "issues": issue_rows(result)}
+        elif previous is not None and entry.check_id in previous.checks:
+            # Nothing to compare against next time; keep what the last audit found
+            checks[entry.check_id] = previous.checks[entry.check_id]
+
+    history.save(AccountState(account, timezone.now().isoformat(timespec="seconds"), upload_name, sheets, checks))
+
+    if previous is None:
+        result = Result(INFO, f"First audit of account '{account}'; the next one will list what changed since.")
+    else:
+        result = describe_changes(previous, sheets, checks, results_by_check(entries, results))
+    return {"Question": DIFF_QUESTION, "Result": result, "Time": 0.0}
+
+
+def results_by_check(entries, results):
+    return {e.check_id: row["Result"] for e, row in zip(entries, results) if e.check_id is not None}
+
+
+def describe_changes(previous, sheets, checks, current_results):
+    sheet_changes = [compare_sheet(name, previous.sheets[name], fingerprints)
+                     for name, fingerprints in sorted(sheets.items()) if name in previous.sheets]
+
+    by_check = []
+    new_rows = []
+    resolved_rows = []
+    for check_id, now in checks.items():
+        before = previous.checks.get(check_id)
+        if before is None or not compared(current_results[check_id].status):
+            continue
+        new = [text for key, text in now["issues"].items() if key not in before["issues"]]
+        resolved = [text for key, text in before["issues"].items() if key not in now["issues"]]
+        by_check.append({"Question": now["question"], "Before": before["status"], "Now": now["status"],
+                         "New issues": len(new), "Resolved issues": len(resolved)})
+        new_rows += [{"Question": now["question"], "Issue": text} for text in new]
+        resolved_rows += [{"Question": now["question"], "Issue": text} for text in resolved]
+
+    audited = previous.audited_at.replace("T", " ")[:16]
+    message = (f"Since the audit of {audited} ({previous.upload_name}): "
+               f"{len(new_rows)} new issue(s), {len(resolved_rows)} resolved.")
+    moved = [c for c in sheet_changes if c.any]
+    if moved:
+        message += " " + "; ".join(
+            f"{c.sheet}: {c.added} {c.entity} added, {c.removed} removed"
+            + ("" if c.changed is None else f", {c.changed} changed") for c in moved) + "."
+    elif sheet_changes:
+        message += " No rows changed."
+
+    tables = []
+    if by_check:
+        tables.append(Table(pd.DataFrame(by_check), "Issues by check"))
+    if new_rows:
+        tables.append(Table(pd.DataFrame(new_rows), "New issues"))
+    if resolved_rows:
+        tables.append(Table(pd.DataFrame(resolved_rows), "Resolved issues"))
+    if sheet_changes:
+        tables.append(Table(pd.DataFrame([
+            {"Sheet": c.sheet, "Entities": c.entity, "Added": c.added, "Removed": c.removed,
+             "Changed": c.changed, "Unchanged": c.unchanged} for c in sheet_changes]), "Changes by sheet"))
+    return Result(INFO, message, tables)
@@ -0,0 +1,208 @@
+import importlib.util
+import math
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.db import connections
+
+from .aggregates import is_reduced
+from .checks import CHECKS, run_check
+
+
+class CheckOutcome:
+    def __init__(self, result=None, seconds=0.0, error=None, timed_out=False):
+        self.result = result
+        self.seconds = seconds
+        self.error = error          # exception raised outside the check itself
+        self.timed_out = timed_out
+
+
+def arrow_available():
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+# Process pool --------------------------------------------------------------
+#
+# CPU-heavy checks on large sheets run in worker processes.  Sheets are not
+# pickled across: the parent writes each one once as an uncompressed Arrow
+# IPC file and the workers memory-map it.
+
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def _init_worker():
+    import django
+    django.setup()
+    from .warmup import warm_up
+    warm_up()
+
+
+def get_process_pool(workers):
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            # spawn: never fork a process that already runs server threads
+            _process_pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+        return _process_pool
+
+
+def discard_process_pool(pool):
+    # A worker died (BrokenProcessPool): build a fresh pool on next use
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is pool:
+            _process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def write_arrow(df, path):
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def read_arrow(path):
+    import pyarrow as pa
+
+    with pa.memory_map(path, "r") as source:
+        df = pa.ipc.open_file(source).read_all().to_pandas()
+    # The file was written from a normalized sheet
+    df.attrs["normalized"] = True
+    return df
+
+
+def _run_in_process(check_id, arrow_path):
+    started = time.perf_counter()
+    result = run_check(check_id, read_arrow(arrow_path))
+    return result, time.perf_counter() - started
+
+
+def _run_in_thread(check_id, df, started_at, index):
+    # started_at[index]: when the check left the queue (timeouts count from there)
+    started_at[index] = time.monotonic()
+    started = time.perf_counter()
+    try:
+        result = run_check(check_id, df)
+    finally:
+        # Checks like the URL cache open a DB connection on this pool thread
+        connections.close_all()
+    return result, time.perf_counter() - started
+
+
+# Executor ------------------------------------------------------------------
+
+# How often queued checks are looked at to see whether they have started
+START_POLL_SECONDS = 0.1
+
+def execute_checks(tasks, timeout=120, thread_workers=8, process_workers=0, process_min_rows=50000,
+                   on_complete=None):
+    """Run ``[(check_id, df), ...]`` concurrently.
+
+    I/O-bound checks and small sheets go to a thread pool; "cpu" checks on
+    sheets with at least ``process_min_rows`` rows go to the process pool
+    when ``process_workers`` > 0 and pyarrow is installed.  Returns one
+    CheckOutcome per task, in task order.  A check still running
+    ``timeout`` seconds after it started is reported as timed out; checks
+    queued behind others don't use up their time while they wait.  A check
+    that hasn't started by the time every batch of its pool should have
+    finished (workers stuck on timed-out checks) times out too.
+    ``on_complete(index, outcome)`` is called from the calling thread as
+    each task finishes.
+    """
+    outcomes = [None] * len(tasks)
+    if not tasks:
+        return outcomes
+
+    def finish(index, outcome):
+        outcomes[index] = outcome
+        if on_complete is not None:
+            on_complete(index, outcome)
+
+    use_processes = process_workers > 0 and arrow_available()
+    threads = ThreadPoolExecutor(max_workers=thread_workers, thread_name_prefix="qa-check")
+    arrow_dir = tempfile.TemporaryDirectory(prefix="qa_sheets_", ignore_cleanup_errors=True) if use_processes else None
+    arrow_paths = {}
+    futures = {}        # future -> (index, submitted at, process pool or None)
+    started_at = {}     # index -> when the check started running
+
+    try:
+        for index, (check_id, df) in enumerate(tasks):
+            check = CHECKS[check_id]
+            future = None
+            if use_processes and check.kind == "cpu" and len(df) >= process_min_rows and not is_reduced(df):
+                path = arrow_paths.get(id(df))
+                if path is None:
+                    try:
+                        path = os.path.join(arrow_dir.name, f"sheet_{len(arrow_paths)}.arrow")
+                        write_arrow(df, path)
+                    except Exception:
+                        # e.g. non-string headers or mixed object columns: stay in-process
+                        path = ""
+                    arrow_paths[id(df)] = path
+                if path:
+                    pool = get_process_pool(process_workers)
+                    future = pool.submit(_run_in_process, check_id, path)
+                    futures[future] = (index, time.monotonic(), pool)
+            if future is None:
+                future = threads.submit(_run_in_thread, check_id, df, started_at, index)
+                futures[future] = (index, time.monotonic(), None)
+
+        in_processes = sum(1 for _, _, pool in futures.values() if pool is not None)
+        budgets = {
+            False: timeout * math.ceil((len(futures) - in_processes) / thread_workers),
+            True: timeout * math.ceil(in_processes / max(process_workers, 1)),
+        }
+
+        def deadline(future):
+            index, submitted, pool = futures[future]
+            # A process pool future is "running" once it is handed to a worker
+            if pool is not None and index not in started_at and future.running():
+                started_at[index] = time.monotonic()
+            if index in started_at:
+                return started_at[index] + timeout
+            return submitted + budgets[pool is not None]
+
+        pending = set(futures)
+        while pending:
+            now = time.monotonic()
+            wake = min(deadline(f) for f in pending) - now
+            if any(futures[f][0] not in started_at for f in pending):
+                wake = min(wake, START_POLL_SECONDS)
+            done, pending = wait(pending, timeout=max(wake, 0), return_when="FIRST_COMPLETED")
+            for future in done:
+                index, submitted, pool = futures[future]
+                try:
+                    result, seconds = future.result()
+                    outcome = CheckOutcome(result=result, seconds=seconds)
+                except BrokenProcessPool as e:
+                    # Only the pool these futures came from is broken
+                    discard_process_pool(pool)
+                    outcome = CheckOutcome(error=e, seconds=time.monotonic() - started_at.get(index, submitted))
+                except Exception as e:
+                    outcome = CheckOutcome(error=e, seconds=time.monotonic() - started_at.get(index, submitted))
+                finish(index, outcome)
+            now = time.monotonic()
+            for future in [f for f in pending if deadline(f) <= now]:
+                future.cancel()
+                finish(futures[future][0], CheckOutcome(seconds=timeout, timed_out=True))
+                pending.discard(future)
+    finally:
+        # Timed-out checks keep their worker busy; don't wait for them
+        threads.shutdown(wait=False, cancel_futures=True)
+        if arrow_dir is not None:
+            arrow_dir.cleanup()
+
+    return outcomes
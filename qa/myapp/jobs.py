@@ -0,0 +1,89 @@
+import os
+import socket
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_next_job(worker):
+    from .models import AuditJob
+
+    # Jobs left "running" by a worker that stopped updating them are picked up again
+    stale = timezone.now() - timedelta(seconds=settings.QA_AUDIT_STALE_AFTER)
+    claimable = Q(status=AuditJob.QUEUED) | Q(status=AuditJob.RUNNING, updated_at__lt=stale)
+
+    for pk in AuditJob.objects.filter(claimable).order_by("created_at").values_list("pk", flat=True)[:10]:
+        now = timezone.now()
+        # Conditional UPDATE: only one worker can win a given job
+        claimed = AuditJob.objects.filter(claimable, pk=pk).update(
+            status=AuditJob.RUNNING, worker=worker, started_at=now, updated_at=now,
+            completed_checks=0, results=[], error="",
+        )
+        if claimed:
+            return AuditJob.objects.get(pk=pk)
+    return None
+
+
+def run_job(job):
+    from .models import AuditJob
+    from .results import row_to_json
+    from .uploads import discard_upload
+    from .audit import run_audit
+
+    def on_result(index, row, total):
+        if not job.results:
+            job.total_checks = total
+            job.results = [{"Question": "", "Result": "", "Time": None, "State": "pending"}] * total
+        job.results[index] = dict(row_to_json(row), State="done")
+        job.completed_checks = sum(1 for r in job.results if r["State"] == "done")
+        job.save(update_fields=["total_checks", "results", "completed_checks", "updated_at"])
+
+    try:
+        with open(job.file_path, "rb") as upload:
+            results, download_url = run_audit(upload, job.upload_name, on_result=on_result,
+                                              upload_hash=job.upload_hash or None, account=job.account or None)
+    except Exception as e:
+        job.status = AuditJob.FAILED
+        job.error = str(e)
+    else:
+        job.status = AuditJob.DONE
+        job.results = [dict(row_to_json(row), State="done") for row in results]
+        job.report_url = download_url
+    # Uploads are only kept until their audit has run
+    discard_upload(job.file_path)
+    job.finished_at = timezone.now()
+    job.save()
+    return job
+
+
+def work(poll_interval=2.0, once=False):
+    """Claim and run queued audits until stopped; ``once`` exits when the queue is empty."""
+    worker = worker_name()
+    while True:
+        close_old_connections()
+        job = claim_next_job(worker)
+        if job is None:
+            if once:
+                return
+            time.sleep(poll_interval)
+            continue
+        run_job(job)
+
+
+def worker_process(poll_interval, once):
+    # Entry point for extra worker processes started with the spawn method.
+    # Models are imported inside the functions above so this module can be
+    # unpickled before Django is set up.
+    import django
+    django.setup()
+    from .warmup import warm_up
+    warm_up()
+    work(poll_interval, once)
@@ -0,0 +1,206 @@
+import hashlib
+import re
+from datetime import date
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.utils import timezone
+
+# Keyword text checks share one scan of the keyword column: every term of
+# the dictionary (the legacy BMM marker and the season calendar's terms) is
+# found in a single pass, and each check then picks the terms it cares
+# about.  The scan is cached per sheet with the ad-group aggregates.
+
+BMM_MARKER = "+"
+
+# Season -> (first day, last day, terms).  Days are "MM-DD", both included,
+# and a season may run over the new year.  Windows start early enough to
+# cover the run-up, when the keywords are worth bidding on.
+DEFAULT_SEASON_CALENDAR = {
+    "Valentine's Day": ("01-15", "02-14", ["valentine", "valentines", "valentine's", "valentines day"]),
+    "Easter": ("03-01", "04-25", ["easter", "easter egg", "easter eggs"]),
+    "Mother's Day": ("04-10", "05-14", ["mothers day", "mother's day"]),
+    "Father's Day": ("05-20", "06-21", ["fathers day", "father's day"]),
+    "Back to school": ("07-01", "09-15", ["back to school", "back-to-school", "school supplies"]),
+    "Halloween": ("09-15", "10-31", ["halloween", "trick or treat"]),
+    "Black Friday": ("11-01", "12-02", ["black friday", "cyber monday"]),
+    "Christmas": ("11-01", "12-26", ["christmas", "xmas", "holiday", "holidays", "stocking stuffer",
+                                     "stocking stuffers", "advent calendar", "santa"]),
+    "New Year": ("12-15", "01-07", ["new year", "new years", "new year's"]),
+    "Summer sale": ("05-15", "08-31", ["summer sale"]),
+    "Winter sale": ("11-01", "02-28", ["winter sale"]),
+}
+
+
+def trie_pattern(terms):
+    """One regular expression matching any of ``terms``, shaped like a trie.
+
+    Terms sharing a prefix share one branch, so the engine tests each
+    prefix once per position instead of once per term; at a branch the
+    longest term wins.  A term starting or ending with a letter or digit
+    only matches at a word boundary there.  Every branch starts with a
+    plain character (the boundary is checked after it), which lets the
+    engine skip ahead to positions where some term can start.
+    """
+    trie = {}
+    for term in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node, last):
+        alternatives = [re.escape(ch) + build(node[ch], ch) for ch in sorted(k for k in node if k)]
+        if "" in node:
+            # End of a term: tried after the longer terms through here
+            alternatives.append(r"(?!\w)" if re.match(r"\w", last) else "")
+        if len(alternatives) == 1:
+            return alternatives[0]
+        return "(?:" + "|".join(alternatives) + ")"
+
+    branches = []
+    for ch in sorted(trie):
+        # (?<!\w.) right after a word character: the character before it isn't one
+        start = r"(?<!\w.)" if re.match(r"\w", ch) else ""
+        branches.append(re.escape(ch) + start + build(trie[ch], ch))
+    return "|".join(branches)
+
+
+class TermMatches:
+    """Where a TermScanner found its terms in one column.
+
+    ``value`` is the distinct value each match is in (an index into the
+    column's factorized values) and ``term`` the term found, lower-cased,
+    in text order.
+    """
+
+    def __init__(self, codes, value_count, value, term):
+        self.codes = codes
+        self.value_count = value_count
+        self.value = value
+        self.term = term
+
+    def selected(self, terms):
+        if terms is None:
+            return np.ones(len(self.term), dtype=bool)
+        return np.isin(self.term, list(terms))
+
+    def rows(self, terms=None):
+        # Boolean mask over the rows: any term (or any of ``terms``) was found
+        hit = np.zeros(self.value_count + 1, dtype=bool)    # the extra slot is for blanks (code -1)
+        hit[self.value[self.selected(terms)]] = True
+        return hit[self.codes]
+
+    def first(self, terms=None):
+        # The first term (of ``terms``) found in each row, None where there is none
+        keep = self.selected(terms)
+        values, at = np.unique(self.value[keep], return_index=True)
+        first = np.full(self.value_count + 1, None, dtype=object)
+        first[values] = self.term[keep][at]
+        return first[self.codes]
+
+
+class TermScanner:
+    """Finds the terms of a dictionary in a column of text in one pass.
+
+    The column's distinct values are lower-cased and joined into one
+    string, which is searched once with the trie-shaped pattern of every
+    term; matches are mapped back to values by their offsets.
+    """
+
+    def __init__(self, terms):
+        self.terms = sorted({t.lower() for t in terms})
+        self.pattern = re.compile(trie_pattern(self.terms))
+
+    def scan(self, values):
+        codes, uniques = pd.factorize(pd.Series(values), use_na_sentinel=True)
+        texts = [v if isinstance(v, str) else str(v) for v in uniques.tolist()]
+        text = "\n".join(texts).lower()
+        if len(text) != sum(map(len, texts)) + len(texts) - 1 or text.count("\n") != len(texts) - 1:
+            # A value with a line break, or one lower-casing changes the length of
+            texts = [t.replace("\n", " ").lower() for t in texts]
+            text = "\n".join(texts)
+        lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+        starts = np.concatenate(([0], np.cumsum(lengths[:-1] + 1)))
+
+        found = [(m.start(), m.group()) for m in self.pattern.finditer(text)]
+        positions = np.array([p for p, _ in found], dtype=np.int64)
+        value = np.searchsorted(starts, positions, side="right") - 1
+        term = np.array([t for _, t in found], dtype=object)
+        return TermMatches(codes, len(uniques), value, term)
+
+
+def day_of_year(text):
+    month, day = text.split("-")
+    return int(month), int(day)
+
+
+class Season:
+    def __init__(self, name, start, end, terms):
+        self.name = name
+        self.start = day_of_year(start)
+        self.end = day_of_year(end)
+        self.terms = [t.lower() for t in terms]
+
+    def __contains__(self, day):
+        day = (day.month, day.day)
+        if self.start <= self.end:
+            return self.start <= day <= self.end
+        # Runs over the new year
+        return day >= self.start or day <= self.end
+
+    @property
+    def window(self):
+        return "{} – {}".format(*(date(2000, m, d).strftime("%b %d") for m, d in (self.start, self.end)))
+
+
+class SeasonCalendar:
+    """Seasons and their keyword terms; a term belongs to the first season listing it."""
+
+    def __init__(self, calendar):
+        self.seasons = [Season(name, start, end, terms) for name, (start, end, terms) in calendar.items()]
+        self.season_of = {}
+        for season in self.seasons:
+            for term in season.terms:
+                self.season_of.setdefault(term, season)
+
+    @property
+    def terms(self):
+        return list(self.season_of)
+
+    def out_of_season(self, day):
+        # Terms whose season doesn't include ``day``
+        return [term for term, season in self.season_of.items() if day not in season]
+
+
+def calendar_items():
+    calendar = settings.QA_SEASON_CALENDAR or DEFAULT_SEASON_CALENDAR
+    return tuple((name, start, end, tuple(terms)) for name, (start, end, terms) in calendar.items())
+
+
+@lru_cache(maxsize=4)
+def _build(items):
+    calendar = SeasonCalendar({name: (start, end, terms) for name, start, end, terms in items})
+    return calendar, TermScanner([BMM_MARKER, *calendar.terms])
+
+
+def season_calendar():
+    return _build(calendar_items())[0]
+
+
+def keyword_scanner():
+    # Scanner for every keyword text term: the BMM marker and the season calendar
+    return _build(calendar_items())[1]
+
+
+def season_date():
+    # The day seasons are judged against
+    return settings.QA_SEASON_DATE or timezone.localdate()
+
+
+def season_key():
+    # What a seasonal result depends on besides its sheet: the day and the calendar
+    calendar = hashlib.sha256(repr(calendar_items()).encode("utf-8")).hexdigest()[:16]
+    return f"{season_date().isoformat()} {calendar}"
@@ -0,0 +1,160 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class LinkCheckResult:
+    def __init__(self):
+        self.statuses = {}      # url -> HTTP status code, or None when the request failed
+        self.unchecked = []     # urls skipped because the deadline was reached
+        self.elapsed = 0.0
+        self.cache_hits = 0     # fresh entries served from the URL cache
+        self.cache_misses = 0   # urls probed without a usable cache entry
+        self.revalidated = 0    # stale entries confirmed unchanged by a 304
+
+    @property
+    def broken(self):
+        # Same rule as the original check: 404s and unreachable URLs count as broken
+        return [url for url, status in self.statuses.items() if status is None or status == 404]
+
+    @property
+    def timed_out(self):
+        return bool(self.unchecked)
+
+    @property
+    def urls_per_second(self):
+        return len(self.statuses) / self.elapsed if self.elapsed else 0.0
+
+
+def make_session(pool_size=32):
+    # One keep-alive session shared by every worker thread
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def probe_url(session, url, timeout, etag="", last_modified=""):
+    # Conditional request when we hold validators from an earlier check
+    headers = {}
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    r = session.head(url, timeout=timeout, allow_redirects=True, headers=headers)
+    # Sometimes HEAD not allowed, fallback to GET
+    if r.status_code == 405:
+        r = session.get(url, timeout=timeout, allow_redirects=True, headers=headers, stream=True)
+        r.close()
+    return r.status_code, r.headers.get("ETag", ""), r.headers.get("Last-Modified", "")
+
+
+def check_urls(urls, max_workers=32, per_host=4, timeout=3, deadline=60, session=None, cache=None):
+    """Probe every distinct URL concurrently and return a LinkCheckResult.
+
+    At most ``per_host`` requests run against the same host at once.  When
+    ``deadline`` seconds have passed the URLs still pending are reported in
+    ``unchecked`` and the partial result is returned.
+
+    ``cache`` (see myapp.url_cache.UrlStatusCache) serves fresh statuses
+    without touching the network and revalidates stale ones with
+    If-None-Match / If-Modified-Since.
+    """
+    result = LinkCheckResult()
+    urls = list(dict.fromkeys(u for u in urls if isinstance(u, str) and u.strip()))
+    if not urls:
+        return result
+    started = time.monotonic()
+
+    cached = cache.lookup(urls) if cache is not None else {}
+    to_probe = []
+    for url in urls:
+        entry = cached.get(url)
+        if entry is not None and entry.fresh:
+            result.statuses[url] = entry.status
+            result.cache_hits += 1
+        else:
+            to_probe.append(url)
+    result.cache_misses = len(to_probe)
+    if cache is not None and result.cache_hits:
+        cache.touch([url for url in urls if url in result.statuses])
+    urls = to_probe
+    if not urls:
+        result.elapsed = time.monotonic() - started
+        return result
+
+    stop_at = started + deadline
+    own_session = session is None
+    if own_session:
+        session = make_session(max_workers)
+
+    host_limits = {}
+    host_lock = threading.Lock()
+
+    def host_semaphore(url):
+        host = urlsplit(url).netloc.lower()
+        with host_lock:
+            if host not in host_limits:
+                host_limits[host] = threading.BoundedSemaphore(per_host)
+            return host_limits[host]
+
+    def worker(url):
+        remaining = stop_at - time.monotonic()
+        sem = host_semaphore(url)
+        if remaining <= 0 or not sem.acquire(timeout=remaining):
+            return url, False, None
+        try:
+            remaining = stop_at - time.monotonic()
+            if remaining <= 0:
+                return url, False, None
+            entry = cached.get(url)
+            try:
+                if entry is not None:
+                    return url, True, probe_url(session, url, min(timeout, remaining), entry.etag, entry.last_modified)
+                return url, True, probe_url(session, url, min(timeout, remaining))
+            except Exception:
+                return url, True, None
+        finally:
+            sem.release()
+
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(urls)), thread_name_prefix="linkcheck")
+    try:
+        futures = [executor.submit(worker, url) for url in urls]
+        done, _ = wait(futures, timeout=max(stop_at - time.monotonic(), 0))
+        finished = set()
+        to_store = {}
+        for future in done:
+            url, checked, response = future.result()
+            if not checked:
+                continue
+            finished.add(url)
+            if response is None:
+                result.statuses[url] = None
+                continue
+            status, etag, last_modified = response
+            entry = cached.get(url)
+            if status == 304 and entry is not None:
+                # Unchanged since the last check: keep the cached status
+                result.statuses[url] = entry.status
+                result.revalidated += 1
+                to_store[url] = (entry.status, etag or entry.etag, last_modified or entry.last_modified)
+            else:
+                result.statuses[url] = status
+                to_store[url] = (status, etag, last_modified)
+        result.unchecked = [url for url in urls if url not in finished]
+        if cache is not None and to_store:
+            cache.store(to_store)
+    finally:
+        # Don't block on probes still in flight once the deadline has passed
+        executor.shutdown(wait=False, cancel_futures=True)
+        if own_session and not result.unchecked:
+            session.close()
+
+    result.elapsed = time.monotonic() - started
+    return result
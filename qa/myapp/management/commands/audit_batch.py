@@ -0,0 +1,49 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from myapp.batch import STATE_FILE, SUMMARY_FILE, find_workbooks, run_batch
+
+
+class Command(BaseCommand):
+    help = "Audit every workbook in the given directories or globs, one report per workbook."
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="Workbook files, directories or glob patterns.")
+        parser.add_argument("--output", default=None,
+                            help="Reports, roll-up summary and resume state go here (default: QA_BATCH_OUTPUT_DIR).")
+        parser.add_argument("--processes", type=int, default=None,
+                            help="Workbooks audited at the same time (default: QA_BATCH_PROCESSES, or one per CPU).")
+        parser.add_argument("--force", action="store_true",
+                            help=f"Audit everything again, ignoring {STATE_FILE}.")
+
+    def handle(self, *args, **options):
+        paths = find_workbooks(options["paths"])
+        if not paths:
+            raise CommandError("No workbooks or CSV exports (.xls, .xlsx, .csv, .tsv, .zip) found.")
+        output_dir = options["output"] or settings.QA_BATCH_OUTPUT_DIR
+        self.stdout.write(f"{len(paths)} workbook(s) found; writing to {output_dir}.")
+
+        def on_entry(entry, done, total):
+            name = os.path.basename(entry["path"])
+            if entry["status"] == "done":
+                problems = sum(1 for s in entry["statuses"] if s in ("fail", "error"))
+                self.stdout.write(f"[{done}/{total}] {name}: {entry['seconds']}s, {problems} issue(s)")
+            else:
+                self.stdout.write(self.style.ERROR(f"[{done}/{total}] {name}: {entry['error']}"))
+
+        run = run_batch(paths, output_dir, processes=options["processes"] or settings.QA_BATCH_PROCESSES,
+                        force=options["force"], on_entry=on_entry)
+
+        for path, reason in run.skipped:
+            self.stdout.write(f"Skipped {os.path.basename(path)}: {reason}.")
+        self.stdout.write(
+            f"Audited {len(run.audited)} workbook(s) in {run.seconds:.1f}s "
+            f"({run.per_minute:.1f} workbooks/minute), skipped {len(run.skipped)}."
+        )
+        if run.failed:
+            self.stdout.write(self.style.ERROR(f"{len(run.failed)} failed:"))
+            for entry in run.failed:
+                self.stdout.write(f"  {entry['path']}: {entry['error']}")
+        self.stdout.write(f"Roll-up summary: {os.path.join(output_dir, SUMMARY_FILE)}")
@@ -0,0 +1,39 @@
+import multiprocessing
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from myapp.jobs import work, worker_process
+from myapp.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = "Run queued audit jobs from the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=None,
+                            help="Audits run at the same time (default: QA_AUDIT_CONCURRENCY).")
+        parser.add_argument("--poll", type=float, default=2.0, help="Seconds between queue polls.")
+        parser.add_argument("--once", action="store_true", help="Exit when the queue is empty.")
+
+    def handle(self, *args, **options):
+        concurrency = options["concurrency"] or settings.QA_AUDIT_CONCURRENCY
+        self.stdout.write(f"Audit worker started ({concurrency} concurrent job(s)).")
+
+        # One process per concurrent job; this process is the first of them
+        context = multiprocessing.get_context("spawn")
+        extra = [
+            context.Process(target=worker_process, args=(options["poll"], options["once"]), daemon=True)
+            for _ in range(concurrency - 1)
+        ]
+        for process in extra:
+            process.start()
+        try:
+            warm_up()
+            work(options["poll"], options["once"])
+        finally:
+            for process in extra:
+                if options["once"]:
+                    process.join()
+                else:
+                    process.terminate()
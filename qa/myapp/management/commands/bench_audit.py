@@ -0,0 +1,90 @@
+import json
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from myapp.benchmark import benchmark_workbook, compare, max_rss_mb, new_report
+from myapp.synthetic import generate_workbook
+
+from .bench_linkcheck import start_stub_server
+
+
+class Command(BaseCommand):
+    help = ("Time each stage of the audit (parsing, every check, HTML rendering, the Excel report) "
+            "on synthetic workbooks, with peak memory, and save the results as JSON.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keywords", type=int, nargs="+", default=[1000, 10000, 100000],
+                            help="Keyword rows per synthetic workbook; one benchmark per size.")
+        parser.add_argument("--workbook", default=None, help="Benchmark this workbook instead of synthetic ones.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--repeat", type=int, default=3, help="Timed runs per workbook; the median is reported.")
+        parser.add_argument("--no-memory", action="store_true", help="Skip the (slow) peak memory pass.")
+        parser.add_argument("--output", default=None,
+                            help="Results file (default: MEDIA_ROOT/bench/bench_<time>.json).")
+        parser.add_argument("--compare", default=None, help="Earlier results file to compare against.")
+        parser.add_argument("--threshold", type=float, default=0.10,
+                            help="Slowdown (fraction) reported as a regression by --compare.")
+        parser.add_argument("--fail-on-regression", action="store_true",
+                            help="Exit with an error when --compare finds a regression.")
+
+    def handle(self, *args, **options):
+        report = new_report()
+        # Final URLs in synthetic workbooks point at a local stub, so the link check never leaves the machine
+        server = start_stub_server(0.0)
+        host, port = server.server_address
+        try:
+            with tempfile.TemporaryDirectory() as tmp:
+                if options["workbook"]:
+                    workbooks = [(None, options["workbook"], None)]
+                else:
+                    workbooks = []
+                    for keywords in options["keywords"]:
+                        path = os.path.join(tmp, f"synthetic_{keywords}.xlsx")
+                        started = time.perf_counter()
+                        rows = generate_workbook(path, keywords, options["seed"], url_base=f"http://{host}:{port}/page")
+                        self.stdout.write(f"Generated {keywords} keyword rows in {time.perf_counter() - started:.1f}s.")
+                        workbooks.append((keywords, path, rows))
+
+                for keywords, path, rows in workbooks:
+                    stages = benchmark_workbook(path, repeat=options["repeat"], memory=not options["no_memory"])
+                    report["workbooks"].append({
+                        "keywords": keywords,
+                        "workbook": os.path.basename(path) if keywords is None else None,
+                        "bytes": os.path.getsize(path),
+                        "rows": rows,
+                        "stages": stages,
+                    })
+                    self.print_stages(keywords or os.path.basename(path), stages)
+        finally:
+            server.shutdown()
+        report["max_rss_mb"] = max_rss_mb()
+
+        output = options["output"] or os.path.join(
+            settings.MEDIA_ROOT, "bench", time.strftime("bench_%Y%m%d_%H%M%S.json"))
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        peak = "unknown" if report["max_rss_mb"] is None else f"{report['max_rss_mb']} MB"
+        self.stdout.write(f"Peak RSS {peak}. Results saved to {output}")
+
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as f:
+                old = json.load(f)
+            rows, regressions = compare(old, report, threshold=options["threshold"])
+            self.stdout.write(f"\nAgainst {options['compare']} ({old['environment'].get('commit') or 'unknown commit'}):")
+            for keywords, stage, was, now, change in rows:
+                line = f"{keywords:>8}  {stage:<45} {was:>9.4f}s -> {now:>9.4f}s  {change:+7.1%}"
+                self.stdout.write(self.style.ERROR(line) if (keywords, stage, was, now, change) in regressions else line)
+            if regressions and options["fail_on_regression"]:
+                raise CommandError(f"{len(regressions)} stage(s) slower by more than {options['threshold']:.0%}.")
+
+    def print_stages(self, label, stages):
+        self.stdout.write(f"\n{label}:")
+        self.stdout.write(f"  {'stage':<45} {'median':>9} {'min':>9} {'peak MB':>9}")
+        for stage, timing in stages.items():
+            peak = "" if timing["peak_mb"] is None else f"{timing['peak_mb']:.2f}"
+            self.stdout.write(f"  {stage:<45} {timing['seconds']:>9.4f} {timing['min']:>9.4f} {peak:>9}")
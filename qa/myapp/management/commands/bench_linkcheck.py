@@ -0,0 +1,121 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.core.management.base import BaseCommand
+
+from myapp.linkcheck import check_urls
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so the client can keep connections alive
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+
+    def _respond(self, send_body):
+        time.sleep(self.latency)
+        if self.path.startswith("/missing"):
+            status = 404
+        elif self.path.startswith("/nohead") and self.command == "HEAD":
+            status = 405
+        else:
+            status = 200
+        body = b"ok"
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self._respond(send_body=False)
+
+    def do_GET(self):
+        self._respond(send_body=True)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients abandoned at the deadline reset their connections; that's expected here
+        pass
+
+
+def start_stub_server(latency):
+    handler = type("Handler", (StubHandler,), {"latency": latency})
+    server = StubServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def build_urls(servers, count):
+    paths = ["/page", "/page", "/page", "/missing", "/nohead"]
+    urls = []
+    for i in range(count):
+        host, port = servers[i % len(servers)].server_address
+        urls.append(f"http://{host}:{port}{paths[i % len(paths)]}/{i}")
+    return urls
+
+
+def serial_check(urls, timeout):
+    # The pre-engine behaviour: one requests.head per URL, no shared session
+    broken = []
+    for url in urls:
+        try:
+            r = requests.head(url, timeout=timeout, allow_redirects=True)
+            if r.status_code == 405:
+                r = requests.get(url, timeout=timeout, allow_redirects=True)
+            if r.status_code == 404:
+                broken.append(url)
+        except Exception:
+            broken.append(url)
+    return broken
+
+
+class Command(BaseCommand):
+    help = "Measure link checker throughput (URLs/sec) against local stub HTTP servers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--urls", type=int, default=1000)
+        parser.add_argument("--hosts", type=int, default=8, help="Number of stub servers (distinct hosts).")
+        parser.add_argument("--latency", type=float, default=0.02, help="Seconds each stub response is delayed.")
+        parser.add_argument("--workers", type=int, default=32)
+        parser.add_argument("--per-host", type=int, default=4)
+        parser.add_argument("--deadline", type=float, default=120)
+        parser.add_argument("--serial", action="store_true", help="Also time the old one-at-a-time loop.")
+
+    def handle(self, *args, **options):
+        servers = [start_stub_server(options["latency"]) for _ in range(options["hosts"])]
+        try:
+            urls = build_urls(servers, options["urls"])
+
+            result = check_urls(
+                urls,
+                max_workers=options["workers"],
+                per_host=options["per_host"],
+                deadline=options["deadline"],
+            )
+            self.stdout.write(
+                f"concurrent: {len(result.statuses)} checked, {len(result.broken)} broken, "
+                f"{len(result.unchecked)} unchecked in {result.elapsed:.2f}s "
+                f"-> {result.urls_per_second:.1f} URLs/sec"
+            )
+
+            if options["serial"]:
+                started = time.monotonic()
+                broken = serial_check(urls, timeout=3)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"serial:     {len(urls)} checked, {len(broken)} broken in {elapsed:.2f}s "
+                    f"-> {len(urls) / elapsed:.1f} URLs/sec"
+                )
+        finally:
+            for server in servers:
+                server.shutdown()
+                server.server_close()
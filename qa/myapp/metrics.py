@@ -0,0 +1,278 @@
+import json
+import logging
+import os
+import platform
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+# Prometheus-style metrics for the audit path, served by the /metrics view
+# in the text exposition format.  Only the standard library is used, so
+# views can import this without pulling in the audit dependencies.
+#
+# Audits also run in other processes (audit_worker, audit_batch).  Each
+# process keeps its own registry and writes a snapshot of it to
+# QA_METRICS_DIR after every audit; /metrics adds the snapshots of all
+# processes to the live registry of the process serving the request, and
+# deletes snapshots not rewritten for QA_METRICS_SNAPSHOT_TTL seconds (their
+# processes are most likely gone).  Gauges are merged by taking the highest.
+
+logger = logging.getLogger(__name__)
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+BYTE_BUCKETS = tuple(2 ** n for n in range(10, 33, 2))      # 1 KB .. 4 GB
+
+# Name of this process's snapshot file; pid plus start time, as pids get reused
+PROCESS_ID = f"{os.getpid()}-{int(time.time())}"
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+class Metric:
+    type = ""
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.series = {}        # label values tuple -> value
+        self.lock = threading.Lock()
+
+    def key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self.lock:
+            self.series[key] = self.series.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type = "gauge"
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.series[self.key(labels)] = value
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=TIME_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with self.lock:
+            counts, total, count = self.series.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            # Non-cumulative per bucket; summed up when rendered
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self.series[key] = (counts, total + value, count + 1)
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+
+def register(metric):
+    with _registry_lock:
+        return _registry.setdefault(metric.name, metric)
+
+
+def counter(name, help, labels=()):
+    return register(Counter(name, help, labels))
+
+
+def gauge(name, help, labels=()):
+    return register(Gauge(name, help, labels))
+
+
+def histogram(name, help, labels=(), buckets=TIME_BUCKETS):
+    return register(Histogram(name, help, labels, buckets))
+
+
+# Audit path metrics ---------------------------------------------------------
+
+UPLOAD_SECONDS = histogram("qa_upload_seconds", "Time to receive, check and hash an upload.")
+UPLOAD_BYTES = histogram("qa_upload_bytes", "Size of accepted uploads.", buckets=BYTE_BUCKETS)
+UPLOADS_REJECTED = counter("qa_uploads_rejected_total", "Uploads stopped by the upload handler.")
+SHEET_PARSE_SECONDS = histogram("qa_sheet_parse_seconds", "Time to parse and normalize one sheet.",
+                                ["sheet", "backend"])
+SHEET_PARSE_MEMORY = histogram("qa_sheet_parse_memory_bytes", "Resident memory growth while parsing one sheet.",
+                               ["sheet"], buckets=BYTE_BUCKETS)
+CHECK_SECONDS = histogram("qa_check_seconds", "Time spent in one check.", ["check", "sheet"])
+CHECK_RESULTS = counter("qa_check_results_total", "Check results by status; cached results included.",
+                        ["check", "status", "cached"])
+CHART_SECONDS = histogram("qa_chart_render_seconds", "Time to render a chart (cache misses only).",
+                          ["kind", "format"])
+REPORT_SECONDS = histogram("qa_report_write_seconds", "Time to write the Excel report.")
+REPORT_MEMORY = histogram("qa_report_write_memory_bytes", "Resident memory growth while writing the Excel report.",
+                          buckets=BYTE_BUCKETS)
+AUDIT_SECONDS = histogram("qa_audit_seconds", "Time for a whole audit, report included.", ["outcome"])
+PROCESS_MAX_RSS = gauge("qa_process_max_resident_bytes", "Peak resident memory of the largest audit process.")
+
+
+def resident_bytes():
+    # Current resident set size; /proc where there is one, else the peak so far
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return max_resident_bytes()
+
+
+def max_resident_bytes():
+    # Peak resident set size so far; None where there is no resource module (Windows)
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if platform.system() == "Darwin" else rss * 1024
+
+
+@contextmanager
+def stage(seconds, memory=None, **labels):
+    """Time the block into ``seconds`` and, if given, its resident memory growth into ``memory``.
+
+    Memory growth is process-wide, so stages running at the same time on
+    other threads show up in each other's numbers.
+    """
+    before = resident_bytes() if memory is not None else None
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds.observe(time.perf_counter() - started, **labels)
+        if before is not None:
+            after = resident_bytes()
+            if after is not None:
+                memory.observe(max(0, after - before), **labels)
+
+
+# Snapshots and exposition --------------------------------------------------
+
+def snapshot():
+    rss = max_resident_bytes()
+    if rss is not None:
+        PROCESS_MAX_RSS.set(rss)
+    data = {}
+    with _registry_lock:
+        metrics = list(_registry.values())
+    for metric in metrics:
+        with metric.lock:
+            series = [[list(key), value] for key, value in metric.series.items()]
+        data[metric.name] = {
+            "type": metric.type,
+            "help": metric.help,
+            "labels": list(metric.labels),
+            "buckets": list(getattr(metric, "buckets", [])),
+            "series": series,
+        }
+    return data
+
+
+def flush():
+    # Write this process's snapshot for /metrics to pick up
+    if not settings.QA_METRICS:
+        return
+    path = os.path.join(settings.QA_METRICS_DIR, f"{PROCESS_ID}.json")
+    try:
+        os.makedirs(settings.QA_METRICS_DIR, exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(snapshot(), f)
+        os.replace(path + ".tmp", path)
+    except OSError as e:
+        # Metrics must never fail an audit
+        logger.warning("Could not write metrics snapshot %s: %s", path, e)
+
+
+def collect():
+    # This process's live metrics plus the last snapshot of every other process
+    snapshots = [snapshot()]
+    directory = settings.QA_METRICS_DIR
+    stale = time.time() - settings.QA_METRICS_SNAPSHOT_TTL
+    if os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".json") and name != f"{PROCESS_ID}.json":
+                path = os.path.join(directory, name)
+                try:
+                    if os.path.getmtime(path) < stale:
+                        os.remove(path)
+                        continue
+                    with open(path, encoding="utf-8") as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+    return merge(snapshots)
+
+
+def merge(snapshots):
+    merged = {}
+    for data in snapshots:
+        for name, metric in data.items():
+            target = merged.setdefault(name, dict(metric, series={}))
+            for key, value in metric["series"]:
+                key = tuple(key)
+                if len(key) != len(target["labels"]):
+                    continue        # written by a version with other labels
+                if key not in target["series"]:
+                    target["series"][key] = value
+                elif metric["type"] == "gauge":
+                    target["series"][key] = max(target["series"][key], value)
+                elif metric["type"] == "counter":
+                    target["series"][key] += value
+                else:
+                    counts, total, count = target["series"][key]
+                    target["series"][key] = ([a + b for a, b in zip(counts, value[0])], total + value[1],
+                                             count + value[2])
+    return merged
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def label_text(names, values, extra=None):
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def render(merged):
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for name, metric in sorted(merged.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for key, value in sorted(metric["series"].items()):
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{label_text(metric['labels'], key)} {value}")
+                continue
+            counts, total, count = value
+            cumulative = 0
+            for bound, n in zip(metric["buckets"], counts):
+                cumulative += n
+                le = 'le="%s"' % bound
+                lines.append(f"{name}_bucket{label_text(metric['labels'], key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{name}_bucket{label_text(metric['labels'], key, le)} {count}")
+            lines.append(f"{name}_sum{label_text(metric['labels'], key)} {total}")
+            lines.append(f"{name}_count{label_text(metric['labels'], key)} {count}")
+    return "\n".join(lines) + "\n"
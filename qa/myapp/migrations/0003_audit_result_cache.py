@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0002_audit_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('upload_hash', models.CharField(max_length=64, unique=True)),
+                ('checklist_hash', models.CharField(max_length=64)),
+                ('sheet_fingerprints', models.JSONField(blank=True, default=dict)),
+                ('results', models.JSONField(blank=True, default=list)),
+                ('report_url', models.CharField(max_length=255)),
+                ('created_at', models.DateTimeField()),
+                ('last_used', models.DateTimeField(db_index=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CheckResult',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('check_id', models.CharField(max_length=64)),
+                ('sheet_fingerprint', models.CharField(max_length=64)),
+                ('result', models.TextField()),
+                ('seconds', models.FloatField(default=0.0)),
+                ('created_at', models.DateTimeField()),
+                ('last_used', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('check_id', 'sheet_fingerprint'), name='unique_check_result')],
+            },
+        ),
+    ]
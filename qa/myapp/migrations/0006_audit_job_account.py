@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('myapp', '0005_result_table'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditjob',
+            name='account',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
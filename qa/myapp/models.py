@@ -1,3 +1,106 @@
 from django.db import models
 
 # Create your models here.
+
+
+class UrlStatus(models.Model):
+    # Last known HTTP status of a landing page, shared by every upload
+    url = models.TextField(unique=True)
+    status = models.IntegerField()
+    etag = models.CharField(max_length=255, blank=True, default="")
+    last_modified = models.CharField(max_length=64, blank=True, default="")
+    checked_at = models.DateTimeField()
+    last_used = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.url} ({self.status})"
+
+
+class AuditJob(models.Model):
+    # One uploaded workbook waiting for, or going through, the audit worker
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+    upload_name = models.CharField(max_length=255)
+    file_path = models.TextField()
+    upload_hash = models.CharField(max_length=64, blank=True, default="")
+    # Account whose previous audit this one is compared with; blank: named after the upload
+    account = models.CharField(max_length=255, blank=True, default="")
+    total_checks = models.IntegerField(default=0)
+    completed_checks = models.IntegerField(default=0)
+    # One {"Question", "Result", "Time", "State"} row per checklist question,
+    # with Result stored as Result.to_dict() (see results.py)
+    results = models.JSONField(default=list, blank=True)
+    report_url = models.CharField(max_length=255, blank=True, default="")
+    error = models.TextField(blank=True, default="")
+    worker = models.CharField(max_length=64, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["created_at"]
+
+    def __str__(self):
+        return f"Audit #{self.pk} {self.upload_name} ({self.status})"
+
+    @property
+    def finished(self):
+        return self.status in (self.DONE, self.FAILED)
+
+
+class AuditReport(models.Model):
+    # Finished audit of one exact workbook, found again by the upload's SHA-256
+    upload_hash = models.CharField(max_length=64, unique=True)
+    checklist_hash = models.CharField(max_length=64)
+    # {sheet name: fingerprint} of the sheets the checks read
+    sheet_fingerprints = models.JSONField(default=dict, blank=True)
+    results = models.JSONField(default=list, blank=True)
+    report_url = models.CharField(max_length=255)
+    created_at = models.DateTimeField()
+    last_used = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Report {self.upload_hash[:12]}"
+
+
+class CheckResult(models.Model):
+    # Output of one check on one version of its sheet, reused across uploads
+    check_id = models.CharField(max_length=64)
+    sheet_fingerprint = models.CharField(max_length=64)
+    result = models.TextField()     # JSON of Result.to_dict()
+    seconds = models.FloatField(default=0.0)
+    created_at = models.DateTimeField()
+    last_used = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["check_id", "sheet_fingerprint"], name="unique_check_result"),
+        ]
+
+    def __str__(self):
+        return f"{self.check_id} @ {self.sheet_fingerprint[:12]}"
+
+
+class ResultTable(models.Model):
+    # Detail rows of one check result table, paged to the results page on demand.
+    # Keyed by a hash of the contents, so equal tables are stored once.
+    key = models.CharField(max_length=40, unique=True)
+    columns = models.JSONField(default=list)
+    rows = models.JSONField(default=list)
+    row_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField()
+    last_used = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"Table {self.key[:12]} ({self.row_count} rows)"
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+# Low-cardinality columns the checks compare against upper-case constants
+ENUM_COLUMNS = ['Campaign Type', 'Adgroup Type', 'Ad Type', 'Status Reason', 'Ad Strength']
+
+
+
+def normalize_sheet(df):
+    """Run once per sheet after it is loaded.
+
+    Strips header whitespace, turns the enum columns into upper-cased
+    categoricals and downcasts numeric columns where no value changes.
+    """
+    df.columns = [c.strip() if isinstance(c, str) else c for c in df.columns]
+
+    for col in ENUM_COLUMNS:
+        if col in df.columns:
+            values = df[col]
+            upper = values.where(values.isna(), values.astype(str).str.upper())
+            df[col] = upper.astype("category")
+
+    for col in df.select_dtypes(include="integer").columns:
+        df[col] = pd.to_numeric(df[col], downcast="integer")
+
+    for col in df.select_dtypes(include="floating").columns:
+        smaller = df[col].astype(np.float32)
+        # Only keep float32 when it round-trips exactly (NaN == NaN here)
+        if np.array_equal(smaller.to_numpy(np.float64), df[col].to_numpy(np.float64), equal_nan=True):
+            df[col] = smaller
+
+    df.attrs["normalized"] = True
+    return df
+
+
+def is_normalized(df):
+    return df.attrs.get("normalized", False)
+
+
+def copy_on_write():
+    # pandas 3 always copies on write; pandas 2 only when the application switched it on
+    return int(pd.__version__.split(".")[0]) >= 3 or pd.get_option("mode.copy_on_write") is True
+
+
+def readonly_view(df):
+    # The frame handed to a check, which must never write through to the shared sheet.
+    # With Copy-on-Write a shallow copy is enough: it shares the data, but column
+    # assignments and in-place edits stay local to the check.  Otherwise it's a deep copy.
+    return df.copy(deep=not copy_on_write())
@@ -0,0 +1,198 @@
+import math
+import re
+from functools import lru_cache
+
+from django.conf import settings
+
+from .checks import CHECKS, normalize_question
+
+# Free-text question matching for ad-hoc analysis.  Every check is indexed
+# by its checklist question plus a few paraphrases, as TF-IDF weighted words
+# and character trigrams (the trigrams catch typos and word forms the
+# stemmer misses).  A question is scored against every check by cosine
+# similarity through an inverted index, which takes well under a
+# millisecond for the whole catalog.
+
+# Other ways analysts phrase what the checks look at; indexed with the question
+ALIASES = {
+    "primary_conversion_single": ["how many primary conversion actions are set", "multiple primary conversion goals"],
+    "purchase_conversions_tracked": ["is purchase conversion tracking recording revenue and value"],
+    "campaign_naming": ["campaign naming convention", "do campaigns follow a naming structure"],
+    "adgroup_keyword_count": ["ad groups with too many keywords", "number of keywords per ad group"],
+    "budget_lost_impression_share": ["campaigns limited by budget", "search lost impression share from budget"],
+    "legacy_bmm_keywords": ["broad match modifier keywords with plus signs", "old modified broad match"],
+    "search_adgroups_no_conversions": ["search ad groups with zero conversions", "non converting search ad groups"],
+    "seasonal_keywords": ["out of season keywords", "christmas black friday or back to school keywords running now"],
+    "low_search_volume_keywords": ["keywords marked low search volume or rarely served", "keywords with few impressions"],
+    "dsa_negative_targeting": ["dynamic search ads negative targets exclusions", "dsa page exclusions"],
+    "keyword_final_urls": ["keyword level final url landing page relevance", "do keywords have their own landing pages"],
+    "broken_final_urls": ["dead or 404 landing pages", "final urls that redirect or fail to load"],
+    "legacy_etas": ["old expanded text ads still running", "expanded text ads that should be replaced"],
+    "rsa_excellent_strength": ["responsive search ads ad strength excellent in each ad group"],
+    "rsa_asset_usage": ["do responsive search ads use 15 headlines and 4 descriptions", "rsa headline count"],
+    "ad_extensions": ["which extension or asset types are used", "sitelinks callouts call extensions snippets promotions"],
+    "sitelink_descriptions": ["sitelinks missing description lines", "sitelink description text"],
+    "audience_observation_mode": ["audience targeting setting observation or targeting", "affinity in market audiences"],
+    "pmax_audience_signals": ["performance max audience signals customer lists and interests"],
+    "pmax_video_assets": ["performance max asset groups without a video", "pmax youtube video asset"],
+    "display_adgroups_no_conversions": ["display ad groups with zero conversions or view through conversions"],
+}
+
+# Abbreviations and spellings rewritten before tokenizing
+SYNONYMS = {
+    "adgroups": "ad groups",
+    "adgroup": "ad group",
+    "ad-groups": "ad groups",
+    "ad-group": "ad group",
+    "kws": "keywords",
+    "kw": "keyword",
+    "convs": "conversions",
+    "conv": "conversion",
+    "cpa": "conversion cost",
+    "rsas": "responsive search ads",
+    "rsa": "responsive search ad",
+    "etas": "expanded text ads",
+    "eta": "expanded text ad",
+    "dsas": "dynamic search ads",
+    "dsa": "dynamic search ad",
+    "pmax": "performance max",
+    "p-max": "performance max",
+    "bmm": "broad match modifier",
+    "lps": "landing pages",
+    "lp": "landing page",
+    "urls": "url",
+    "links": "url",
+    "link": "url",
+    "404": "broken",
+    "dead": "broken",
+    "redirections": "redirect",
+    "redirection": "redirect",
+    "xmas": "christmas",
+    "in-market": "inmarket",
+    "in market": "inmarket",
+    "view-through": "viewthrough",
+    "view through": "viewthrough",
+    "impr": "impression",
+    "assets": "extension",
+    "asset": "extension",
+    "extensions": "extension",
+}
+
+STOP_WORDS = {
+    "a", "all", "an", "and", "any", "are", "as", "at", "be", "by", "do", "does", "for", "from", "has", "have",
+    "how", "i", "in", "is", "it", "its", "of", "on", "or", "our", "that", "the", "their", "there", "these",
+    "this", "to", "we", "what", "which", "with", "you",
+}
+
+# Weight of character trigrams against whole words
+TRIGRAM_WEIGHT = 0.5
+
+_synonym_re = re.compile(r"(?<![\w-])(" + "|".join(re.escape(s) for s in sorted(SYNONYMS, key=len, reverse=True))
+                         + r")(?![\w-])")
+
+
+def stem(word):
+    # Crude suffix stripping; enough to line up plurals and verb forms
+    for suffix in ("ing", "ed", "es", "s"):
+        if word.endswith(suffix) and len(word) - len(suffix) >= 3 and not word.endswith("ss"):
+            return word[:-len(suffix)]
+    return word
+
+
+def features(text):
+    # {feature: count}: stemmed words, plus character trigrams of each word
+    text = _synonym_re.sub(lambda m: SYNONYMS[m.group(1)], normalize_question(text))
+    counts = {}
+    for word in re.findall(r"[a-z0-9]+", text):
+        if word in STOP_WORDS:
+            continue
+        word = stem(word)
+        counts[word] = counts.get(word, 0) + 1
+        padded = f"#{word}#"
+        for i in range(len(padded) - 2):
+            gram = "3:" + padded[i:i + 3]
+            counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+
+def weigh(counts, idf):
+    # Sublinear TF-IDF, scaled to unit length; unknown features are dropped
+    vector = {}
+    for feature, count in counts.items():
+        if feature in idf:
+            weight = (1 + math.log(count)) * idf[feature]
+            vector[feature] = weight * (TRIGRAM_WEIGHT if feature.startswith("3:") else 1.0)
+    norm = math.sqrt(sum(w * w for w in vector.values()))
+    return {f: w / norm for f, w in vector.items()} if norm else {}
+
+
+class QuestionMatch:
+    def __init__(self, check_id, score, alternatives, confident):
+        self.check_id = check_id            # best match, None when nothing scores
+        self.score = score                  # cosine similarity, 0..1
+        self.alternatives = alternatives    # [(check_id, score), ...] after the best one
+        self.confident = confident
+
+    def __repr__(self):
+        return f"<QuestionMatch {self.check_id} {self.score:.2f}{'' if self.confident else ' ?'}>"
+
+
+class QuestionIndex:
+    """TF-IDF index of the check registry for free-text questions.
+
+    ``match`` returns the best check with a confidence score; it is
+    ``confident`` when the score reaches ``min_score`` and beats the
+    runner-up by ``min_margin``.  Otherwise the next ``k`` candidates
+    are there to choose from.
+    """
+
+    def __init__(self, checks, aliases=None, min_score=0.3, min_margin=0.05):
+        self.min_score = min_score
+        self.min_margin = min_margin
+        documents = {}
+        for c in checks:
+            counts = {}
+            for text in [c.question, *(aliases or {}).get(c.id, [])]:
+                for feature, count in features(text).items():
+                    counts[feature] = counts.get(feature, 0) + count
+            documents[c.id] = counts
+
+        n = len(documents)
+        frequency = {}
+        for counts in documents.values():
+            for feature in counts:
+                frequency[feature] = frequency.get(feature, 0) + 1
+        self.idf = {feature: math.log((1 + n) / (1 + df)) + 1 for feature, df in frequency.items()}
+
+        # feature -> [(check_id, weight), ...]
+        self.postings = {}
+        for check_id, counts in documents.items():
+            for feature, weight in weigh(counts, self.idf).items():
+                self.postings.setdefault(feature, []).append((check_id, weight))
+
+    def scores(self, question):
+        totals = {}
+        for feature, weight in weigh(features(question), self.idf).items():
+            for check_id, doc_weight in self.postings[feature]:
+                totals[check_id] = totals.get(check_id, 0.0) + weight * doc_weight
+        return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+    def match(self, question, k=3):
+        ranked = self.scores(question)
+        if not ranked:
+            return QuestionMatch(None, 0.0, [], False)
+        check_id, score = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+        confident = score >= self.min_score and score - runner_up >= self.min_margin
+        return QuestionMatch(check_id, round(score, 4), [(c, round(s, 4)) for c, s in ranked[1:k + 1]], confident)
+
+
+@lru_cache(maxsize=None)
+def get_question_index():
+    # Built once per process (warm_up builds it at startup)
+    return QuestionIndex(CHECKS.values(), ALIASES, min_score=settings.QA_QUESTION_MATCH_MIN_SCORE,
+                         min_margin=settings.QA_QUESTION_MATCH_MIN_MARGIN)
+
+
+def match_question(question, k=None):
+    return get_question_index().match(question, settings.QA_QUESTION_MATCH_TOP_K if k is None else k)
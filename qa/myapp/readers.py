@@ -0,0 +1,211 @@
+import importlib.util
+import json
+import os
+import time
+import zipfile
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+from .csv_export import CsvExportReader, is_csv_export
+
+
+class PandasReader:
+    # pandas' own Excel engines: "openpyxl", "calamine", or None for pandas' choice
+    def __init__(self, source, engine):
+        self.engine = engine or "default"
+        self.excel_file = pd.ExcelFile(source, engine=engine)
+
+    @property
+    def sheet_names(self):
+        return self.excel_file.sheet_names
+
+    def parse(self, sheet_name, usecols=None):
+        return self.excel_file.parse(sheet_name, usecols=usecols)
+
+    def close(self):
+        self.excel_file.close()
+
+
+class OpenpyxlStreamReader:
+    """Row-by-row openpyxl reader.
+
+    pandas' openpyxl engine converts every cell of a sheet into one big
+    list of lists before ``usecols`` is applied.  This reader walks the
+    read-only row iterator instead and converts only the selected columns,
+    so unused columns never reach Python objects.  Cell conversion mirrors
+    pandas so both produce the same DataFrame.
+    """
+
+    engine = "openpyxl_stream"
+
+    def __init__(self, source):
+        from openpyxl import load_workbook
+        self.book = load_workbook(source, read_only=True, data_only=True, keep_links=False)
+
+    @property
+    def sheet_names(self):
+        return [sheet.title for sheet in self.book.worksheets]
+
+    def parse(self, sheet_name, usecols=None):
+        sheet = self.book[sheet_name]
+        sheet.reset_dimensions()
+        rows = sheet.iter_rows()
+
+        if usecols is None:
+            return self._parse_all(rows)
+
+        header = next(rows, None)
+        if header is None:
+            return pd.DataFrame()
+        header = trim_row([convert_cell(cell) for cell in header])
+
+        # Column names exactly as pandas would build them (Unnamed: n, de-duplication)
+        names = list(TextParser([header], header=0).read().columns) if header else []
+        selected = [i for i, name in enumerate(names) if usecols(name)]
+
+        data = []
+        last_row_with_data = -1
+        for row_number, row in enumerate(rows):
+            if any(cell.value is not None and cell.value != "" for cell in row):
+                last_row_with_data = row_number
+            data.append([convert_cell(row[i]) if i < len(row) else "" for i in selected])
+        data = data[:last_row_with_data + 1]
+
+        return TextParser(data, names=[names[i] for i in selected], header=None, skip_blank_lines=False).read()
+
+    def _parse_all(self, rows):
+        # No pruning possible: same list-of-rows pandas builds
+        data = []
+        last_row_with_data = -1
+        for row_number, row in enumerate(rows):
+            converted = trim_row([convert_cell(cell) for cell in row])
+            if converted:
+                last_row_with_data = row_number
+            data.append(converted)
+        data = data[:last_row_with_data + 1]
+        if not data:
+            return pd.DataFrame()
+        width = max(len(row) for row in data)
+        data = [row + [""] * (width - len(row)) for row in data]
+        return TextParser(data, header=0, skip_blank_lines=False).read()
+
+    def close(self):
+        self.book.close()
+
+
+def convert_cell(cell):
+    # Same conversion as pandas' openpyxl reader
+    from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+
+    if cell.value is None:
+        return ""
+    elif cell.data_type == TYPE_ERROR:
+        return np.nan
+    elif cell.data_type == TYPE_NUMERIC:
+        val = int(cell.value)
+        if val == cell.value:
+            return val
+        return float(cell.value)
+    return cell.value
+
+
+def trim_row(row):
+    while row and row[-1] == "":
+        row.pop()
+    return row
+
+
+def calamine_available():
+    return importlib.util.find_spec("python_calamine") is not None
+
+
+def available_backends():
+    backends = ["openpyxl", "openpyxl_stream"]
+    if calamine_available():
+        backends.append("calamine")
+    return backends
+
+
+def source_size(source):
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    position = source.tell()
+    source.seek(0, os.SEEK_END)
+    size = source.tell()
+    source.seek(position)
+    return size
+
+
+def is_xlsx(source):
+    is_zip = zipfile.is_zipfile(source)
+    if not isinstance(source, (str, os.PathLike)):
+        source.seek(0)
+    return is_zip
+
+
+def choose_backend(source, stream_threshold):
+    # calamine is the fastest when installed; otherwise stream large files
+    if calamine_available():
+        return "calamine"
+    if not is_xlsx(source):
+        # Legacy .xls: let pandas pick its engine
+        return "default"
+    if source_size(source) >= stream_threshold:
+        return "openpyxl_stream"
+    return "openpyxl"
+
+
+def open_reader(source, backend="auto", stream_threshold=5 * 1024 * 1024):
+    if hasattr(source, "seek"):
+        # Open file handles may be shared by several readers (see compare_backends)
+        source.seek(0)
+    if is_csv_export(source):
+        # CSV exports have one reader whatever the Excel backend setting
+        return CsvExportReader(source)
+    if backend == "auto":
+        backend = choose_backend(source, stream_threshold)
+    if backend == "openpyxl_stream":
+        return OpenpyxlStreamReader(source)
+    if backend in ("openpyxl", "calamine"):
+        return PandasReader(source, engine=backend)
+    if backend == "default":
+        return PandasReader(source, engine=None)
+    raise ValueError(f"Unknown Excel reader backend '{backend}'.")
+
+
+def compare_backends(source, sheets, backends=None):
+    # Time every available backend on the same sheets/columns: {backend: seconds}
+    timings = {}
+    for backend in backends or available_backends():
+        reader = open_reader(source, backend)
+        try:
+            started = time.perf_counter()
+            for sheet_name, usecols in sheets.items():
+                reader.parse(sheet_name, usecols=usecols)
+            timings[backend] = time.perf_counter() - started
+        finally:
+            reader.close()
+    return timings
+
+
+def record_timings(log_path, upload_name, source, workbook, compare=False):
+    # One JSON line per upload: chosen backend, per-sheet parse time, optional comparison
+    record = {
+        "time": datetime.now(timezone.utc).isoformat(),
+        "upload": upload_name,
+        "size": source_size(source),
+        "backend": workbook.backend,
+        "sheets": {name: round(seconds, 4) for name, seconds in workbook.timings.items()},
+        "total": round(sum(workbook.timings.values()), 4),
+    }
+    if compare and workbook.backend != CsvExportReader.engine:
+        sheets = {name: workbook.usecols(name) for name in workbook.timings}
+        record["comparison"] = {b: round(s, 4) for b, s in compare_backends(source, sheets).items()}
+
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    with open(log_path, "a", encoding="utf-8") as log:
+        log.write(json.dumps(record) + "\n")
+    return record
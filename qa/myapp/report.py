@@ -0,0 +1,252 @@
+import importlib.util
+import io
+import logging
+import queue
+import threading
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+from . import metrics
+from .charts import render_chart
+
+logger = logging.getLogger(__name__)
+
+# Excel's hard limit; longer tables continue on another sheet
+MAX_ROWS_PER_SHEET = 1048576
+# Rows converted to Python values at a time
+CHUNK_ROWS = 10000
+
+
+def xlsxwriter_available():
+    return importlib.util.find_spec("xlsxwriter") is not None
+
+
+def summary_rows(results, sheet_names):
+    summary = []
+    for item, names in zip(results, sheet_names):
+        result = item["Result"]
+        message = f"{result.icon} {result.message}"
+        if names:
+            message += " (see sheet " + ", ".join(f"'{name}'" for name in names) + ")"
+        summary.append({
+            "Question": item["Question"],
+            "Status": result.status,
+            "Result Summary": message,
+            "Time (s)": item.get("Time"),
+        })
+    return summary
+
+
+def plan_sheets(results, max_rows=MAX_ROWS_PER_SHEET):
+    """Sheet layout of the report: ``[[(sheet, table, first_row, last_row), ...], ...]`` per result.
+
+    Question n's tables go to Qnn, Qnn_2, ...; a table too long for one
+    sheet continues on the next.
+    """
+    plan = []
+    for i, item in enumerate(results):
+        parts = []
+        for table in item["Result"].frames():
+            body_rows = max_rows - (2 if table.title else 1)
+            start = 0
+            while True:
+                stop = min(start + body_rows, len(table.df))
+                index = len(parts) + 1
+                name = f"Q{i+1:02d}" if index == 1 else f"Q{i+1:02d}_{index}"
+                parts.append((name[:31], table, start, stop))
+                start = stop
+                if start >= len(table.df):
+                    break
+        plan.append(parts)
+    return plan
+
+
+def column_values(series):
+    # One column of a chunk as Python values xlsxwriter can write; None for blanks
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(object)
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        if series.dt.tz is not None:
+            series = series.dt.tz_localize(None)
+        return [None if pd.isna(v) else v.to_pydatetime() for v in series]
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return [None if pd.isna(v) else bool(v) for v in series]
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        is_int = pd.api.types.is_integer_dtype(series.dtype)
+        return [None if not np.isfinite(v) else (int(v) if is_int else float(v)) for v in values]
+    return [cell_value(v) for v in series]
+
+
+def cell_value(value):
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return float(value) if np.isfinite(value) else None
+    if isinstance(value, pd.Timestamp):
+        return value.tz_localize(None).to_pydatetime() if value.tz is not None else value.to_pydatetime()
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    if isinstance(value, (str, date)):
+        return value
+    return str(value)
+
+
+def write_report(results, output):
+    """Write the QA report to ``output`` (a path or a writable binary file).
+
+    Uses xlsxwriter in constant_memory mode when it is installed: rows are
+    streamed to disk as they are written, so memory stays flat however
+    many detail rows the checks return.  Falls back to pandas + openpyxl.
+    """
+    with metrics.stage(metrics.REPORT_SECONDS, metrics.REPORT_MEMORY):
+        if xlsxwriter_available():
+            write_report_xlsxwriter(results, output)
+        else:
+            write_report_openpyxl(results, output)
+
+
+def write_report_xlsxwriter(results, output):
+    import xlsxwriter
+
+    plan = plan_sheets(results)
+    workbook = xlsxwriter.Workbook(output, {"constant_memory": True, "strings_to_urls": False,
+                                            "strings_to_formulas": False})
+    try:
+        header = workbook.add_format({"bold": True, "bg_color": "#F2F2F2", "border": 1})
+        title_format = workbook.add_format({"bold": True, "font_size": 12})
+        date_format = workbook.add_format({"num_format": "yyyy-mm-dd hh:mm:ss"})
+
+        # Rows must go out top to bottom in constant_memory mode, one sheet at a time
+        summary = pd.DataFrame(summary_rows(results, [[p[0] for p in parts] for parts in plan]))
+        write_table(workbook.add_worksheet("Summary"), summary, None, 0, len(summary), header, title_format, date_format)
+        for parts in plan:
+            for name, table, start, stop in parts:
+                worksheet = workbook.add_worksheet(name)
+                write_table(worksheet, table.df, table.title, start, stop, header, title_format, date_format)
+                if table.chart:
+                    # Same cached render as the results page, as PNG; a chart that can't be
+                    # drawn leaves its data table without the picture rather than failing the report
+                    try:
+                        image = io.BytesIO(render_chart(table.chart, "png"))
+                    except Exception:
+                        logger.exception("Could not draw the chart of '%s'", name)
+                        continue
+                    worksheet.insert_image(1, len(table.df.columns) + 1, "chart.png", {"image_data": image})
+    finally:
+        workbook.close()
+
+
+def write_table(worksheet, df, title, start, stop, header, title_format, date_format):
+    row = 0
+    if title:
+        worksheet.write(row, 0, title, title_format)
+        row += 1
+    header_row = row
+    columns = [str(c) for c in df.columns]
+
+    # Widths from the header and the first rows; the body can't be revisited later
+    sample = df.iloc[start:min(stop, start + 100)]
+    for col, name in enumerate(columns):
+        width = max([len(name)] + [len(str(v)) for v in sample.iloc[:, col].tolist()]) if len(sample) else len(name)
+        is_date = pd.api.types.is_datetime64_any_dtype(df.dtypes.iloc[col])
+        worksheet.set_column(col, col, min(max(width, 19 if is_date else 8) + 2, 60), date_format if is_date else None)
+
+    worksheet.write_row(row, 0, columns, header)
+    row += 1
+
+    for chunk_start in range(start, stop, CHUNK_ROWS):
+        chunk = df.iloc[chunk_start:min(chunk_start + CHUNK_ROWS, stop)]
+        values = [column_values(chunk.iloc[:, col]) for col in range(len(columns))]
+        for cells in zip(*values):
+            worksheet.write_row(row, 0, cells)
+            row += 1
+
+    if columns:
+        worksheet.freeze_panes(header_row + 1, 0)
+        worksheet.autofilter(header_row, 0, max(row - 1, header_row), len(columns) - 1)
+
+
+def write_report_openpyxl(results, output):
+    plan = plan_sheets(results)
+    with pd.ExcelWriter(output, engine="openpyxl") as writer:
+        summary = pd.DataFrame(summary_rows(results, [[p[0] for p in parts] for parts in plan]))
+        summary.to_excel(writer, sheet_name="Summary", index=False)
+        for parts in plan:
+            for name, table, start, stop in parts:
+                startrow = 0
+                if table.title:
+                    pd.DataFrame(columns=[table.title]).to_excel(writer, sheet_name=name, index=False)
+                    startrow = 1
+                table.df.iloc[start:stop].to_excel(writer, sheet_name=name, startrow=startrow, index=False)
+                worksheet = writer.sheets[name]
+                worksheet.freeze_panes = worksheet.cell(row=startrow + 2, column=1)
+                worksheet.auto_filter.ref = worksheet.dimensions.replace("A1", f"A{startrow + 1}", 1)
+
+
+# Streaming ------------------------------------------------------------------
+
+class _QueueWriter:
+    # Write-only file object handing each chunk of the finished .xlsx to the reader
+    def __init__(self, offer):
+        self.offer = offer
+        self.written = 0
+
+    def write(self, data):
+        if not self.offer(bytes(data)):
+            raise OSError("Report download was closed by the client.")
+        self.written += len(data)
+        return len(data)
+
+    def tell(self):
+        # No seek(): zipfile then writes data descriptors instead of going back
+        return self.written
+
+    def flush(self):
+        pass
+
+
+def stream_report(results):
+    """Yield the report as it is written, e.g. for a StreamingHttpResponse.
+
+    The writer runs on a worker thread; at most a few chunks are buffered
+    between it and the client.  If the client goes away the writer stops.
+    """
+    chunks = queue.Queue(maxsize=16)
+    stopped = threading.Event()
+    done = object()
+
+    def offer(item):
+        while not stopped.is_set():
+            try:
+                chunks.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            write_report(results, _QueueWriter(offer))
+        except BaseException as e:
+            offer(e)
+        finally:
+            offer(done)
+
+    threading.Thread(target=produce, name="qa-report", daemon=True).start()
+    try:
+        while True:
+            item = chunks.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stopped.set()
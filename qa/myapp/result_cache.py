@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+from datetime import timedelta
+
+import pandas as pd
+from django.conf import settings
+from django.utils import timezone
+
+from .models import AuditReport, CheckResult
+from .results import Result, row_from_json, row_to_json
+from .url_cache import BATCH_SIZE, batched
+
+# Bump when a check's logic or result format changes so old entries stop matching
+CACHE_VERSION = "7"
+
+
+def hash_file(source, chunk_size=1024 * 1024):
+    # source: a path or a binary file handle (read from the start, then rewound)
+    digest = hashlib.sha256()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+    else:
+        source.seek(0)
+        for chunk in iter(lambda: source.read(chunk_size), b""):
+            digest.update(chunk)
+        source.seek(0)
+    return digest.hexdigest()
+
+
+def checklist_hash(questions):
+    # A cached report is only valid for the checklist it was built from, and
+    # for the other inputs of its checks (e.g. the day seasons were judged on)
+    from .checks import CHECKS
+
+    inputs = [f"{c.id}={c.inputs()}" for c in CHECKS.values() if c.inputs is not None]
+    return hashlib.sha256("\n".join([CACHE_VERSION, *questions, *inputs]).encode("utf-8")).hexdigest()
+
+
+def check_key(check, fingerprint):
+    # Cache key of one check's result: its sheet's fingerprint, mixed with the check's other inputs
+    if fingerprint is None or check.inputs is None:
+        return fingerprint
+    return hashlib.sha256(f"{fingerprint}\n{check.inputs()}".encode("utf-8")).hexdigest()
+
+
+def sheet_fingerprint(df):
+    """SHA-256 of a parsed, normalized sheet: headers, dtypes and every value.
+
+    Only the columns that were read take part, so edits to columns no check
+    looks at keep the fingerprint.  Returns None for sheets pandas cannot
+    hash, which are then never cached.
+    """
+    digest = hashlib.sha256(CACHE_VERSION.encode("utf-8"))
+    digest.update(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode("utf-8"))
+    # A reduced sheet's ad-group totals come from rows it no longer has
+    digest.update(df.attrs.get("totals_digest", "").encode("utf-8"))
+    try:
+        digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    except TypeError:
+        return None
+    return digest.hexdigest()
+
+
+class CachedReport:
+    def __init__(self, results, report_url):
+        self.results = results
+        self.report_url = report_url
+
+
+class AuditResultCache:
+    """Audit results persisted in the project database.
+
+    Whole reports are keyed by the SHA-256 of the uploaded file, so the same
+    export uploaded again gets its report back without being parsed.  Check
+    results are keyed by ``(check id, sheet fingerprint)``: when only some
+    sheets changed, checks on the unchanged sheets are served from here.
+    Checks with ``inputs`` (see checks.py) mix those into both keys.
+    Entries older than ``ttl`` seconds are ignored (the link check depends
+    on live pages), and the least recently used are evicted past
+    ``max_reports`` / ``max_results``.
+    """
+
+    def __init__(self, ttl, max_reports, max_results):
+        self.ttl = timedelta(seconds=ttl)
+        self.max_reports = max_reports
+        self.max_results = max_results
+
+    def lookup_report(self, upload_hash, questions):
+        now = timezone.now()
+        report = AuditReport.objects.filter(
+            upload_hash=upload_hash,
+            checklist_hash=checklist_hash(questions),
+            created_at__gt=now - self.ttl,
+        ).first()
+        if report is None or not report_exists(report.report_url):
+            return None
+        AuditReport.objects.filter(pk=report.pk).update(last_used=now)
+        return CachedReport([row_from_json(row) for row in report.results], report.report_url)
+
+    def store_report(self, upload_hash, questions, sheet_fingerprints, results, report_url):
+        now = timezone.now()
+        AuditReport.objects.update_or_create(
+            upload_hash=upload_hash,
+            defaults={
+                "checklist_hash": checklist_hash(questions),
+                "sheet_fingerprints": sheet_fingerprints,
+                "results": [row_to_json(row) for row in results],
+                "report_url": report_url,
+                "created_at": now,
+                "last_used": now,
+            },
+        )
+        evict(AuditReport, self.max_reports)
+
+    def lookup_checks(self, keys):
+        # keys: [(check_id, fingerprint), ...] -> {(check_id, fingerprint): (Result, seconds)}
+        now = timezone.now()
+        fingerprints = {fingerprint for _, fingerprint in keys}
+        wanted = set(keys)
+        found = {}
+        used = []
+        for batch in batched(fingerprints):
+            rows = CheckResult.objects.filter(sheet_fingerprint__in=batch, created_at__gt=now - self.ttl)
+            for row in rows:
+                key = (row.check_id, row.sheet_fingerprint)
+                if key in wanted:
+                    found[key] = (Result.from_dict(json.loads(row.result)), row.seconds)
+                    used.append(row.pk)
+        for batch in batched(used):
+            CheckResult.objects.filter(pk__in=batch).update(last_used=now)
+        return found
+
+    def store_checks(self, entries):
+        # entries: {(check_id, fingerprint): (Result, seconds)}
+        now = timezone.now()
+        rows = [
+            CheckResult(check_id=check_id, sheet_fingerprint=fingerprint, result=json.dumps(result.to_dict()),
+                        seconds=seconds, created_at=now, last_used=now)
+            for (check_id, fingerprint), (result, seconds) in entries.items()
+        ]
+        CheckResult.objects.bulk_create(
+            rows,
+            batch_size=BATCH_SIZE // 8,
+            update_conflicts=True,
+            unique_fields=["check_id", "sheet_fingerprint"],
+            update_fields=["result", "seconds", "created_at", "last_used"],
+        )
+        evict(CheckResult, self.max_results)
+
+
+def report_exists(report_url):
+    # The report file may have been cleaned out of MEDIA_ROOT since
+    name = os.path.basename(report_url)
+    return bool(name) and os.path.exists(os.path.join(settings.MEDIA_ROOT, name))
+
+
+def evict(model, max_entries):
+    if model.objects.count() <= max_entries:
+        return
+    stale = model.objects.order_by("-last_used", "-pk").values("pk")[max_entries:]
+    model.objects.filter(pk__in=stale).delete()
+
+
+def default_cache():
+    if not settings.QA_RESULT_CACHE:
+        return None
+    return AuditResultCache(
+        ttl=settings.QA_RESULT_CACHE_TTL,
+        max_reports=settings.QA_RESULT_CACHE_MAX_REPORTS,
+        max_results=settings.QA_RESULT_CACHE_MAX_CHECKS,
+    )
@@ -0,0 +1,191 @@
+import json
+import logging
+
+import pandas as pd
+from django.conf import settings
+from django.urls import reverse
+from django.utils.html import escape
+
+from .charts import chart_data_uri
+
+logger = logging.getLogger(__name__)
+
+# Result statuses
+PASS = "pass"           # the account meets the checklist item
+FAIL = "fail"           # issues found; details are in the tables
+INFO = "info"           # summary only, nothing to pass or fail
+MISSING = "missing"     # the sheet or the columns the check needs are not there
+ERROR = "error"         # the check crashed or timed out
+
+ICONS = {PASS: "✅", FAIL: "⚠️", INFO: "ℹ️", MISSING: "❌", ERROR: "❌"}
+
+
+class Table:
+    """A check's detail table.
+
+    Tables longer than QA_TABLE_PAGE_SIZE rows are saved to the table store
+    (see table_store.py) when the result is serialized or rendered: the
+    results page shows the first page and fetches the rest from the
+    ``result_table`` endpoint, and serialized results only carry that first
+    page.  ``df`` loads the full table back from the store when needed.
+    """
+
+    def __init__(self, df, title="", chart=None):
+        self._df = df
+        self.title = title
+        self.chart = chart      # chart drawn next to the table in the Excel report
+        self.key = None         # table store key, once saved
+        self._rows = None
+        self._preview = None
+
+    @classmethod
+    def stored(cls, key, title, rows, preview, chart=None):
+        table = cls(None, title, chart)
+        table.key = key
+        table._rows = rows
+        table._preview = preview
+        return table
+
+    @property
+    def df(self):
+        if self._df is None:
+            from .table_store import load_table
+            # An evicted table leaves only the first page
+            self._df = load_table(self.key)
+            if self._df is None:
+                self._df = self._preview
+        return self._df
+
+    @property
+    def total_rows(self):
+        return len(self._df) if self._df is not None else self._rows
+
+    def preview(self, rows):
+        source = self._df if self._df is not None else self._preview
+        return source.head(rows)
+
+    def paged(self):
+        return self.total_rows > settings.QA_TABLE_PAGE_SIZE
+
+    def save(self):
+        if self.key is None:
+            from .table_store import save_table
+            self.key = save_table(self._df)
+        return self.key
+
+    def html(self):
+        page_size = settings.QA_TABLE_PAGE_SIZE
+        html = self.preview(page_size).to_html(index=False, classes="table")
+        if not self.paged():
+            return html
+        # First page only; the page script fetches the others
+        return (f"<div class='qa-table' data-url='{reverse('result_table', args=[self.save()])}' "
+                f"data-total='{self.total_rows}' data-page-size='{page_size}'>"
+                f"<input type='search' class='qa-search' placeholder='Filter {self.total_rows} rows'/>"
+                f"{html}"
+                f"<div class='qa-pager'><button type='button' class='qa-prev'>&lsaquo; Prev</button> "
+                f"<span class='qa-info'>Rows 1-{page_size} of {self.total_rows}</span> "
+                f"<button type='button' class='qa-next'>Next &rsaquo;</button></div></div>")
+
+    def to_dict(self):
+        if not self.paged():
+            return {"title": self.title, "data": split_json(self.df), "chart": self.chart}
+        return {"title": self.title, "key": self.save(), "rows": self.total_rows,
+                "preview": split_json(self.preview(settings.QA_TABLE_PAGE_SIZE)), "chart": self.chart}
+
+    @classmethod
+    def from_dict(cls, data):
+        if "key" in data:
+            preview = data["preview"]
+            return cls.stored(data["key"], data["title"], data["rows"],
+                              pd.DataFrame(preview["data"], columns=preview["columns"]), data.get("chart"))
+        return cls(pd.DataFrame(data["data"]["data"], columns=data["data"]["columns"]), data["title"],
+                   data.get("chart"))
+
+
+class Result:
+    """What a check returns: a status, a one-line message, detail tables and
+    optional chart data.  The results page and the Excel report both render
+    from this object, and it round-trips through JSON (``to_dict`` /
+    ``from_dict``) for background jobs and the result cache.
+
+    ``chart`` is a plain dict, e.g. ``{"kind": "pie", "labels": [...],
+    "values": [...], "colors": [...]}``; see charts.py for the other keys.
+    """
+
+    def __init__(self, status, message, tables=(), chart=None):
+        self.status = status
+        self.message = message
+        self.tables = [t if isinstance(t, Table) else Table(t) for t in tables]
+        self.chart = chart
+        self._html = None
+
+    def __repr__(self):
+        return f"<Result {self.status}: {self.message[:40]}>"
+
+    @property
+    def icon(self):
+        return ICONS.get(self.status, "")
+
+    @property
+    def failed(self):
+        return self.status == ERROR
+
+    @property
+    def html(self):
+        # Rendered once per object; the page may ask for it more than once
+        if self._html is None:
+            parts = [f"{self.icon} {escape(self.message)}"]
+            for table in self.tables:
+                title = f"{escape(table.title)}:<br>" if table.title else ""
+                parts.append(title + table.html())
+            if self.chart:
+                # A chart that can't be drawn is left out, not the whole result
+                try:
+                    parts.append(f"<img src='{chart_data_uri(self.chart, settings.QA_CHART_FORMAT)}' width='400'/>")
+                except Exception:
+                    logger.exception("Could not draw the chart of result '%s'", self.message)
+            self._html = "<br>".join(parts)
+        return self._html
+
+    def frames(self):
+        # Everything the Excel report writes for this result, as Tables
+        frames = list(self.tables)
+        if self.chart:
+            frames.append(Table(pd.DataFrame({"Label": self.chart["labels"], "Value": self.chart["values"]}),
+                                title="Chart data", chart=self.chart))
+        return frames
+
+    def to_dict(self):
+        return {
+            "status": self.status,
+            "message": self.message,
+            "tables": [t.to_dict() for t in self.tables],
+            "chart": self.chart,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        tables = [Table.from_dict(t) for t in data.get("tables", [])]
+        return cls(data["status"], data["message"], tables, data.get("chart"))
+
+
+def split_json(df):
+    return json.loads(df.to_json(orient="split", index=False, date_format="iso"))
+
+
+def as_result(value):
+    # Checks return Result; a bare string is treated as an informational message
+    if isinstance(value, Result):
+        return value
+    return Result(INFO, str(value))
+
+
+def row_to_json(row):
+    # Results rows keep Result objects in memory and plain dicts in the database
+    return dict(row, Result=row["Result"].to_dict())
+
+
+def row_from_json(row):
+    return dict(row, Result=Result.from_dict(row["Result"]))
+
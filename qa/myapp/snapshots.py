@@ -0,0 +1,185 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+
+from django.conf import settings
+
+from .executor import arrow_available
+
+# Parsed sheets of uploaded workbooks, kept as uncompressed Arrow IPC files
+# so the same upload can be audited again without parsing the Excel file.
+# Snapshots hold sheets after normalize_sheet, so bump SNAPSHOT_VERSION
+# whenever the readers or normalize.py change what a parsed sheet looks like.
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = "1"
+
+
+def covers(stored, wanted):
+    # Columns a sheet was read for (None: all of them) against the columns wanted now
+    if stored is None:
+        return True
+    return wanted is not None and set(wanted) <= set(stored)
+
+
+class WorkbookSnapshot:
+    """The snapshotted sheets of one upload, in ``directory``.
+
+    Each sheet is one Arrow file that remembers which columns it was read
+    for.  ``load`` memory-maps it and converts only the wanted columns, so
+    the frame matches what parsing the workbook with the same columns
+    gives.  ``sheet_names`` is None until the workbook was opened once.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.written = 0
+        self.sheet_names = self._read_names()
+
+    def _read_names(self):
+        try:
+            with open(os.path.join(self.directory, "sheets.json"), encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != SNAPSHOT_VERSION:
+            return None
+        return data["sheets"]
+
+    def save_sheet_names(self, sheet_names):
+        self.sheet_names = list(sheet_names)
+        path = os.path.join(self.directory, "sheets.json")
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            write_atomic(path, json.dumps({"version": SNAPSHOT_VERSION, "sheets": self.sheet_names}).encode("utf-8"))
+        except OSError as e:
+            logger.warning("Could not write snapshot %s: %s", path, e)
+
+    def sheet_path(self, sheet_name):
+        return os.path.join(self.directory, hashlib.sha1(sheet_name.encode("utf-8")).hexdigest()[:16] + ".arrow")
+
+    def load(self, sheet_name, wanted=None):
+        # The normalized sheet, or None when it isn't here for these columns
+        import pyarrow as pa
+
+        try:
+            with pa.memory_map(self.sheet_path(sheet_name), "r") as source:
+                reader = pa.ipc.open_file(source)
+                meta = reader.schema.metadata or {}
+                if meta.get(b"qa_version") != SNAPSHOT_VERSION.encode("utf-8"):
+                    return None
+                if not covers(json.loads(meta[b"qa_columns"]), wanted):
+                    return None
+                table = reader.read_all()
+                if wanted is not None:
+                    table = table.select([c for c in table.column_names if c in wanted])
+                df = table.to_pandas()
+        except FileNotFoundError:
+            return None
+        except (OSError, KeyError, ValueError, pa.ArrowException) as e:
+            logger.warning("Ignoring snapshot of sheet '%s' in %s: %s", sheet_name, self.directory, e)
+            return None
+        df.attrs["normalized"] = True
+        return df
+
+    def save(self, sheet_name, df, wanted=None):
+        import pyarrow as pa
+
+        if not all(isinstance(c, str) for c in df.columns):
+            return False
+        path = self.sheet_path(sheet_name)
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            table = table.replace_schema_metadata({
+                **(table.schema.metadata or {}),
+                b"qa_version": SNAPSHOT_VERSION.encode("utf-8"),
+                b"qa_sheet": sheet_name.encode("utf-8"),
+                b"qa_columns": json.dumps(None if wanted is None else sorted(wanted)).encode("utf-8"),
+            })
+            os.makedirs(self.directory, exist_ok=True)
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            write_atomic(path, sink.getvalue())
+        except (OSError, TypeError, ValueError, pa.ArrowException) as e:
+            # e.g. object columns mixing numbers and text; the sheet is parsed again next time
+            logger.info("Sheet '%s' not snapshotted: %s", sheet_name, e)
+            return False
+        self.written += 1
+        return True
+
+
+def write_atomic(path, data):
+    # Readers never see a half-written file, even from other processes
+    tmp = f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+class SnapshotStore:
+    """Snapshots of parsed uploads under ``directory``, one folder per upload hash.
+
+    Uploads are keyed by the SHA-256 of the file, so auditing a workbook
+    again (after a checklist change, or with new check code) reads its
+    sheets from here.  Past ``max_bytes`` on disk the least recently used
+    uploads are deleted.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = str(directory)
+        self.max_bytes = max_bytes
+
+    def open(self, upload_hash):
+        directory = os.path.join(self.directory, upload_hash)
+        if os.path.isdir(directory):
+            try:
+                # Mark as used for eviction
+                os.utime(directory)
+            except OSError:
+                pass
+        return WorkbookSnapshot(directory)
+
+    def usage(self):
+        # [(last used, bytes, upload hash), ...]
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                used = os.stat(path).st_mtime
+                size = sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+            except OSError:
+                continue
+            entries.append((used, size, name))
+        return entries
+
+    def evict(self, keep=()):
+        # Delete least recently used uploads until the store fits max_bytes; returns how many went
+        entries = self.usage()
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name in keep:
+                continue
+            shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
+
+
+def default_snapshots():
+    if not settings.QA_SNAPSHOTS or not arrow_available():
+        return None
+    return SnapshotStore(settings.QA_SNAPSHOT_DIR, settings.QA_SNAPSHOT_MAX_BYTES)
@@ -0,0 +1,188 @@
+import numpy as np
+import pandas as pd
+
+from .report import write_table, xlsxwriter_available
+
+# Synthetic Google Ads Script exports for tests and benchmarks.  Every sheet
+# a check reads is present, with the columns the checks expect and a mix of
+# passing and failing rows, scaled from the number of keyword rows.
+
+CAMPAIGN_TYPES = ["SEARCH", "DISPLAY", "PERFORMANCE_MAX", "VIDEO"]
+MATCH_TYPES = ["EXACT", "PHRASE", "BROAD"]
+AD_STRENGTHS = ["EXCELLENT", "GOOD", "AVERAGE", "POOR"]
+EXTENSION_TYPES = ["SITELINK", "CALLOUT", "CALL", "STRUCTURED_SNIPPET", "PROMOTION"]
+CONVERSION_CATEGORIES = ["PURCHASE", "LEAD", "SIGNUP", "PAGE_VIEW", "ADD_TO_CART", "PHONE_CALL_LEAD"]
+WORDS = ["running", "shoes", "trail", "women", "men", "sale", "cheap", "best", "buy", "online", "red", "leather",
+         "boots", "sandals", "kids", "waterproof", "store", "near me", "discount", "brand"]
+SEASONAL = ["holiday", "black friday", "back to school", "christmas"]
+
+
+def workbook_frames(keywords=10000, seed=0, url_base="https://www.example.com"):
+    """{sheet name: DataFrame} of one synthetic account with ``keywords`` keyword rows.
+
+    The same arguments always give the same data.  Final URLs point at
+    ``url_base``; at most 500 distinct landing pages are used.
+    """
+    rng = np.random.default_rng(seed)
+    adgroups = max(1, keywords // 15)
+    campaigns = max(1, adgroups // 12)
+
+    campaign_names = np.array([f"{'NX_' if i % 10 else ''}Campaign {i}" for i in range(campaigns)], dtype=object)
+    campaign_types = np.array(CAMPAIGN_TYPES, dtype=object)[rng.integers(0, len(CAMPAIGN_TYPES), campaigns)]
+    adgroup_campaign = rng.integers(0, campaigns, adgroups)
+    adgroup_names = np.array([f"Ad group {i}" for i in range(adgroups)], dtype=object)
+    adgroup_types = np.where(campaign_types[adgroup_campaign] == "DISPLAY", "DISPLAY_STANDARD", "SEARCH_STANDARD")
+
+    def pick(values, n, p=None):
+        return np.array(values, dtype=object)[rng.choice(len(values), n, p=p)]
+
+    def maybe_null(values, rate):
+        values = values.astype(object)
+        values[rng.random(len(values)) < rate] = None
+        return values
+
+    # Keywords: a few legacy BMM (+word), seasonal, rarely served and URL-less rows
+    kw_adgroup = np.sort(rng.integers(0, adgroups, keywords))
+    first, second = pick(WORDS, keywords), pick(WORDS, keywords)
+    bmm = rng.random(keywords) < 0.05
+    seasonal = rng.random(keywords) < 0.02
+    keyword_text = np.where(bmm, "+" + first + " +" + second, first + " " + second)
+    keyword_text = np.where(seasonal, pick(SEASONAL, keywords) + " " + second, keyword_text)
+    pages = rng.integers(0, 500, keywords)
+    impressions = rng.integers(0, 5000, keywords)
+    clicks = (impressions * rng.random(keywords) * 0.1).astype(int)
+    keyword_data = pd.DataFrame({
+        "Campaign Name": campaign_names[adgroup_campaign[kw_adgroup]],
+        "Adgroup Name": adgroup_names[kw_adgroup],
+        "Adgroup Type": adgroup_types[kw_adgroup],
+        "Keyword Name": keyword_text,
+        "Keyword": keyword_text,
+        "Keyword MatchType": pick(MATCH_TYPES, keywords),
+        "Status Reason": pick(["ELIGIBLE", "RARELY_SERVED", "LOW_QUALITY"], keywords, p=[0.9, 0.07, 0.03]),
+        "Keyword Final URLs": maybe_null(np.array([f"{url_base}/p/{i}" for i in pages], dtype=object), 0.03),
+        "Impressions": impressions,
+        "Clicks": clicks,
+        "Cost": np.round(clicks * rng.random(keywords) * 2, 2),
+        "Conversions": np.round(clicks * rng.random(keywords) * 0.05, 1),
+    })
+
+    campaign_data = pd.DataFrame({
+        "Campaign": [f"{i}" for i in range(campaigns)],
+        "Campaign Name": campaign_names,
+        "Campaign Type": campaign_types,
+        "Campaign Status": pick(["ENABLED", "PAUSED"], campaigns, p=[0.85, 0.15]),
+        "Conversions": np.round(rng.random(campaigns) * 50 * (rng.random(campaigns) > 0.2), 1),
+        "Search Budget Lost Impression Share": np.round(rng.random(campaigns) * 30, 2),
+        "Cost": np.round(rng.random(campaigns) * 10000, 2),
+    })
+
+    adgroup_data = pd.DataFrame({
+        "Campaign Name": campaign_names[adgroup_campaign],
+        "Adgroup Name": adgroup_names,
+        "Adgroup Type": adgroup_types,
+        "Adgroup Status": pick(["ENABLED", "PAUSED"], adgroups, p=[0.9, 0.1]),
+        "Conversions": np.round(rng.random(adgroups) * 10 * (rng.random(adgroups) > 0.3), 1),
+        "View Through Conversions": rng.integers(0, 5, adgroups) * (rng.random(adgroups) > 0.4),
+    })
+
+    # Three ads per ad group, mostly RSAs, some legacy ETAs
+    ads = adgroups * 3
+    ad_adgroup = np.repeat(np.arange(adgroups), 3)
+    ad_types = pick(["RESPONSIVE_SEARCH_AD", "EXPANDED_DYNAMIC_SEARCH_AD", "EXPANDED_TEXT_AD"], ads, p=[0.85, 0.05, 0.1])
+    ad_data = pd.DataFrame({
+        "Campaign Name": campaign_names[adgroup_campaign[ad_adgroup]],
+        "Adgroup Name": adgroup_names[ad_adgroup],
+        "Ad Type": ad_types,
+        "Ad Strength": maybe_null(pick(AD_STRENGTHS, ads), 0.05),
+    })
+    rsa = ad_data[ad_data["Ad Type"] == "RESPONSIVE_SEARCH_AD"].reset_index(drop=True)
+    rsa_ad_data = pd.DataFrame({
+        "Campaign Name": rsa["Campaign Name"],
+        "Adgroup Name": rsa["Adgroup Name"],
+        "Ad Type": "RESPONSIVE_SEARCH_AD",
+        "RSA Headlines Count": np.minimum(15, rng.integers(3, 19, len(rsa))),
+        "RSA Descriptions Count": np.minimum(4, rng.integers(2, 6, len(rsa))),
+    })
+
+    conversions = 12
+    conversion_data = pd.DataFrame({
+        "Conversion Action Name": [f"Conversion {i}" for i in range(conversions)],
+        "Conversion Action Category": pick(CONVERSION_CATEGORIES, conversions),
+        "Conversion Action Primary for Goal": pick(["TRUE", "FALSE"], conversions),
+        "All Conversions": np.round(rng.random(conversions) * 500, 1),
+        "All Conversions Value": np.round(rng.random(conversions) * 20000, 2),
+        "Conversions": np.round(rng.random(conversions) * 400, 1),
+    })
+
+    dsa_rows = max(1, campaigns // 4)
+    dsa = pd.DataFrame({
+        "Campaign": [f"DSA {i}" for i in range(dsa_rows)],
+        "Campaign type": "Dynamic Search Ads",
+        "Dynamic ad target": maybe_null(np.array([f"URL contains /p/{i}" for i in range(dsa_rows)], dtype=object), 0.2),
+    })
+
+    extension_rows = campaigns * 6
+    extension_campaign = rng.integers(0, campaigns, extension_rows)
+    extensions_data = pd.DataFrame({
+        "Campaign Name": campaign_names[extension_campaign],
+        "Campaign Type": campaign_types[extension_campaign],
+        "Feed Item Status": maybe_null(pick(["ENABLED", "REMOVED"], extension_rows, p=[0.9, 0.1]), 0.1),
+        "Extension Type": maybe_null(pick(EXTENSION_TYPES, extension_rows), 0.15),
+    })
+
+    sitelinks = campaigns * 4
+    extensions = pd.DataFrame({
+        "Sitelink text": [f"Sitelink {i}" for i in range(sitelinks)],
+        "Sitelink description": maybe_null(np.array([f"Shop range {i}" for i in range(sitelinks)], dtype=object), 0.1),
+    })
+
+    audience_rows = campaigns * 3
+    audiences = pd.DataFrame({
+        "Campaign": campaign_names[rng.integers(0, campaigns, audience_rows)],
+        "Audience": pick(["Affinity: Runners", "In-Market: Footwear", "Remarketing"], audience_rows),
+        "Audience setting": pick(["Observation", "Targeting"], audience_rows, p=[0.8, 0.2]),
+    })
+
+    pmax = max(1, campaigns // 10)
+    pmax_campaigns = pd.DataFrame({
+        "Campaign": [f"PMax {i}" for i in range(pmax)],
+        "Audience signal": maybe_null(pick(["Customer list + interests", "Interests"], pmax), 0.2),
+        "Video Asset": maybe_null(np.array([f"video_{i}.mp4" for i in range(pmax)], dtype=object), 0.3),
+    })
+
+    return {
+        "Conversions Tracking Data": conversion_data,
+        "Campaign Data": campaign_data,
+        "Keyword Data": keyword_data,
+        "AdGroup Data": adgroup_data,
+        "DSA": dsa,
+        "Ad Data": ad_data,
+        "RSA Ad Data": rsa_ad_data,
+        "Extensions Data": extensions_data,
+        "Extensions": extensions,
+        "Audiences": audiences,
+        "Campaigns": pmax_campaigns,
+    }
+
+
+def generate_workbook(path, keywords=10000, seed=0, url_base="https://www.example.com"):
+    # Write a synthetic account to ``path`` (.xlsx); returns {sheet name: rows}
+    frames = workbook_frames(keywords, seed, url_base)
+    if xlsxwriter_available():
+        import xlsxwriter
+
+        # constant_memory: a million keyword rows never sit in memory as cells
+        workbook = xlsxwriter.Workbook(path, {"constant_memory": True, "strings_to_urls": False,
+                                              "strings_to_formulas": False})
+        try:
+            header = workbook.add_format({"bold": True})
+            date_format = workbook.add_format({"num_format": "yyyy-mm-dd"})
+            for name, df in frames.items():
+                write_table(workbook.add_worksheet(name), df, None, 0, len(df), header, None, date_format)
+        finally:
+            workbook.close()
+    else:
+        with pd.ExcelWriter(path, engine="openpyxl") as writer:
+            for name, df in frames.items():
+                df.to_excel(writer, sheet_name=name, index=False)
+    return {name: len(df) for name, df in frames.items()}
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ResultTable
+
+# Parsed tables kept in memory for paging, most recently used last
+CACHE_SIZE = 32
+
+_frames = OrderedDict()
+_lock = threading.Lock()
+
+
+def save_table(df):
+    """Store a result table's rows in the database and return its key.
+
+    The key is the SHA-1 of the table's JSON, so saving the same rows again
+    (the same check on an unchanged sheet, a cached result) is a no-op.
+    """
+    payload = df.to_json(orient="split", index=False, date_format="iso")
+    key = hashlib.sha1(payload.encode("utf-8")).hexdigest()
+    now = timezone.now()
+    if ResultTable.objects.filter(key=key).update(last_used=now):
+        return key
+    data = json.loads(payload)
+    ResultTable.objects.bulk_create(
+        [ResultTable(key=key, columns=data["columns"], rows=data["data"], row_count=len(data["data"]),
+                     created_at=now, last_used=now)],
+        ignore_conflicts=True,
+    )
+    evict_tables(settings.QA_RESULT_TABLES_MAX)
+    return key
+
+
+def load_table(key):
+    # Full table as a DataFrame, or None when it was evicted
+    with _lock:
+        if key in _frames:
+            _frames.move_to_end(key)
+            return _frames[key]
+    table = ResultTable.objects.filter(key=key).first()
+    if table is None:
+        return None
+    ResultTable.objects.filter(pk=table.pk).update(last_used=timezone.now())
+    df = pd.DataFrame(table.rows, columns=table.columns)
+    with _lock:
+        _frames[key] = df
+        while len(_frames) > CACHE_SIZE:
+            _frames.popitem(last=False)
+    return df
+
+
+def evict_tables(max_tables):
+    if ResultTable.objects.count() <= max_tables:
+        return
+    stale = ResultTable.objects.order_by("-last_used", "-pk").values("pk")[max_tables:]
+    ResultTable.objects.filter(pk__in=stale).delete()
+
+
+def page_rows(df):
+    # JSON-safe cell values: NaN -> null, timestamps -> ISO strings
+    return json.loads(df.to_json(orient="split", index=False, date_format="iso"))["data"]
+
+
+def query_table(df, page=1, page_size=None, sort=None, descending=False, search="", column=None):
+    """One page of ``df`` after filtering and sorting, as a JSON-ready dict.
+
+    ``search`` keeps rows where any cell (or only ``column``, if given)
+    contains the text, case-insensitively.  ``sort`` names a column.
+    """
+    page_size = max(1, min(page_size or settings.QA_TABLE_PAGE_SIZE, settings.QA_TABLE_MAX_PAGE_SIZE))
+    columns = [str(c) for c in df.columns]
+    view = df if df.index.is_unique else df.reset_index(drop=True)
+
+    if search:
+        searched = [column] if column in columns else columns
+        mask = pd.Series(False, index=view.index)
+        for name in searched:
+            mask |= view.iloc[:, columns.index(name)].astype(str).str.contains(search, case=False, regex=False)
+        view = view[mask]
+
+    if sort in columns:
+        series = view.iloc[:, columns.index(sort)]
+        try:
+            order = series.sort_values(ascending=not descending, kind="stable", na_position="last").index
+        except TypeError:
+            # Mixed types in one column: fall back to text order
+            order = series.astype(str).sort_values(ascending=not descending, kind="stable").index
+        view = view.loc[order]
+
+    total = len(view)
+    pages = max(1, -(-total // page_size))
+    page = max(1, min(page, pages))
+    start = (page - 1) * page_size
+    return {
+        "columns": columns,
+        "rows": page_rows(view.iloc[start:start + page_size]),
+        "page": page,
+        "page_size": page_size,
+        "pages": pages,
+        "total": total,
+        "unfiltered": len(df),
+    }
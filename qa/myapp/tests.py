@@ -1,3 +1,1175 @@
-from django.test import TestCase
+import os
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from .readers import available_backends, open_reader
 
 # Create your tests here.
+
+
+def write_sample_workbook(path):
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Keyword Data"
+    ws.append(["Campaign Name", " Adgroup Name ", "Keyword Name", "Conversions", "Cost", "Date", "Keyword Name", None, "Notes"])
+    ws.append(["NX_Brand", "AG 1", "+running +shoes", 3, 1.5, datetime(2025, 5, 1), "dup", None, None])
+    ws.append(["Generic", "AG 2", "trail shoes", None, 2.0, datetime(2025, 5, 2), None, None, "note"])
+    ws.append([None, None, None, None, None, None, None, None, None])
+    ws.append(["NX_Brand", "AG 1", "holiday shoes", 0, 0, None, None, "stray", None])
+    ws.append([])
+
+    other = wb.create_sheet("Ad Data")
+    other.append(["Ad Type", "Ad Strength"])
+    other.append(["RESPONSIVE_SEARCH_AD", "EXCELLENT"])
+    other.append(["EXPANDED_TEXT_AD", None])
+
+    wb.create_sheet("Empty")
+    wb.save(path)
+
+
+class ReaderBackendParityTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.tmpdir = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmpdir.name, "sample.xlsx")
+        write_sample_workbook(cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmpdir.cleanup()
+        super().tearDownClass()
+
+    def read_all(self, backend, usecols=None):
+        reader = open_reader(self.path, backend)
+        try:
+            return {name: reader.parse(name, usecols=usecols) for name in reader.sheet_names}
+        finally:
+            reader.close()
+
+    def assert_parity(self, usecols=None):
+        expected = self.read_all("openpyxl", usecols)
+        for backend in available_backends():
+            actual = self.read_all(backend, usecols)
+            self.assertEqual(list(actual), list(expected))
+            for name in expected:
+                with self.subTest(backend=backend, sheet=name):
+                    pd.testing.assert_frame_equal(actual[name], expected[name])
+
+    def test_full_sheets_identical(self):
+        self.assert_parity()
+
+    def test_pruned_columns_identical(self):
+        wanted = {"Adgroup Name", "Keyword Name", "Conversions", "Ad Strength"}
+        self.assert_parity(lambda c: str(c).strip() in wanted)
+
+
+class ReaderDispatchTests(SimpleTestCase):
+    def test_each_file_type_gets_its_reader(self):
+        from unittest import mock
+
+        from .csv_export import OLE2_SIGNATURE, CsvExportReader
+        from .readers import OpenpyxlStreamReader, PandasReader, calamine_available
+
+        with tempfile.TemporaryDirectory() as tmp:
+            xlsx = os.path.join(tmp, "sample.xlsx")
+            write_sample_workbook(xlsx)
+            csv = os.path.join(tmp, "Keyword Data.csv")
+            pd.DataFrame({"Keyword Name": ["a"]}).to_csv(csv, index=False)
+            xls = os.path.join(tmp, "legacy.xls")
+            with open(xls, "wb") as f:
+                f.write(OLE2_SIGNATURE + b"\0" * 504)
+
+            def engine(path, backend="auto", stream_threshold=5 * 1024 * 1024):
+                reader = open_reader(path, backend, stream_threshold)
+                reader.close()
+                return type(reader), reader.engine
+
+            self.assertEqual(engine(csv), (CsvExportReader, "csv"))
+            # The Excel backend setting doesn't apply to CSV exports
+            self.assertEqual(engine(csv, "openpyxl"), (CsvExportReader, "csv"))
+            self.assertEqual(engine(xlsx, "openpyxl_stream"), (OpenpyxlStreamReader, "openpyxl_stream"))
+            with self.assertRaises(ValueError):
+                open_reader(xlsx, "xlrd2")
+
+            with mock.patch("myapp.readers.calamine_available", return_value=False):
+                self.assertEqual(engine(xlsx), (PandasReader, "openpyxl"))
+                self.assertEqual(engine(xlsx, stream_threshold=0), (OpenpyxlStreamReader, "openpyxl_stream"))
+                # .xls goes to pandas' own choice of engine (xlrd), which needn't be installed here
+                with mock.patch("myapp.readers.PandasReader") as pandas_reader:
+                    open_reader(xls)
+                pandas_reader.assert_called_once_with(xls, engine=None)
+            if calamine_available():
+                self.assertEqual(engine(xlsx), (PandasReader, "calamine"))
+                self.assertEqual(engine(xlsx, stream_threshold=0), (PandasReader, "calamine"))
+
+
+# Only the audit path may import these (see views.py)
+HEAVY_MODULES = {"pandas", "numpy", "matplotlib", "requests", "bs4", "openpyxl", "xlsxwriter", "pyarrow",
+                 "python_calamine"}
+
+
+class ImportTimeTests(SimpleTestCase):
+    # Budget for importing the URLconf (and with it every view), in seconds
+    budget = 0.5
+
+    def import_times(self, statement):
+        # {module: cumulative microseconds} from python -X importtime
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", statement],
+            cwd=settings.BASE_DIR,
+            env=dict(os.environ, DJANGO_SETTINGS_MODULE="qa.settings"),
+            capture_output=True, text=True, check=True,
+        )
+        times = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:"):
+                continue
+            _, cumulative, module = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit():
+                times[module.strip()] = int(cumulative)
+        return times
+
+    def test_urls_do_not_import_audit_dependencies(self):
+        times = self.import_times("import django; django.setup(); import qa.urls")
+        heavy = sorted(m for m in times if m.split(".")[0] in HEAVY_MODULES)
+        self.assertEqual(heavy, [])
+        self.assertLess(times["qa.urls"] / 1e6, self.budget)
+
+    def test_system_checks_do_not_import_audit_dependencies(self):
+        # What runserver runs on every start and reload
+        times = self.import_times("import django; django.setup(); from django.core.checks import run_checks; "
+                                  "run_checks(); import sys; assert 'pandas' not in sys.modules")
+        self.assertEqual(sorted(m for m in times if m.split(".")[0] in HEAVY_MODULES), [])
+
+
+@override_settings(QA_TABLE_PAGE_SIZE=10)
+class ResultTablePagingTests(TestCase):
+    def setUp(self):
+        from .results import Result, Table
+
+        self.df = pd.DataFrame({
+            "Keyword": [f"kw {i}" for i in range(25)],
+            "Clicks": [i % 7 for i in range(25)],
+        })
+        self.result = Result("fail", "Found rows.", [Table(self.df, "Rows")])
+
+    def test_serialized_result_carries_first_page_only(self):
+        from .results import Result
+
+        data = self.result.to_dict()
+        table = data["tables"][0]
+        self.assertEqual(table["rows"], 25)
+        self.assertEqual(len(table["preview"]["data"]), 10)
+
+        restored = Result.from_dict(data).tables[0]
+        self.assertEqual(restored.total_rows, 25)
+        pd.testing.assert_frame_equal(restored.df, self.df)
+
+    def test_result_round_trips_through_json(self):
+        import json
+
+        from .charts import pie_chart
+        from .results import FAIL, Result, Table, row_from_json, row_to_json
+
+        small = pd.DataFrame({"Ad Group": ["AG 1", "AG 2"], "Keywords": [3, 40], "Share": [0.25, 0.5]})
+        chart = pie_chart(["AG 1", "AG 2"], [3, 40], colors=["green", "red"])
+        result = Result(FAIL, "2 ad groups found.", [Table(small, "Ad groups", chart=chart), Table(self.df, "Rows")],
+                        chart=chart)
+
+        row = row_from_json(json.loads(json.dumps(row_to_json({"Question": "Q", "Result": result, "Time": 0.1}))))
+        restored = row["Result"]
+        self.assertEqual((restored.status, restored.message, restored.chart), (FAIL, "2 ad groups found.", chart))
+        self.assertEqual([t.title for t in restored.tables], ["Ad groups", "Rows"])
+        self.assertEqual([t.chart for t in restored.tables], [chart, None])
+        pd.testing.assert_frame_equal(restored.tables[0].df, small)
+        pd.testing.assert_frame_equal(restored.tables[1].df, self.df)
+        self.assertEqual(restored.html, result.html)
+
+    def test_endpoint_pages_sorts_and_filters(self):
+        key = self.result.tables[0].save()
+        url = reverse("result_table", args=[key])
+
+        page = self.client.get(url, {"page": 3}).json()
+        self.assertEqual((page["pages"], page["total"]), (3, 25))
+        self.assertEqual([row[0] for row in page["rows"]], [f"kw {i}" for i in range(20, 25)])
+
+        page = self.client.get(url, {"sort": "Clicks", "order": "desc", "page_size": 3}).json()
+        self.assertEqual([row[1] for row in page["rows"]], [6, 6, 6])
+
+        page = self.client.get(url, {"q": "KW 1", "column": "Keyword"}).json()
+        self.assertEqual(page["total"], 11)     # kw 1, kw 10..kw 19
+
+        self.assertEqual(self.client.get(reverse("result_table", args=["0" * 40])).status_code, 404)
+
+
+class SyntheticWorkbookTests(SimpleTestCase):
+    def test_every_check_finds_its_sheet_and_columns(self):
+        from .checks import CHECKS, columns_by_sheet, run_check
+        from .results import ERROR, MISSING
+        from .synthetic import generate_workbook
+        from .workbook import LazyWorkbook
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "synthetic.xlsx")
+            rows = generate_workbook(path, keywords=300, seed=1)
+            self.assertEqual(rows["Keyword Data"], 300)
+            with LazyWorkbook(path, columns_by_sheet()) as workbook:
+                for c in CHECKS.values():
+                    # The link check would go out to the network
+                    if c.kind == "io":
+                        continue
+                    result = run_check(c.id, workbook.get(c.sheet))
+                    self.assertNotIn(result.status, (MISSING, ERROR), f"{c.id}: {result.message}")
+
+
+class ReadOnlyViewTests(SimpleTestCase):
+    def test_a_check_mutating_its_frame_leaves_the_sheet_to_the_next_check(self):
+        from unittest import mock
+
+        from .checks import CHECKS, Check, run_check
+        from .normalize import normalize_sheet
+        from .results import INFO, Result
+
+        def mutate(df):
+            # What the old run_analysis branches did to the shared sheet, and worse
+            df.columns = [c.upper() for c in df.columns]
+            df["CONVERSIONS"] = df["CONVERSIONS"].fillna(0) * 100
+            df.loc[0, "AD TYPE"] = "EXPANDED_TEXT_AD"
+            df.drop(index=1, inplace=True)
+            df["EXTRA"] = 1
+            return Result(INFO, "mutated")
+
+        seen = []
+
+        def read(df):
+            seen.append(df.copy())
+            return Result(INFO, "read")
+
+        df = normalize_sheet(pd.DataFrame({"Ad Type": ["RESPONSIVE_SEARCH_AD", "EXPANDED_TEXT_AD"],
+                                           "Conversions": [1.5, None]}))
+        original = df.copy()
+        checks = {"mutator": Check("mutator", "Q1", "Ad Data", [], mutate),
+                  "reader": Check("reader", "Q2", "Ad Data", [], read)}
+        # Also without Copy-on-Write (pandas 2 by default), where the checks get deep copies
+        for copy_on_write in (True, False):
+            seen.clear()
+            with self.subTest(copy_on_write=copy_on_write), mock.patch.dict(CHECKS, checks), \
+                    mock.patch("myapp.normalize.copy_on_write", return_value=copy_on_write):
+                self.assertEqual(run_check("mutator", df).message, "mutated")
+                run_check("reader", df)
+
+                pd.testing.assert_frame_equal(seen[0], original)
+                pd.testing.assert_frame_equal(df, original)
+
+
+class ExecutorTests(SimpleTestCase):
+    def sleeper(self, seconds, message):
+        import time
+
+        from .results import INFO, Result
+
+        def check(df):
+            time.sleep(seconds)
+            return Result(INFO, message)
+        return check
+
+    def test_outcomes_keep_task_order_and_slow_checks_time_out(self):
+        from unittest import mock
+
+        from .audit import run_all_checks
+        from .catalog import CatalogEntry
+        from .checks import CHECKS, Check
+        from .executor import execute_checks
+
+        df = pd.DataFrame({"a": [1]})
+        checks = {
+            "slow": Check("slow", "Slow?", "Sheet", [], self.sleeper(0.4, "slow done")),
+            "fast": Check("fast", "Fast?", "Sheet", [], self.sleeper(0.0, "fast done")),
+            "stuck": Check("stuck", "Stuck?", "Sheet", [], self.sleeper(3.0, "never")),
+        }
+        with mock.patch.dict(CHECKS, checks):
+            finished = []
+            outcomes = execute_checks([("slow", df), ("fast", df), ("stuck", df)], timeout=1, thread_workers=3,
+                                      on_complete=lambda index, outcome: finished.append(index))
+            # Completion order differs from task order; outcomes don't
+            self.assertEqual(finished, [1, 0, 2])
+            self.assertEqual([o.result.message if o.result else None for o in outcomes], ["slow done", "fast done", None])
+            self.assertEqual([o.timed_out for o in outcomes], [False, False, True])
+            self.assertEqual(outcomes[2].seconds, 1)
+
+            # The audit keeps the other results and marks the timed-out check
+            entries = [CatalogEntry(i, c.question, c.id) for i, c in enumerate(checks.values())]
+            with override_settings(QA_CHECK_TIMEOUT=1, QA_CHECK_PROCESSES=0):
+                rows = run_all_checks({"Sheet": df}, entries=entries)
+        self.assertEqual([row["Question"] for row in rows], ["Slow?", "Fast?", "Stuck?"])
+        self.assertEqual([row["Result"].status for row in rows], ["info", "info", "error"])
+        self.assertIn("Timed out analyzing 'Sheet' after 1s", rows[2]["Result"].message)
+
+    def test_timeouts_count_from_when_a_queued_check_starts(self):
+        import time
+        from unittest import mock
+
+        from .checks import CHECKS, Check
+        from .executor import execute_checks
+
+        df = pd.DataFrame({"a": [1]})
+        checks = {
+            "step": Check("step", "Step?", "Sheet", [], self.sleeper(0.3, "step done")),
+            "stuck": Check("stuck", "Stuck?", "Sheet", [], self.sleeper(2.0, "never")),
+        }
+        with mock.patch.dict(CHECKS, checks):
+            # One worker: the third check waits 0.6s for its turn but only runs for 0.3s
+            outcomes = execute_checks([("step", df)] * 3, timeout=0.5, thread_workers=1)
+            self.assertEqual([o.timed_out for o in outcomes], [False] * 3)
+
+            # A worker stuck on a timed-out check: the check queued behind it gives up
+            # once both batches' time (2 x 0.5s) is spent
+            started = time.monotonic()
+            outcomes = execute_checks([("stuck", df), ("step", df)], timeout=0.5, thread_workers=1)
+            self.assertEqual([o.timed_out for o in outcomes], [True, True])
+            self.assertLess(time.monotonic() - started, 1.5)
+
+    def test_a_broken_process_pool_is_discarded_not_a_new_one(self):
+        from concurrent.futures import Future
+        from concurrent.futures.process import BrokenProcessPool
+        from unittest import mock
+
+        from . import executor
+        from .checks import CHECKS, Check
+
+        broken = Future()
+        broken.set_exception(BrokenProcessPool("worker died"))
+        pool = mock.Mock(**{"submit.return_value": broken})
+        checks = {"cpu": Check("cpu", "Cpu?", "Sheet", [], self.sleeper(0.0, "done"))}
+        with mock.patch.dict(CHECKS, checks), \
+                mock.patch.object(executor, "arrow_available", return_value=True), \
+                mock.patch.object(executor, "get_process_pool", return_value=pool) as get_pool, \
+                mock.patch.object(executor, "discard_process_pool") as discard:
+            outcomes = executor.execute_checks([("cpu", pd.DataFrame({"a": [1, 2]}))], process_workers=2,
+                                               process_min_rows=1)
+        self.assertIsInstance(outcomes[0].error, BrokenProcessPool)
+        self.assertEqual(get_pool.call_count, 1)
+        discard.assert_called_once_with(pool)
+
+
+class ColumnPruningTests(SimpleTestCase):
+    def test_only_declared_sheets_and_columns_are_read_and_checks_lose_nothing(self):
+        from .checks import CHECKS, columns_by_sheet, run_check
+        from .synthetic import workbook_frames
+        from .workbook import LazyWorkbook
+
+        frames = workbook_frames(keywords=200, seed=4)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "wide.xlsx")
+            with pd.ExcelWriter(path, engine="openpyxl") as writer:
+                for name, df in frames.items():
+                    # Columns no check reads, as in the raw exports
+                    df.assign(**{"Unused A": 1, " Unused B ": "x"}).to_excel(writer, sheet_name=name, index=False)
+                pd.DataFrame({"Notes": ["not audited"]}).to_excel(writer, sheet_name="Notes", index=False)
+
+            declared = columns_by_sheet()
+            with LazyWorkbook(path, declared) as pruned, LazyWorkbook(path) as full:
+                for name in frames:
+                    wanted = {c.strip() for c in declared[name]}
+                    self.assertEqual(set(pruned[name].columns), wanted & set(full[name].columns), name)
+                    self.assertIn("Unused A", full[name].columns)
+                for c in CHECKS.values():
+                    if c.kind == "io":
+                        continue
+                    expected, actual = run_check(c.id, full[c.sheet]), run_check(c.id, pruned[c.sheet])
+                    self.assertEqual(actual.message, expected.message, c.id)
+                    for a, b in zip(actual.tables, expected.tables):
+                        pd.testing.assert_frame_equal(a.df, b.df)
+                # Sheets no check maps to are never parsed
+                self.assertNotIn("Notes", pruned._sheets)
+
+
+class SnapshotTests(SimpleTestCase):
+    def test_second_read_comes_from_the_snapshot_unchanged(self):
+        from .checks import columns_by_sheet
+        from .result_cache import sheet_fingerprint
+        from .snapshots import SnapshotStore
+        from .synthetic import generate_workbook
+        from .workbook import LazyWorkbook
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "synthetic.xlsx")
+            generate_workbook(path, keywords=200, seed=2)
+            store = SnapshotStore(os.path.join(tmp, "snapshots"), max_bytes=10 * 1024 ** 2)
+            columns = columns_by_sheet()
+            with LazyWorkbook(path, columns, snapshot=store.open("a" * 64)) as workbook:
+                parsed = {name: workbook[name] for name in workbook.sheet_names}
+
+            # The workbook itself is never opened again
+            with LazyWorkbook(os.path.join(tmp, "gone.xlsx"), columns, snapshot=store.open("a" * 64)) as workbook:
+                self.assertEqual(workbook.sheet_names, list(parsed))
+                for name, df in parsed.items():
+                    pd.testing.assert_frame_equal(workbook[name], df)
+                    self.assertEqual(sheet_fingerprint(workbook[name]), sheet_fingerprint(df))
+                self.assertEqual(workbook.backend, "snapshot")
+
+            # Asking for a column the snapshot wasn't read for means parsing again
+            wider = dict(columns, **{"Keyword Data": columns["Keyword Data"] | {"Quality Score"}})
+            self.assertIsNone(store.open("a" * 64).load("Keyword Data", wider["Keyword Data"]))
+
+            store.open("b" * 64).save_sheet_names(["Keyword Data"])
+            os.utime(os.path.join(store.directory, "a" * 64), (0, 0))
+            store.max_bytes = 0
+            self.assertEqual(store.evict(keep={"b" * 64}), 1)
+            self.assertEqual([name for _, _, name in store.usage()], ["b" * 64])
+
+    def test_ad_hoc_questions_are_answered_from_the_snapshot(self):
+        from .checks import columns_by_sheet
+        from .snapshots import SnapshotStore
+        from .synthetic import generate_workbook
+        from .workbook import LazyWorkbook
+
+        with tempfile.TemporaryDirectory() as tmp, override_settings(QA_SNAPSHOT_DIR=os.path.join(tmp, "snapshots")):
+            path = os.path.join(tmp, "synthetic.xlsx")
+            generate_workbook(path, keywords=50, seed=3)
+            with LazyWorkbook(path, columns_by_sheet(), snapshot=SnapshotStore(settings.QA_SNAPSHOT_DIR, 2 ** 30).open("c" * 64)) as workbook:
+                workbook["Keyword Data"]
+            os.remove(path)
+
+            url = reverse("analyze", args=["c" * 64])
+            page = self.client.get(url, {"q": "Are there any legacy BMM keywords?"}).content.decode()
+            self.assertIn("legacy BMM keywords found", page)
+            self.assertNotIn("no snapshot", page)
+            page = self.client.get(url, {"q": "Is there at least one RSA per ad group with an ad strength of excellent?"})
+            self.assertIn("has no snapshot", page.content.decode())
+            self.assertEqual(self.client.get(reverse("analyze", args=["..etc"])).status_code, 404)
+
+
+class AdGroupAggregateTests(SimpleTestCase):
+    def test_checks_on_one_sheet_share_one_build(self):
+        from .aggregates import sheet_aggregates
+        from .checks import run_check
+        from .normalize import normalize_sheet
+
+        df = normalize_sheet(pd.DataFrame({"Keyword Name": ["+red shoes", "christmas boots", "hats"]}))
+        run_check("legacy_bmm_keywords", df)
+        run_check("seasonal_keywords", df)
+        self.assertEqual(len(sheet_aggregates(df)._tables), 1)
+
+    def test_no_conversion_checks_judge_segmented_rows_one_by_one(self):
+        from .checks import run_check
+        from .normalize import normalize_sheet
+
+        # Segmented export: several rows per ad group, some with conversions and some without
+        df = normalize_sheet(pd.DataFrame({
+            "Campaign Name": ["C1", "C1", "C1", "C1", "C2", "C2", None],
+            "Adgroup Name": ["A", "A", "B", "B", "A", "A", "A"],
+            "Adgroup Type": ["search_standard", "search_standard", "display_standard", "display_standard",
+                             "search_standard", "search_standard", None],
+            "Adgroup Status": ["ENABLED"] * 7,
+            "Conversions": [3, 0, 2, 1, None, 0, 1],
+            "View Through Conversions": [1, 0, 0, 4, 0, 0, 0],
+        }))
+        search = run_check("search_adgroups_no_conversions", df)
+        display = run_check("display_adgroups_no_conversions", df)
+
+        # What filtering the rows themselves gives
+        rows = df[(df["Adgroup Type"] == "SEARCH_STANDARD") & (df["Conversions"].fillna(0) == 0)]
+        expected = rows[["Campaign Name", "Adgroup Name", "Adgroup Status", "Conversions"]].drop_duplicates()
+        pd.testing.assert_frame_equal(search.tables[0].df, expected)
+        self.assertEqual(search.tables[0].df[["Campaign Name", "Adgroup Name"]].values.tolist(),
+                         [["C1", "A"], ["C2", "A"], ["C2", "A"]])
+        self.assertEqual(display.tables[0].df[["Adgroup Name", "Conversions"]].values.tolist(), [["B", 2]])
+
+    def test_rsa_counts_per_ad_group(self):
+        from .checks import run_check
+        from .normalize import normalize_sheet
+
+        df = normalize_sheet(pd.DataFrame({
+            "Campaign Name": ["C1", "C1", "C1", "C2"],
+            "Adgroup Name": ["A", "A", "B", "A"],
+            "Ad Type": ["RESPONSIVE_SEARCH_AD", "RESPONSIVE_SEARCH_AD", "EXPANDED_TEXT_AD", "RESPONSIVE_SEARCH_AD"],
+            "Ad Strength": ["excellent", "GOOD", "EXCELLENT", None],
+        }))
+        summary = run_check("rsa_excellent_strength", df).tables[0].df
+        self.assertEqual(summary.values.tolist(), [["C1", "A", 2, 1], ["C2", "A", 1, 0]])
+
+
+class KeywordScanTests(SimpleTestCase):
+    def test_one_scan_finds_every_term_at_word_boundaries(self):
+        from .keyword_scan import TermScanner
+
+        matches = TermScanner(["+", "black friday", "black", "xmas"]).scan(
+            pd.Series(["+Shoes +Red", None, "Black Friday deals", "blackfriday", "XMAS+", "black boots"]))
+        self.assertEqual(matches.rows(["+"]).tolist(), [True, False, False, False, True, False])
+        self.assertEqual(matches.first().tolist(), ["+", None, "black friday", None, "xmas", "black"])
+
+    def test_seasonal_keywords_are_judged_against_the_calendar(self):
+        from datetime import date
+
+        from .checks import run_check
+        from .normalize import normalize_sheet
+
+        df = normalize_sheet(pd.DataFrame({"Keyword Name": ["christmas boots", "Back to School bags", "red shoes"]}))
+        calendar = {"Christmas": ("11-01", "12-26", ["christmas"]), "Back to school": ("07-01", "09-15", ["back to school"])}
+        with override_settings(QA_SEASON_CALENDAR=calendar, QA_SEASON_DATE=date(2025, 12, 1)):
+            result = run_check("seasonal_keywords", df)
+        self.assertEqual(result.status, "fail")
+        self.assertEqual(result.tables[0].df[["Keyword Name", "Season"]].values.tolist(),
+                         [["Back to School bags", "Back to school"]])
+        with override_settings(QA_SEASON_CALENDAR=calendar, QA_SEASON_DATE=date(2025, 11, 15)):
+            df = normalize_sheet(df.iloc[[0, 2]].reset_index(drop=True))
+            self.assertEqual(run_check("seasonal_keywords", df).status, "pass")
+
+
+class SheetReuseTests(TestCase):
+    def test_each_sheet_is_parsed_once_and_unchanged_sheets_reuse_results(self):
+        from unittest import mock
+
+        from .audit import run_all_checks
+        from .catalog import CatalogEntry
+        from .checks import CHECKS, columns_by_sheet
+        from .normalize import normalize_sheet
+        from .result_cache import AuditResultCache, sheet_fingerprint
+        from .workbook import LazyWorkbook
+
+        ids = ["legacy_bmm_keywords", "seasonal_keywords", "adgroup_keyword_count", "rsa_excellent_strength",
+               "legacy_etas"]
+        entries = [CatalogEntry(i, CHECKS[c].question, c) for i, c in enumerate(ids)]
+        cache = AuditResultCache(ttl=3600, max_reports=10, max_results=100)
+
+        def cached(sheets):
+            fingerprints = {name: sheet_fingerprint(sheets[name]) for name in ("Keyword Data", "Ad Data")}
+            rows = run_all_checks(sheets, cache=cache, fingerprints=fingerprints, entries=entries)
+            return [row.get("Cached", False) for row in rows]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "sample.xlsx")
+            write_sample_workbook(path)
+            with LazyWorkbook(path, columns_by_sheet()) as workbook:
+                with mock.patch.object(workbook.reader, "parse", wraps=workbook.reader.parse) as parse:
+                    self.assertEqual(cached(workbook), [False] * 5)
+                    sheets = {name: workbook[name] for name in ("Keyword Data", "Ad Data")}
+                self.assertEqual(sorted(call.args[0] for call in parse.call_args_list), ["Ad Data", "Keyword Data"])
+
+        self.assertEqual(cached(sheets), [True] * 5)
+        # Only the checks on the sheet that changed run again
+        ads = sheets["Ad Data"].copy()
+        ads.loc[1, "Ad Type"] = "RESPONSIVE_SEARCH_AD"
+        sheets["Ad Data"] = normalize_sheet(ads)
+        self.assertEqual(cached(sheets), [True, True, True, False, False])
+
+
+class SeasonalCacheTests(TestCase):
+    def test_cached_seasonal_results_are_keyed_by_day_and_calendar(self):
+        from datetime import date
+
+        from .audit import run_all_checks
+        from .catalog import CatalogEntry
+        from .checks import CHECKS
+        from .normalize import normalize_sheet
+        from .result_cache import AuditResultCache, checklist_hash, sheet_fingerprint
+
+        df = normalize_sheet(pd.DataFrame({"Keyword Name": ["christmas boots", "red shoes"]}))
+        entries = [CatalogEntry(1, CHECKS["seasonal_keywords"].question, "seasonal_keywords")]
+        cache = AuditResultCache(ttl=3600, max_reports=10, max_results=10)
+
+        def audit(day, calendar=None):
+            with override_settings(QA_SEASON_DATE=day, QA_SEASON_CALENDAR=calendar):
+                row = run_all_checks({"Keyword Data": df}, cache=cache, entries=entries,
+                                     fingerprints={"Keyword Data": sheet_fingerprint(df)})[0]
+                return row["Result"].status, row.get("Cached", False), checklist_hash(["Q"])
+
+        in_season = audit(date(2025, 12, 1))
+        self.assertEqual(in_season[:2], ("pass", False))
+        self.assertEqual(audit(date(2025, 12, 1))[:2], ("pass", True))
+        out_of_season = audit(date(2026, 3, 1))
+        self.assertEqual(out_of_season[:2], ("fail", False))
+        self.assertNotEqual(out_of_season[2], in_season[2])
+        # Same day, another calendar
+        self.assertEqual(audit(date(2025, 12, 1), {"Spring": ("03-01", "04-01", ["christmas"])})[:2], ("fail", False))
+
+
+class AccountDiffTests(SimpleTestCase):
+    def test_second_audit_lists_changes_and_issue_diff(self):
+        from .catalog import CatalogEntry
+        from .checks import CHECKS
+        from .diff import AccountHistory, account_key, audit_changes
+        from .results import FAIL, PASS, Result
+
+        self.assertEqual(account_key("Acme_Search 2026-10-01 (1).xlsx"), "acme search")
+        question = CHECKS["legacy_bmm_keywords"].question
+        entries = [CatalogEntry(1, question, "legacy_bmm_keywords")]
+
+        def audit(history, keywords, issues):
+            sheet = pd.DataFrame({"Campaign Name": ["C"] * len(keywords), "Adgroup Name": ["A"] * len(keywords),
+                                  "Keyword Name": list(keywords), "Status Reason": list(keywords.values())})
+            result = Result(FAIL, "BMM", [pd.DataFrame({"Keyword Name": issues})]) if issues else Result(PASS, "ok")
+            rows = [{"Question": question, "Result": result}]
+            return audit_changes(history, "acme", "acme.xlsx", {"Keyword Data": sheet}, entries, rows)["Result"]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            history = AccountHistory(tmp, max_accounts=10)
+            first = audit(history, {"+a": "ok", "+b": "ok", "c": "ok"}, ["+a", "+b"])
+            self.assertIn("First audit", first.message)
+
+            second = audit(history, {"+a": "ok", "c": "low", "d": "ok"}, ["+a"])
+            self.assertIn("0 new issue(s), 1 resolved", second.message)
+            tables = {t.title: t.df for t in second.tables}
+            self.assertEqual(tables["Resolved issues"]["Issue"].tolist(), ["Keyword Name: +b"])
+            self.assertEqual(tables["Changes by sheet"][["Added", "Removed", "Changed", "Unchanged"]].values.tolist(),
+                             [[1, 1, 1, 1]])
+
+
+class CachedReportDiffTests(TestCase):
+    def test_cached_report_gets_each_accounts_own_changes(self):
+        from unittest import mock
+
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        from . import audit
+        from .diff import DIFF_QUESTION
+        from .models import AuditReport
+
+        with tempfile.TemporaryDirectory() as tmp, override_settings(
+                MEDIA_ROOT=tmp, QA_UPLOAD_DIR=os.path.join(tmp, "uploads"), QA_DIFF_DIR=os.path.join(tmp, "history"),
+                QA_SNAPSHOT_DIR=os.path.join(tmp, "snapshots"), QA_AUDIT_ASYNC=False, EXCEL_READER_TIMINGS_LOG=None):
+            path = os.path.join(tmp, "sample.xlsx")
+            write_sample_workbook(path)
+            with open(path, "rb") as f:
+                content = f.read()
+
+            def upload(account):
+                response = self.client.post(reverse("home"), {
+                    "file": SimpleUploadedFile("sample.xlsx", content), "account": account})
+                rows = [row for row in response.context["results"] if row["Question"] == DIFF_QUESTION]
+                self.assertEqual(len(rows), 1)
+                return rows[0]["Result"].message
+
+            self.assertIn("First audit of account 'acme'", upload("acme"))
+            stored = AuditReport.objects.get()
+            self.assertNotIn(DIFF_QUESTION, [row["Question"] for row in stored.results])
+
+            # Served from the cache, with the diff worked out for whoever uploads it
+            with mock.patch.object(audit, "audit_workbook", side_effect=AssertionError("audited again")):
+                self.assertIn("First audit of account 'globex'", upload("globex"))
+                self.assertIn("0 new issue(s), 0 resolved", upload("acme"))
+            self.assertEqual(AuditReport.objects.count(), 1)
+            self.assertEqual(len(os.listdir(os.path.join(tmp, "history"))), 2)
+
+
+class CsvExportTests(SimpleTestCase):
+    def test_zipped_csv_export_reduced_in_chunks_matches_loading_it(self):
+        import zipfile
+
+        from .checks import columns_by_sheet, partials_by_sheet, run_check
+        from .workbook import LazyWorkbook
+
+        keywords = pd.DataFrame({
+            "Campaign Name": ["C1"] * 5 + ["C2"] * 4,
+            "Adgroup Name": ["A", "A", "B", "B", "B", "A", "A", "A", "B"],
+            "Keyword Name": ["+red shoes", "shoes", "xmas shoes", "boots", "+boots", "hat", "+hat", "cap", "caps"],
+            "Status Reason": ["ELIGIBLE", "RARELY_SERVED"] + ["ELIGIBLE"] * 7,
+            "Impressions": ["1,200", "--", "3", "4", "5", "6", "7", "8", "9"],
+        })
+        ads = pd.DataFrame({"Campaign Name": ["C1", "C1"], "Adgroup Name": ["A", "B"],
+                            "Ad Type": ["RESPONSIVE_SEARCH_AD"] * 2, "Ad Strength": ["EXCELLENT", "GOOD"]})
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "export.zip")
+            with zipfile.ZipFile(path, "w") as archive:
+                # A report title and date range above the header, as the Google Ads UI writes them
+                archive.writestr("Keyword_Data.csv", "Keyword report\n\"Jan 1, 2026 - Jan 31, 2026\"\n"
+                                 + keywords.to_csv(index=False))
+                archive.writestr("report (3).tsv", ads.to_csv(index=False, sep="\t"))
+
+            checks = ["adgroup_keyword_count", "legacy_bmm_keywords", "seasonal_keywords",
+                      "low_search_volume_keywords", "rsa_excellent_strength"]
+            outcomes = []
+            for threshold in (None, 0):
+                with override_settings(QA_CSV_CHUNK_ROWS=2):
+                    with LazyWorkbook(path, columns_by_sheet(), partials=partials_by_sheet(),
+                                      reduce_threshold=threshold) as workbook:
+                        self.assertEqual(workbook.backend, "csv")
+                        self.assertEqual(sorted(workbook.sheet_names), ["Ad Data", "Keyword Data"])
+                        results = [run_check(c, workbook["Keyword Data" if c != "rsa_excellent_strength" else "Ad Data"])
+                                   for c in checks]
+                        outcomes.append([(r.message, [t.df.values.tolist() for t in r.tables]) for r in results])
+                        if threshold == 0:
+                            self.assertEqual(workbook["Keyword Data"].attrs["reduced_from"], 9)
+                            self.assertLess(len(workbook["Keyword Data"]), 9)
+            self.assertEqual(outcomes[0], outcomes[1])
+            self.assertEqual(outcomes[0][1][0], "3 legacy BMM keywords found:")
+
+
+class QuestionIndexTests(SimpleTestCase):
+    def test_paraphrases_resolve_and_unclear_questions_get_alternatives(self):
+        from .checks import resolve_question
+        from .question_index import match_question
+
+        self.assertEqual(resolve_question("which adgroups have over 20 kws"), "adgroup_keyword_count")
+        self.assertEqual(resolve_question("any 404 links?"), "broken_final_urls")
+        self.assertEqual(resolve_question("rsa ad strength excelent"), "rsa_excellent_strength")
+        self.assertEqual(resolve_question("does pmax have videos"), "pmax_video_assets")
+
+        match = match_question("what is the weather like", k=2)
+        self.assertFalse(match.confident)
+        self.assertEqual(len(match.alternatives), 2)
+
+    def test_endpoint(self):
+        response = self.client.get(reverse("question_match"), {"q": "are old ETAs still live", "k": 2})
+        data = response.json()
+        self.assertEqual(data["match"]["check"], "legacy_etas")
+        self.assertTrue(data["confident"])
+        self.assertEqual(len(data["alternatives"]), 2)
+        self.assertEqual(self.client.get(reverse("question_match")).status_code, 400)
+
+
+class MetricsTests(SimpleTestCase):
+    def test_histograms_merge_across_processes_and_render(self):
+        from .metrics import Histogram, merge, render, snapshot
+
+        seconds = Histogram("qa_test_seconds", "Test.", ["check"], buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            seconds.observe(value, check='a"b')
+        data = {"qa_test_seconds": snapshot_of(seconds)}
+        text = render(merge([data, data]))
+
+        self.assertIn("# TYPE qa_test_seconds histogram", text)
+        self.assertIn('qa_test_seconds_bucket{check="a\\"b",le="0.1"} 2', text)
+        self.assertIn('qa_test_seconds_bucket{check="a\\"b",le="1"} 4', text)
+        self.assertIn('qa_test_seconds_bucket{check="a\\"b",le="+Inf"} 6', text)
+        self.assertIn('qa_test_seconds_count{check="a\\"b"} 6', text)
+        self.assertIn("qa_check_seconds", snapshot())
+
+    def test_memory_is_optional_without_the_resource_module(self):
+        from unittest import mock
+
+        from .metrics import Histogram, max_resident_bytes, snapshot, stage
+
+        seconds = Histogram("qa_test_stage_seconds", "Test.")
+        memory = Histogram("qa_test_stage_bytes", "Test.")
+        # As on Windows: no resource module and no /proc
+        with mock.patch.dict(sys.modules, {"resource": None}), mock.patch("builtins.open", side_effect=OSError):
+            self.assertIsNone(max_resident_bytes())
+            with stage(seconds, memory):
+                pass
+            snapshot()
+        self.assertEqual(seconds.series[()][2], 1)
+        self.assertEqual(memory.series, {})
+
+    def test_endpoint(self):
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("# TYPE qa_audit_seconds histogram", response.content.decode())
+
+    def test_stale_snapshots_are_deleted_and_peak_memory_is_one_series(self):
+        import json
+
+        from .metrics import collect
+
+        rss = {"type": "gauge", "help": "Peak.", "labels": [], "buckets": [], "series": [[[], 1]]}
+        with tempfile.TemporaryDirectory() as tmp, override_settings(QA_METRICS_DIR=tmp, QA_METRICS_SNAPSHOT_TTL=60):
+            for name, value in (("live", 2 ** 50), ("gone", 2 ** 51)):
+                with open(os.path.join(tmp, f"{name}.json"), "w", encoding="utf-8") as f:
+                    json.dump({"qa_process_max_resident_bytes": dict(rss, series=[[[], value]])}, f)
+            os.utime(os.path.join(tmp, "gone.json"), (0, 0))
+
+            merged = collect()
+            self.assertEqual(os.listdir(tmp), ["live.json"])
+        self.assertEqual(merged["qa_process_max_resident_bytes"]["series"], {(): 2 ** 50})
+
+
+def snapshot_of(metric):
+    return {"type": metric.type, "help": metric.help, "labels": list(metric.labels),
+            "buckets": list(metric.buckets), "series": [[list(k), v] for k, v in metric.series.items()]}
+
+
+class QuestionCatalogTests(SimpleTestCase):
+    def write(self, path, text):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    def test_drifted_questions_resolve_and_the_file_is_reloaded_on_change(self):
+        from .catalog import get_catalog
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "questions.txt")
+            self.write(path, "# checklist\n  Are campaign   names consistent across the ACCOUNT? \r\n\n"
+                             "If the primary conversion action is “Purchase,” is it capturing "
+                             "conversions and revenue properly?\nWhat is the weather like?\n")
+            with override_settings(QA_QUESTIONS_FILE=path, QA_DISABLED_CHECKS=[]):
+                catalog = get_catalog()
+                self.assertEqual([e.check_id for e in catalog.entries],
+                                 ["campaign_naming", "purchase_conversions_tracked", None])
+                self.assertEqual(len(catalog.errors), 1)
+                self.assertIs(get_catalog(), catalog)
+
+                self.write(path, "Are there any legacy BMM keywords?\n")
+                os.utime(path, ns=(0, 0))
+                self.assertEqual([e.check_id for e in get_catalog().entries], ["legacy_bmm_keywords"])
+
+            with override_settings(QA_QUESTIONS_FILE=path, QA_DISABLED_CHECKS=["legacy_bmm_keywords", "nope"]):
+                catalog = get_catalog()
+                self.assertEqual(catalog.questions, [])
+                self.assertEqual(catalog.errors, ["QA_DISABLED_CHECKS: unknown check 'nope'."])
+
+    def test_project_questions_file_matches_the_registry(self):
+        from .catalog import get_catalog
+
+        catalog = get_catalog()
+        self.assertEqual(catalog.errors, [])
+        self.assertEqual(len(catalog.checks()), len(catalog.entries))
+
+
+class CheckRegistryTests(SimpleTestCase):
+    def test_every_checklist_question_dispatches_to_a_check_that_runs(self):
+        from .checks import CHECKS, resolve_question, run_check
+        from .csv_export import NUMERIC_COLUMNS
+        from .results import ERROR, MISSING
+
+        with open(settings.QA_QUESTIONS_FILE, encoding="utf-8") as f:
+            questions = [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+        check_ids = [resolve_question(q) for q in questions]
+        self.assertEqual(sorted(check_ids), sorted(CHECKS))
+
+        for question, check_id in zip(questions, check_ids):
+            with self.subTest(check=check_id):
+                check = CHECKS[check_id]
+                self.assertEqual(check.question, question)
+                # One row with every declared column; no URLs, so nothing goes to the network
+                row = {c.strip(): 1 if c.strip() in NUMERIC_COLUMNS else None if "URL" in c else "x"
+                       for c in check.columns}
+                result = run_check(check_id, pd.DataFrame([row]))
+                self.assertNotIn(result.status, (ERROR, MISSING), result.message)
+
+
+class EmptyChartTests(SimpleTestCase):
+    def test_no_rsas_or_ad_groups_give_no_chart_and_bad_charts_do_not_fail_rendering(self):
+        from .checks import run_check
+        from .normalize import normalize_sheet
+        from .report import write_report
+        from .results import Result
+
+        ads = normalize_sheet(pd.DataFrame({"Campaign Name": ["C1"], "Adgroup Name": ["A"],
+                                            "Ad Type": ["EXPANDED_TEXT_AD"], "Ad Strength": [None]}))
+        self.assertIsNone(run_check("rsa_excellent_strength", ads).chart)
+        keywords = normalize_sheet(pd.DataFrame({"Adgroup Name": pd.Series([], dtype=object),
+                                                 "Keyword Name": pd.Series([], dtype=object)}))
+        self.assertIsNone(run_check("adgroup_keyword_count", keywords).chart)
+
+        # A chart matplotlib refuses to draw is left out of the page and the report
+        bad = Result("info", "Zero pie", [pd.DataFrame({"a": [1]})], {"kind": "pie", "labels": ["x", "y"], "values": [0, 0]})
+        with self.assertLogs("myapp", "ERROR"):
+            self.assertIn("Zero pie", bad.html)
+        self.assertNotIn("<img", bad.html)
+        with tempfile.TemporaryDirectory() as tmp, self.assertLogs("myapp", "ERROR"):
+            write_report([{"Question": "Q", "Result": bad, "Time": 0.0}], os.path.join(tmp, "report.xlsx"))
+            self.assertGreater(os.path.getsize(os.path.join(tmp, "report.xlsx")), 0)
+
+
+class ReportTests(SimpleTestCase):
+    def test_several_tables_and_charts_each_get_a_sheet(self):
+        from unittest import mock
+
+        from openpyxl import load_workbook
+
+        from .charts import pie_chart
+        from .report import write_report
+        from .results import FAIL, INFO, Result, Table
+
+        groups = pd.DataFrame({"Ad Group": ["AG 1", "AG 2"], "Keywords": [3, 40]})
+        keywords = pd.DataFrame({"Keyword": ["+a +b", "+c"], "Match Type": ["BROAD", "BROAD"]})
+        results = [
+            {"Question": "Q one", "Result": Result(FAIL, "Two tables.", [Table(groups, "Ad groups"),
+                                                                          Table(keywords, "Keywords")],
+                                                   pie_chart(["AG 1", "AG 2"], [3, 40])), "Time": 0.5},
+            {"Question": "Q two", "Result": Result(INFO, "Own chart.", [Table(groups, "Sizes",
+                                                                              chart=pie_chart(["x"], [1]))]),
+             "Time": 0.1},
+        ]
+        for xlsxwriter in (True, False):
+            with self.subTest(xlsxwriter=xlsxwriter), tempfile.TemporaryDirectory() as tmp, \
+                    mock.patch("myapp.report.xlsxwriter_available", return_value=xlsxwriter):
+                path = os.path.join(tmp, "report.xlsx")
+                write_report(results, path)
+                wb = load_workbook(path)
+                self.assertEqual(wb.sheetnames, ["Summary", "Q01", "Q01_2", "Q01_3", "Q02"])
+                summary = list(wb["Summary"].iter_rows(min_row=2, values_only=True))
+                self.assertEqual([row[:2] for row in summary], [("Q one", FAIL), ("Q two", INFO)])
+                self.assertIn("(see sheet 'Q01', 'Q01_2', 'Q01_3')", summary[0][2])
+                self.assertEqual([wb[name]["A1"].value for name in wb.sheetnames[1:]],
+                                 ["Ad groups", "Keywords", "Chart data", "Sizes"])
+                self.assertEqual([c.value for c in wb["Q01_2"][4]], ["+c", "BROAD"])
+                if xlsxwriter:
+                    # Charts are drawn next to their data; openpyxl reports carry the data only
+                    self.assertEqual([len(wb[name]._images) for name in wb.sheetnames],
+                                     [0, 0, 0, 1, 1])
+
+
+class BatchResumeTests(SimpleTestCase):
+    def test_rerun_skips_finished_workbooks_and_resumes_after_an_interruption(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from unittest import mock
+
+        from .batch import STATE_FILE, SUMMARY_FILE, read_state, run_batch
+
+        audited = []
+
+        def fake_audit(path, upload_hash, report_path):
+            audited.append(os.path.basename(path))
+            entry = {"hash": upload_hash, "path": path, "report": os.path.basename(report_path), "seconds": 0.0}
+            if "bad" in path:
+                return dict(entry, status="failed", error="ValueError: bad workbook")
+            with open(report_path, "wb") as f:
+                f.write(b"report")
+            return dict(entry, status="done", questions=["Q"], statuses=["pass"])
+
+        class OneThreadPool(ThreadPoolExecutor):
+            # Workbooks one at a time, in order, without worker processes
+            def __init__(self, max_workers, mp_context=None, initializer=None):
+                super().__init__(max_workers=1)
+
+        def interrupt(entry, done, total):
+            raise KeyboardInterrupt
+
+        def run(**kwargs):
+            audited.clear()
+            return run_batch(paths, out, processes=2, **kwargs)
+
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch("myapp.batch.ProcessPoolExecutor", OneThreadPool), \
+                mock.patch("myapp.batch.audit_one", fake_audit):
+            out = os.path.join(tmp, "out")
+            paths = []
+            for name, text in [("a.csv", "a"), ("b.csv", "b"), ("bad.csv", "bad"), ("copy.csv", "a")]:
+                paths.append(os.path.join(tmp, name))
+                with open(paths[-1], "w") as f:
+                    f.write(text)
+
+            # Stopped once the first workbook is recorded: only that one is in the state file
+            with self.assertRaises(KeyboardInterrupt):
+                run(on_entry=interrupt)
+            self.assertEqual([os.path.basename(e["path"]) for e in read_state(out).values()], ["a.csv"])
+
+            batch = run()
+            self.assertEqual(audited, ["b.csv", "bad.csv"])
+            # Skipped by contents, whatever the file is called
+            self.assertEqual([(os.path.basename(p), reason) for p, reason in batch.skipped],
+                             [("a.csv", "already audited"), ("copy.csv", "already audited")])
+            self.assertEqual([os.path.basename(e["path"]) for e in batch.failed], ["bad.csv"])
+            self.assertTrue(os.path.exists(os.path.join(out, SUMMARY_FILE)))
+
+            # Failed workbooks and ones whose report is gone are audited again
+            first = next(e for e in read_state(out).values() if e["path"] == paths[0])
+            os.remove(os.path.join(out, first["report"]))
+            batch = run()
+            self.assertEqual(audited, ["a.csv", "bad.csv"])
+            self.assertIn((paths[3], "same contents as a.csv"), batch.skipped)
+            run()
+            self.assertEqual(audited, ["bad.csv"])
+            run(force=True)
+            self.assertEqual(audited, ["a.csv", "b.csv", "bad.csv"])
+            with open(os.path.join(out, STATE_FILE), encoding="utf-8") as f:
+                self.assertEqual(len(f.readlines()), 9)
+
+
+class UploadRejectionTests(SimpleTestCase):
+    def test_bad_and_oversized_uploads_get_a_client_error(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        cases = [
+            ("big.xlsx", b"PK\x03\x04" + b"0" * 200 * 1024, 413),  # Content-Length alone is too large
+            ("big.csv", b"a,b\n" * 5000, 413),                      # cut off while reading
+            ("fake.xlsx", b"Campaign Name,Cost\n", 400),            # not a ZIP
+            ("notes.pdf", b"%PDF-1.4", 400),
+        ]
+        with tempfile.TemporaryDirectory() as tmp, override_settings(QA_UPLOAD_MAX_SIZE=16 * 1024, QA_UPLOAD_DIR=tmp):
+            for name, content, status in cases:
+                with self.subTest(name=name):
+                    response = self.client.post(reverse("home"), {"file": SimpleUploadedFile(name, content)})
+                    self.assertEqual(response.status_code, status)
+                    self.assertContains(response, "Uploaded file is", status_code=status)
+            # Nothing is left behind
+            self.assertEqual(os.listdir(tmp), [])
+
+
+class AuditJobTests(TestCase):
+    def queue(self, tmp, name="acme.xlsx"):
+        from .models import AuditJob
+
+        path = os.path.join(tmp, name)
+        with open(path, "wb") as f:
+            f.write(b"PK\x03\x04")
+        return AuditJob.objects.create(upload_name=name, file_path=path)
+
+    def test_claims_are_exclusive_and_stale_jobs_are_claimed_again(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        from .jobs import claim_next_job
+        from .models import AuditJob
+
+        with tempfile.TemporaryDirectory() as tmp:
+            job = self.queue(tmp)
+            self.assertEqual(job.status, AuditJob.QUEUED)
+
+            claimed = claim_next_job("worker-1")
+            self.assertEqual((claimed.pk, claimed.status, claimed.worker), (job.pk, AuditJob.RUNNING, "worker-1"))
+            self.assertIsNone(claim_next_job("worker-2"))
+
+            # A worker that stopped updating its job loses it
+            AuditJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+            self.assertEqual(claim_next_job("worker-2").worker, "worker-2")
+
+    def test_run_job_ends_done_or_failed_and_discards_the_upload(self):
+        from unittest import mock
+
+        from .jobs import claim_next_job, run_job
+        from .models import AuditJob
+        from .results import PASS, Result
+
+        def audit(upload, upload_name, on_result=None, **kwargs):
+            job = AuditJob.objects.get(upload_name=upload_name)
+            self.assertEqual(job.status, AuditJob.RUNNING)
+            row = {"Question": "Q", "Result": Result(PASS, "ok"), "Time": 0.1}
+            on_result(0, row, 2)
+            self.assertEqual(AuditJob.objects.get(pk=job.pk).completed_checks, 1)
+            return [row, row], "/media/report.xlsx"
+
+        with tempfile.TemporaryDirectory() as tmp:
+            self.queue(tmp)
+            with mock.patch("myapp.audit.run_audit", side_effect=audit):
+                job = run_job(claim_next_job("worker"))
+            self.assertEqual((job.status, job.report_url, len(job.results)), (AuditJob.DONE, "/media/report.xlsx", 2))
+            self.assertIsNotNone(job.finished_at)
+            self.assertFalse(os.path.exists(job.file_path))
+
+            self.queue(tmp, "broken.xlsx")
+            with mock.patch("myapp.audit.run_audit", side_effect=ValueError("bad workbook")):
+                job = run_job(claim_next_job("worker"))
+            self.assertEqual((job.status, job.error), (AuditJob.FAILED, "bad workbook"))
+            self.assertFalse(os.path.exists(job.file_path))
+
+            response = self.client.get(reverse("job_status", args=[job.pk])).json()
+            self.assertEqual((response["status"], response["error"]), ("failed", "bad workbook"))
+
+
+class LinkCheckDeadlineTests(TestCase):
+    def test_urls_pending_at_the_deadline_are_reported_unchecked(self):
+        from .checks import run_check
+        from .linkcheck import check_urls
+        from .management.commands.bench_linkcheck import start_stub_server
+        from .normalize import normalize_sheet
+        from .url_cache import default_cache
+
+        fast, slow = start_stub_server(0.0), start_stub_server(3.0)
+        try:
+            def url(server, path):
+                host, port = server.server_address
+                return f"http://{host}:{port}{path}"
+
+            urls = [url(fast, "/page"), url(fast, "/missing"), url(slow, "/page")]
+            result = check_urls(urls, timeout=5, deadline=0.5, cache=default_cache())
+            self.assertLess(result.elapsed, 2)
+            self.assertEqual(result.statuses, {urls[0]: 200, urls[1]: 404})
+            self.assertEqual((result.unchecked, result.broken), ([urls[2]], [urls[1]]))
+            # Only what was checked is cached
+            self.assertEqual(set(default_cache().lookup(urls)), set(urls[:2]))
+
+            # The check returns what it found, and says how many URLs it didn't get to
+            df = normalize_sheet(pd.DataFrame({
+                "Keyword Final URLs": [urls[0], urls[1], url(slow, "/other")], "Adgroup Type": ["SEARCH_STANDARD"] * 3,
+                "Campaign Name": ["C"] * 3, "Adgroup Name": ["A"] * 3, "Keyword Name": ["a", "b", "c"],
+            }))
+            with override_settings(LINK_CHECK_DEADLINE=0.5, LINK_CHECK_TIMEOUT=5):
+                check = run_check("broken_final_urls", df)
+            self.assertEqual(check.status, "fail")
+            self.assertIn("1 URL(s) not checked before the 0.5s deadline", check.message)
+            self.assertEqual(check.tables[0].df["Keyword Name"].tolist(), ["b"])
+        finally:
+            fast.shutdown()
+            slow.shutdown()
+
+    def test_chunks_of_an_export_share_one_deadline(self):
+        import time
+        from unittest import mock
+
+        from . import checks
+        from .management.commands.bench_linkcheck import start_stub_server
+
+        fast, slow = start_stub_server(0.0), start_stub_server(3.0)
+        try:
+            def chunk(*urls):
+                return pd.DataFrame({"Keyword Final URLs": [f"http://%s:%s{u}" % s.server_address for s, u in urls],
+                                     "Adgroup Type": ["SEARCH_STANDARD"] * len(urls)})
+
+            with override_settings(LINK_CHECK_DEADLINE=0.5, LINK_CHECK_TIMEOUT=5), \
+                    mock.patch.object(checks, "check_urls", wraps=checks.check_urls) as check_urls:
+                rows = checks.BrokenUrlPartial().marker()
+                started = time.monotonic()
+                marked = [rows(chunk((fast, "/page"), (slow, "/a"))).tolist(),
+                          rows(chunk((slow, "/b"), (fast, "/missing"))).tolist(),
+                          rows(chunk((fast, "/page"), (fast, "/other"))).tolist()]
+                elapsed = time.monotonic() - started
+            # The first chunk used up the deadline; the rest are kept unchecked without a request
+            self.assertLess(elapsed, 1.0)
+            self.assertEqual(check_urls.call_count, 1)
+            self.assertEqual(marked, [[False, True], [True, True], [False, True]])
+        finally:
+            fast.shutdown()
+            slow.shutdown()
+
+
+class UrlCacheTests(TestCase):
+    def test_fresh_entries_skip_the_network_and_expired_ones_are_revalidated(self):
+        import threading
+        from datetime import timedelta
+        from http.server import BaseHTTPRequestHandler
+
+        from django.utils import timezone
+
+        from .linkcheck import check_urls
+        from .management.commands.bench_linkcheck import StubServer
+        from .models import UrlStatus
+        from .url_cache import UrlStatusCache
+
+        requests_seen = []
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_HEAD(self):
+                requests_seen.append(self.headers.get("If-None-Match"))
+                self.send_response(304 if self.headers.get("If-None-Match") == '"v1"' else 200)
+                self.send_header("ETag", '"v1"')
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        server = StubServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            url = "http://%s:%d/page" % server.server_address
+            cache = UrlStatusCache(ttl=3600, max_entries=10)
+
+            first = check_urls([url], cache=cache)
+            self.assertEqual((first.statuses, first.cache_misses, requests_seen), ({url: 200}, 1, [None]))
+
+            fresh = check_urls([url], cache=cache)
+            self.assertEqual((fresh.statuses, fresh.cache_hits), ({url: 200}, 1))
+            self.assertEqual(len(requests_seen), 1)
+
+            # Past the TTL: asked again with the ETag, and the 304 keeps the cached status
+            UrlStatus.objects.update(checked_at=timezone.now() - timedelta(hours=2))
+            expired = check_urls([url], cache=cache)
+            self.assertEqual((expired.statuses, expired.cache_hits, expired.revalidated), ({url: 200}, 0, 1))
+            self.assertEqual(requests_seen, [None, '"v1"'])
+            self.assertTrue(cache.lookup([url])[url].fresh)
+        finally:
+            server.shutdown()
@@ -0,0 +1,126 @@
+import hashlib
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers, StopUpload
+
+from . import metrics
+
+# First bytes of each accepted format
+SIGNATURES = {
+    ".xlsx": b"PK\x03\x04",                           # ZIP container
+    ".xls": b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1",      # OLE2 compound file
+    ".zip": b"PK\x03\x04",                            # CSV export files, zipped
+    ".csv": b"",                                       # plain text: anything goes
+    ".tsv": b"",
+}
+
+UPLOAD_TYPES = "an Excel workbook (.xls, .xlsx) or a CSV export (.csv, .tsv, .zip)"
+
+
+class HashedUploadedFile(UploadedFile):
+    """Upload already written to QA_UPLOAD_DIR, with its SHA-256.
+
+    The file is not deleted when it is closed: the audit (or the background
+    job) that reads it calls ``discard()`` once it is done.
+    """
+
+    def __init__(self, file, name, content_type, size, charset, content_type_extra=None):
+        super().__init__(file, name, content_type, size, charset, content_type_extra)
+        self.sha256 = ""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+    def discard(self):
+        self.close()
+        discard_upload(self.temporary_file_path())
+
+
+def discard_upload(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class HashingUploadHandler(FileUploadHandler):
+    """Stream the workbook upload to disk in one pass.
+
+    Chunks are written to a temp file under QA_UPLOAD_DIR and hashed as they
+    arrive, so nothing has to re-read the file for the result cache.  The
+    extension and the file signature are checked on the first chunk and the
+    size on every chunk: a bad or oversized upload stops the request there,
+    with ``request.upload_error`` (and the HTTP status to answer with,
+    ``request.upload_error_status``) set for the view to report.  Requests whose
+    Content-Length is already over the limit are stopped before any file
+    data is read.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.max_size = settings.QA_UPLOAD_MAX_SIZE
+        self.too_large = False
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # Content-Length covers the other form fields too, so allow a little slack
+        self.too_large = content_length > self.max_size + 64 * 1024
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        super().new_file(field_name, file_name, *args, **kwargs)
+        self.started = time.perf_counter()
+        self.extension = os.path.splitext(file_name)[1].lower()
+        if self.too_large:
+            self.reject(f"Uploaded file is larger than {self.max_size // (1024 * 1024)} MB.", status=413)
+        if self.extension not in SIGNATURES:
+            self.reject(f"Uploaded file is not {UPLOAD_TYPES}.")
+
+        os.makedirs(settings.QA_UPLOAD_DIR, exist_ok=True)
+        handle = tempfile.NamedTemporaryFile(dir=settings.QA_UPLOAD_DIR, suffix=self.extension, delete=False)
+        self.file = HashedUploadedFile(handle, self.file_name, self.content_type, 0, self.charset,
+                                       self.content_type_extra)
+        self.digest = hashlib.sha256()
+        self.header = b""
+        # This handler owns the file; later handlers never see it
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        if start + len(raw_data) > self.max_size:
+            self.reject(f"Uploaded file is larger than {self.max_size // (1024 * 1024)} MB.", status=413)
+
+        signature = SIGNATURES[self.extension]
+        if len(self.header) < len(signature):
+            self.header += raw_data[:len(signature) - len(self.header)]
+            if not signature.startswith(self.header):
+                self.reject(f"Uploaded file is not a valid {self.extension} workbook.")
+
+        self.digest.update(raw_data)
+        self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if len(self.header) < len(SIGNATURES[self.extension]):
+            self.reject(f"Uploaded file is not a valid {self.extension} workbook.")
+        self.file.seek(0)
+        self.file.size = file_size
+        self.file.sha256 = self.digest.hexdigest()
+        metrics.UPLOAD_SECONDS.observe(time.perf_counter() - self.started)
+        metrics.UPLOAD_BYTES.observe(file_size)
+        return self.file
+
+    def reject(self, message, status=400):
+        self.request.upload_error = message
+        self.request.upload_error_status = status
+        metrics.UPLOADS_REJECTED.inc()
+        self.upload_interrupted()
+        # Don't read the rest of the request body
+        raise StopUpload(connection_reset=True)
+
+    def upload_interrupted(self):
+        if hasattr(self, "file"):
+            self.file.discard()
+            # The parser closes whatever is left in self.file
+            del self.file
@@ -0,0 +1,81 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import UrlStatus
+
+# SQLite caps the number of bound parameters per query
+BATCH_SIZE = 500
+
+
+class CachedStatus:
+    def __init__(self, status, etag, last_modified, fresh):
+        self.status = status
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fresh = fresh
+
+
+class UrlStatusCache:
+    """URL -> last HTTP status, persisted in the project database.
+
+    Entries younger than ``ttl`` seconds are served as-is.  Older entries
+    are handed back as stale so the link checker can revalidate them with
+    their ETag / Last-Modified.  The least recently used entries are evicted
+    once the table grows past ``max_entries``.
+    """
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = timedelta(seconds=ttl)
+        self.max_entries = max_entries
+
+    def lookup(self, urls):
+        now = timezone.now()
+        found = {}
+        for batch in batched(urls):
+            for row in UrlStatus.objects.filter(url__in=batch):
+                found[row.url] = CachedStatus(
+                    row.status,
+                    row.etag,
+                    row.last_modified,
+                    fresh=now - row.checked_at < self.ttl,
+                )
+        return found
+
+    def touch(self, urls):
+        now = timezone.now()
+        for batch in batched(urls):
+            UrlStatus.objects.filter(url__in=batch).update(last_used=now)
+
+    def store(self, entries):
+        now = timezone.now()
+        rows = [
+            UrlStatus(url=url, status=status, etag=etag[:255], last_modified=last_modified[:64],
+                      checked_at=now, last_used=now)
+            for url, (status, etag, last_modified) in entries.items()
+        ]
+        UrlStatus.objects.bulk_create(
+            rows,
+            batch_size=BATCH_SIZE // 8,
+            update_conflicts=True,
+            unique_fields=["url"],
+            update_fields=["status", "etag", "last_modified", "checked_at", "last_used"],
+        )
+        self.evict()
+
+    def evict(self):
+        if UrlStatus.objects.count() <= self.max_entries:
+            return
+        stale = UrlStatus.objects.order_by("-last_used", "-pk").values("pk")[self.max_entries:]
+        UrlStatus.objects.filter(pk__in=stale).delete()
+
+
+def batched(items, size=BATCH_SIZE):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def default_cache():
+    return UrlStatusCache(ttl=settings.URL_CACHE_TTL, max_entries=settings.URL_CACHE_MAX_ENTRIES)
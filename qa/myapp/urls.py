@@ -3,4 +3,11 @@ from . import views
 
 urlpatterns = [
     path('', views.home, name='home'),
+    path('jobs/<int:job_id>/', views.job_detail, name='job_detail'),
+    path('jobs/<int:job_id>/status/', views.job_status, name='job_status'),
+    path('jobs/<int:job_id>/report/', views.job_report, name='job_report'),
+    path('uploads/<str:upload_hash>/analyze/', views.analyze, name='analyze'),
+    path('tables/<str:key>/', views.result_table, name='result_table'),
+    path('questions/match/', views.question_match, name='question_match'),
+    path('metrics', views.metrics, name='metrics'),
 ]
@@ -0,0 +1,45 @@
+import importlib
+import importlib.util
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Optional backends: imported when installed
+OPTIONAL_MODULES = ["pyarrow", "python_calamine", "xlsxwriter"]
+
+
+def warm_up():
+    """Import the audit path and prime its caches ahead of the first upload.
+
+    Meant for pre-fork servers (e.g. gunicorn --preload): run in the master,
+    the imports and caches are shared by every forked worker instead of
+    being paid by each worker's first request.  Enabled with QA_WARMUP, and
+    always run by audit worker processes.  Returns seconds spent.
+    """
+    started = time.perf_counter()
+
+    from .catalog import get_catalog
+    from .charts import render_chart
+    from .checks import CHECKS, columns_by_sheet, resolve_question
+    from .question_index import get_question_index
+    importlib.import_module(f"{__package__}.audit")
+    importlib.import_module("openpyxl")
+    importlib.import_module("requests")
+    for name in OPTIONAL_MODULES:
+        if importlib.util.find_spec(name) is not None:
+            importlib.import_module(name)
+
+    # Question -> check lookups and the column map the workbook reader uses
+    get_question_index()
+    for c in CHECKS.values():
+        resolve_question(c.question)
+    columns_by_sheet()
+    get_catalog()
+
+    # The first matplotlib render loads fonts; do it once here
+    render_chart({"kind": "pie", "labels": ["a", "b"], "values": [1, 1]}, "png")
+
+    seconds = time.perf_counter() - started
+    logger.info("QA audit path warmed up in %.2fs", seconds)
+    return seconds
@@ -0,0 +1,136 @@
+import threading
+import time
+
+from . import metrics
+from .aggregates import reduce_chunks
+from .normalize import normalize_sheet
+from .readers import open_reader
+
+
+class LazyWorkbook:
+    """Read-on-demand view of an uploaded workbook.
+
+    Behaves like the ``{sheet: DataFrame}`` dict the checks used to receive,
+    but a sheet is only parsed the first time it is accessed, and only the
+    columns listed for it in ``columns_by_sheet`` are read.  Sheets without
+    an entry are read in full.  Every sheet goes through normalize_sheet
+    once, right after it is parsed.  ``timings`` records how long each sheet
+    took to parse with the chosen reader backend.
+
+    With a ``snapshot`` (see snapshots.py), sheets snapshotted before are
+    read from it instead, and freshly parsed sheets are added to it.  The
+    workbook itself is only opened once a sheet has to be parsed.
+
+    Sheets of a CSV export (see csv_export.py) of at least
+    ``reduce_threshold`` bytes that have an entry in ``partials`` are read
+    in chunks and reduced to what those Partials need (see aggregates.py);
+    reduced sheets are not snapshotted.
+    """
+
+    def __init__(self, source, columns_by_sheet=None, backend="auto", stream_threshold=5 * 1024 * 1024,
+                 snapshot=None, partials=None, reduce_threshold=None):
+        self.source = source
+        self.columns_by_sheet = columns_by_sheet or {}
+        self.snapshot = snapshot
+        self.partials = partials or {}
+        self.reduce_threshold = reduce_threshold
+        self.timings = {}
+        self._backend = backend
+        self._stream_threshold = stream_threshold
+        self._reader = None
+        self._sheets = {}
+        self._lock = threading.Lock()
+        if snapshot is None or snapshot.sheet_names is None:
+            # Sheet names come from the workbook
+            self._reader = open_reader(source, backend, stream_threshold)
+            if snapshot is not None:
+                snapshot.save_sheet_names(self._reader.sheet_names)
+
+    @property
+    def reader(self):
+        if self._reader is None:
+            self._reader = open_reader(self.source, self._backend, self._stream_threshold)
+        return self._reader
+
+    @property
+    def backend(self):
+        return self._reader.engine if self._reader is not None else "snapshot"
+
+    @property
+    def sheet_names(self):
+        if self.snapshot is not None and self.snapshot.sheet_names is not None:
+            return self.snapshot.sheet_names
+        return self.reader.sheet_names
+
+    def __contains__(self, sheet_name):
+        return sheet_name in self.sheet_names
+
+    def __getitem__(self, sheet_name):
+        if sheet_name not in self:
+            raise KeyError(sheet_name)
+        with self._lock:
+            if sheet_name not in self._sheets:
+                self._sheets[sheet_name] = self._parse(sheet_name)
+            return self._sheets[sheet_name]
+
+    def get(self, sheet_name, default=None):
+        if sheet_name not in self:
+            return default
+        return self[sheet_name]
+
+    def _parse(self, sheet_name):
+        wanted = self.wanted_columns(sheet_name)
+        if self.snapshot is not None:
+            started = time.perf_counter()
+            df = self.snapshot.load(sheet_name, wanted)
+            if df is not None:
+                metrics.SHEET_PARSE_SECONDS.observe(time.perf_counter() - started, sheet=sheet_name, backend="snapshot")
+                return df
+
+        reader = self.reader
+        reduce = self.reduces(sheet_name)
+        with metrics.stage(metrics.SHEET_PARSE_SECONDS, metrics.SHEET_PARSE_MEMORY,
+                           sheet=sheet_name, backend=reader.engine):
+            started = time.perf_counter()
+            if reduce:
+                # Chunks are normalized one by one; the reduced sheet comes out normalized
+                chunks = (normalize_sheet(chunk) for chunk in reader.chunks(sheet_name, usecols=self.usecols(sheet_name)))
+                df = reduce_chunks(chunks, self.partials[sheet_name])
+                self.timings[sheet_name] = time.perf_counter() - started
+            else:
+                df = reader.parse(sheet_name, usecols=self.usecols(sheet_name))
+                self.timings[sheet_name] = time.perf_counter() - started
+                df = normalize_sheet(df)
+        if self.snapshot is not None and not reduce:
+            self.snapshot.save(sheet_name, df, wanted)
+        return df
+
+    def reduces(self, sheet_name):
+        # Whether the sheet is read in chunks and reduced rather than loaded whole
+        if self.reduce_threshold is None or sheet_name not in self.partials:
+            return False
+        reader = self.reader
+        return hasattr(reader, "chunks") and reader.size(sheet_name) >= self.reduce_threshold
+
+    def wanted_columns(self, sheet_name):
+        wanted = self.columns_by_sheet.get(sheet_name)
+        if wanted is None:
+            return None
+        # Headers are matched after stripping, the same way the checks normalize them
+        return {c.strip() for c in wanted}
+
+    def usecols(self, sheet_name):
+        wanted = self.wanted_columns(sheet_name)
+        if wanted is None:
+            return None
+        return lambda c: str(c).strip() in wanted
+
+    def close(self):
+        if self._reader is not None:
+            self._reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -78,6 +78,8 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Web requests and audit workers write to the same file
+        'OPTIONS': {'timeout': 20},
     }
 }
 
@@ -128,4 +130,112 @@ TEMPLATES[0]['DIRS'] = [os.path.join(BASE_DIR, 'templates')]
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
-MEDIA_URL = '/media/'
\ No newline at end of file
+MEDIA_URL = '/media/'
+
+# Link checker used by the "broken links or redirections" check
+LINK_CHECK_WORKERS = 32      # concurrent probes
+LINK_CHECK_PER_HOST = 4      # concurrent probes against the same host
+LINK_CHECK_TIMEOUT = 3       # seconds per request
+LINK_CHECK_DEADLINE = 60     # seconds for the whole check; pending URLs are reported as unchecked
+
+# Persistent URL-status cache shared across uploads
+URL_CACHE_TTL = 7 * 24 * 3600    # seconds before a cached status is revalidated
+URL_CACHE_MAX_ENTRIES = 50000    # least recently used URLs are evicted past this
+
+# Excel reader backend: "auto", "calamine", "openpyxl" or "openpyxl_stream".
+# "auto" uses calamine when python-calamine is installed, otherwise streams
+# files larger than EXCEL_STREAM_THRESHOLD bytes.
+EXCEL_READER_BACKEND = "auto"
+EXCEL_STREAM_THRESHOLD = 5 * 1024 * 1024
+EXCEL_READER_TIMINGS_LOG = os.path.join(MEDIA_ROOT, 'reader_timings.jsonl')   # None disables
+EXCEL_READER_COMPARE = False     # also time every other backend on each upload
+
+# Check executor
+QA_CHECK_THREADS = 8             # thread pool for I/O-bound checks and small sheets
+QA_CHECK_PROCESSES = 2           # process pool for CPU-heavy checks; 0 keeps everything on threads
+QA_PROCESS_MIN_ROWS = 50000      # smaller sheets aren't worth shipping to another process
+QA_CHECK_TIMEOUT = 120           # seconds per check
+
+# Background audits (python manage.py audit_worker)
+# Queue uploads for the worker; in development (DEBUG) the audit runs inside the
+# upload request, so runserver alone is enough
+QA_AUDIT_ASYNC = not DEBUG
+QA_AUDIT_CONCURRENCY = 2         # audits a worker runs at the same time
+QA_AUDIT_STALE_AFTER = 30 * 60   # seconds before a silent "running" job is picked up again
+
+# Audit result cache: identical uploads get their earlier report back, and
+# checks on sheets that did not change since an earlier upload are not re-run
+QA_RESULT_CACHE = True
+QA_RESULT_CACHE_TTL = 7 * 24 * 3600      # seconds; matches the URL cache so link results stay fresh
+QA_RESULT_CACHE_MAX_REPORTS = 1000       # least recently used reports are forgotten past this
+QA_RESULT_CACHE_MAX_CHECKS = 50000       # same for individual check results
+
+# Uploads are streamed straight to QA_UPLOAD_DIR (hashed and checked on the way)
+# and deleted once their audit has run
+FILE_UPLOAD_HANDLERS = ['myapp.uploads.HashingUploadHandler']
+QA_UPLOAD_DIR = os.path.join(BASE_DIR, 'uploads')
+QA_UPLOAD_MAX_SIZE = 100 * 1024 * 1024   # bytes; larger uploads are cut off as soon as that is known
+
+# Charts are rendered in memory and inlined in the results page: "svg" or "png"
+QA_CHART_FORMAT = "svg"
+
+# Import pandas/matplotlib/etc. and prime caches when Django starts, so
+# pre-fork servers (gunicorn --preload) share them across workers.
+# Off by default to keep runserver and management commands fast.
+QA_WARMUP = False
+
+# Result tables longer than one page are stored in the database and paged
+# into the results page on demand (GET /tables/<key>/?page=&sort=&order=&q=)
+QA_TABLE_PAGE_SIZE = 50
+QA_TABLE_MAX_PAGE_SIZE = 500
+QA_RESULT_TABLES_MAX = 20000     # least recently used tables are dropped past this
+
+# python manage.py audit_batch <dirs or globs>: reports, roll-up summary and
+# the state file used to skip workbooks already audited
+QA_BATCH_OUTPUT_DIR = os.path.join(MEDIA_ROOT, 'batch')
+QA_BATCH_PROCESSES = None        # workbooks audited at once; None means one per CPU
+
+# Prometheus metrics at /metrics.  Processes that run audits outside the web
+# server (audit_worker, audit_batch) leave their numbers in QA_METRICS_DIR.
+QA_METRICS = True
+QA_METRICS_DIR = os.path.join(BASE_DIR, 'metrics')
+QA_METRICS_SNAPSHOT_TTL = 24 * 3600     # seconds; older snapshots are deleted when /metrics is scraped
+QA_SLOW_CHECK_SECONDS = None     # log a warning for checks slower than this; None disables
+
+# The checklist: one question per line, matched to the checks in myapp/checks.py.
+# Re-read whenever the file changes; "python manage.py check --deploy" validates it.
+QA_QUESTIONS_FILE = BASE_DIR.parent / 'questions.txt'
+QA_DISABLED_CHECKS = []          # check IDs (see myapp/checks.py) left out of every audit
+
+# Parsed sheets of every audited upload are kept as Arrow files, keyed by the
+# upload's SHA-256, and memory-mapped when the same workbook is audited again
+# (needs pyarrow).  The least recently used uploads go past QA_SNAPSHOT_MAX_BYTES.
+QA_SNAPSHOTS = True
+QA_SNAPSHOT_DIR = os.path.join(BASE_DIR, 'snapshots')
+QA_SNAPSHOT_MAX_BYTES = 2 * 1024 ** 3
+
+# Free-text questions are matched to checks by a TF-IDF index (myapp/question_index.py).
+# Below the score, or too close to the runner-up, the top-k alternatives are offered instead.
+QA_QUESTION_MATCH_MIN_SCORE = 0.3
+QA_QUESTION_MATCH_MIN_MARGIN = 0.05
+QA_QUESTION_MATCH_TOP_K = 3
+
+# Seasonal keywords check: {season: ("MM-DD" first day, "MM-DD" last day, [terms])};
+# None uses the calendar in myapp/keyword_scan.py.  Keywords are judged against
+# QA_SEASON_DATE (a datetime.date), or today when it is None.
+QA_SEASON_CALENDAR = None
+QA_SEASON_DATE = None
+
+# Differential audits: every audit keeps row fingerprints and the issues found
+# per account (the upload form's account field, or the file name without dates),
+# and reports new and resolved issues since that account's previous audit.
+QA_DIFF = True
+QA_DIFF_DIR = os.path.join(BASE_DIR, 'history')
+QA_DIFF_MAX_ACCOUNTS = 5000      # accounts audited least recently are forgotten past this
+
+# CSV exports (.csv/.tsv, or a .zip of them, one file per sheet) are read
+# QA_CSV_CHUNK_ROWS rows at a time.  Sheets of at least QA_CSV_REDUCE_MIN_BYTES
+# (uncompressed) whose checks can all run on partial aggregates are never
+# loaded whole; None always loads them.
+QA_CSV_CHUNK_ROWS = 200000
+QA_CSV_REDUCE_MIN_BYTES = 256 * 1024 * 1024